@@ -1,9 +1,86 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context, url_for
+import json
+import math
 import os
-import requests
+import time
+import hashlib
+import numpy as np
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, render as render_metrics
+from structured_logging import get_logger
+from sbdb_service import SBDBService, PRESET_ASTEROIDS
+from sbdb_snapshot import SBDBSnapshot
+from impact_effects import AXES, DEFAULT_ANGLE, DEFAULT_DENSITY, KineticEnergyGrid, impact_grid, parse_axis
+from orbit_geometry import DEFAULT_TOLERANCE, orbit_geometry
+from gmat_integration import CENTRAL_BODIES, GMATIntegration
+from gmat_protocol import ELEMENT_FIELDS, MAX_LOD_POINTS, encode_frame
+from state_stream import OUTPUT_FORMATS, STATE_BYTES, convert_stream
+from conjunction import (AU_KM, DEFAULT_DISTANCE_KM, DEFAULT_PAIR_DISTANCE_KM, OrbitCatalog, earth_catalog,
+                         encounter_records, julian_date, screen)
+from deflection import DEFAULT_SEARCH_DAYS, DeflectionJob, DeflectionProblem
+from monte_carlo import default_executor
+from page_cache import PageCache, precompress_directory
 
 app = Flask(__name__, template_folder="frontend/templates", static_folder="frontend/static")
+log = get_logger("app")
+
+# Offline small-body catalog, memory-mapped so all workers share one copy
+SNAPSHOT_PATH = os.environ.get("SBDB_SNAPSHOT", os.path.join(app.root_path, "data", "sbdb_snapshot.bin"))
+snapshot = None
+if os.path.exists(SNAPSHOT_PATH):
+    try:
+        snapshot = SBDBSnapshot(SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        log.warning("snapshot_unavailable", path=SNAPSHOT_PATH, error=str(e))
+
+# Shared by all requests handled by this worker
+sbdb = SBDBService(
+    ttl=float(os.environ.get("SBDB_CACHE_TTL", 6 * 3600)),
+    cache_dir=os.environ.get("SBDB_CACHE_DIR", os.path.join(app.root_path, ".sbdb_cache")),
+    fallback=snapshot,
+)
+
+# State-vector conversion for /convert-states
+converter = GMATIntegration()
+
+# Every kinetic energy the sliders can ask for, built once per worker
+kinetic_energy_grid = KineticEnergyGrid()
+DEFAULT_MASS = 1000  # in kilograms
+KINETIC_ENERGY_MAX_AGE = int(os.environ.get("KINETIC_ENERGY_MAX_AGE", 7 * 24 * 3600))
+
+# Where the browser finds the GMAT stream and physics bridge; "" means this
+# server's own origin, as under asgi.py
+GMAT_BRIDGE_URL = os.environ.get("GMAT_BRIDGE_URL", "http://localhost:8765")
+
+# Process pool for /deflection, started on first use
+deflection_executor = None
+
+# Rendered pages by the inputs they depend on, compressed when rendered
+page_cache = PageCache(maxsize=int(os.environ.get("PAGE_CACHE_SIZE", 256)))
+
+# frontend/static, compressed once at startup
+static_pages = precompress_directory(app.static_folder)
+
+CATALOG_ARGS = ("page", "per_page", "q", "neo", "pha", "a_min", "a_max", "e_max", "diameter_min")
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Observed when the body is closed, so streamed responses count in full
+    started = g.get("request_started")
+    if started is not None:
+        series = HTTP_REQUEST_SECONDS.labels(
+            server="flask", route=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method, status=response.status_code)
+        response.call_on_close(lambda: series.observe(time.perf_counter() - started))
+    return response
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
 
 def calculate_kinetic_energy(mass, velocity):
     return 0.5 * mass * (velocity * 1000) ** 2  # Convert km/s to m/s for calculation
@@ -14,147 +91,321 @@ def index():
     velocity = 11  # Default velocity in km/s (minimum value)
     kinetic_energy = calculate_kinetic_energy(mass, velocity)
     kinetic_energy_sci = "{:.2e}".format(kinetic_energy)  # Format in scientific notation
-    return render_template("index.html", kinetic_energy=kinetic_energy_sci)
+    bridge_url = app.config.get("GMAT_BRIDGE_URL", GMAT_BRIDGE_URL)
+    page = page_cache.get(("index", kinetic_energy_sci, bridge_url), lambda: render_template(
+        "index.html", kinetic_energy=kinetic_energy_sci, gmat_bridge_url=bridge_url))
+    return page_response(page)
+
+def page_response(page, max_age=None):
+    """
+    The variant of a cached page the client accepts, with Vary and a
+    per-variant strong ETag; answers If-None-Match with 304. Without
+    max_age the browser revalidates on every use.
+    """
+    encoding, body, etag = page.select(request.headers.get("Accept-Encoding"))
+    response = app.response_class(body, content_type=page.content_type)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+def serve_static(filename):
+    """frontend/static from the copies compressed at startup; new files from disk"""
+    page = static_pages.get(filename)
+    if page is None:
+        return app.send_static_file(filename)
+    return page_response(page, app.get_send_file_max_age(filename))
+
+# Replaces Flask's own static view, keeping the endpoint and its url_for()
+app.view_functions["static"] = serve_static
+
+def _flag_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    return value.lower() in ("1", "true", "y", "yes")
+
+def catalog_requested(args):
+    """Browse the offline catalog when any paging/filter argument is given"""
+    return snapshot is not None and any(arg in args for arg in CATALOG_ARGS)
+
+def render_presets(asteroids):
+    log.debug("presets_rendered", count=len(asteroids))
+    return render_template("preset.html", asteroids=asteroids)
+
+def preset_page(asteroids):
+    """The cached preset page for these records; new SBDB data renders a new one"""
+    version = hashlib.sha1(json.dumps(asteroids, sort_keys=True, default=str).encode()).hexdigest()
+    return page_cache.get(("presets", version), lambda: render_presets(asteroids))
 
 @app.route("/preset-orbits")
 def preset_orbits():
-    # NASA JPL Small Body Database API endpoint
-    BASE_URL = "https://ssd-api.jpl.nasa.gov/sbdb.api"
-    
-    # Asteroid SPK-ID mapping (NASA's internal IDs)
-    asteroid_ids = {
-        "Bennu (101955)": "2101955",
-        "Apophis (99942)": "2099942", 
-        "Ryugu (162173)": "2162173",
-        "Didymos (65803)": "2065803",
-        "Eros (433)": "2000433",
-        "Itokawa (25143)": "2025143",
-        "Vesta (4)": "2000004",
-        "Ceres (1)": "2000001"
+    if catalog_requested(request.args):
+        args = request.args.to_dict()
+        # The snapshot is read-only, so the arguments fully determine the page
+        key = ("catalog", tuple(sorted(args.items())))
+        return page_response(page_cache.get(key, lambda: render_catalog(args)))
+
+    return page_response(preset_page(sbdb.get_many(PRESET_ASTEROIDS)))
+
+def render_catalog(args):
+    """One page of the offline catalog for the paging/filter arguments"""
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 24, type=int), 1), 200)
+    asteroids, total = snapshot.query(
+        page=page,
+        per_page=per_page,
+        neo=_flag_arg("neo"),
+        pha=_flag_arg("pha"),
+        text=request.args.get("q"),
+        a_min=request.args.get("a_min", type=float),
+        a_max=request.args.get("a_max", type=float),
+        e_max=request.args.get("e_max", type=float),
+        diameter_min=request.args.get("diameter_min", type=float),
+    )
+    pages = max((total + per_page - 1) // per_page, 1)
+    pagination = {
+        "page": page,
+        "pages": pages,
+        "total": total,
+        "prev_url": url_for("preset_orbits", **{**args, "page": page - 1}) if page > 1 else None,
+        "next_url": url_for("preset_orbits", **{**args, "page": page + 1}) if page < pages else None,
     }
-    
-    real_asteroids = []
-    
-    for name, spk_id in asteroid_ids.items():
-        try:
-            print(f"🔄 FETCHING data for {name} (ID: {spk_id})...")
-            
-            # Fetch orbital data from NASA JPL API
-            url = f"{BASE_URL}?sstr={spk_id}"
-            print(f"   📡 API URL: {url}")
-            
-            response = requests.get(url)
-            print(f"   ✅ Response status: {response.status_code}")
-            
-            data = response.json()
-            print(f"   📊 Data received for {name}")
-            
-            # Extract orbital elements
-            orbit_data = data.get('orbit', {})
-            elements = orbit_data.get('elements', [])
-            
-            # Convert elements list to dictionary for easy access
-            elements_dict = {elem['name']: elem['value'] for elem in elements}
-            print(f"   🌍 Orbital elements found: {list(elements_dict.keys())}")
-            
-            # Extract physical parameters
-            physical_data = data.get('physical_parameters', [])
-            physical_dict = {param['name']: param['value'] for param in physical_data}
-            print(f"   📏 Physical parameters found: {list(physical_dict.keys())}")
-            
-            # Get diameter (convert from meters to km)
-            diameter = None
-            if 'diameter' in physical_dict:
-                diameter = float(physical_dict['diameter']) / 1000  # Convert m to km
-                print(f"   📐 Diameter: {diameter} km")
-            elif 'A' in physical_dict:  # Sometimes diameter is labeled as 'A'
-                diameter = float(physical_dict['A']) / 1000
-                print(f"   📐 Diameter (from A): {diameter} km")
-            else:
-                print("   ❌ No diameter data found")
-            
-            # Get mass (convert from kg if available)
-            mass = None
-            if 'mass' in physical_dict:
-                mass = float(physical_dict['mass'])
-                print(f"   ⚖️ Mass: {mass} kg")
-            else:
-                print("   ❌ No mass data found")
-            
-            # Extract orbital parameters
-            a = float(elements_dict.get('a', 0))  # Semi-major axis (AU)
-            e = float(elements_dict.get('e', 0))  # Eccentricity
-            inc = float(elements_dict.get('i', 0))  # Inclination (degrees)
-            
-            print(f"   🛰️ Semi-major axis (a): {a} AU")
-            print(f"   📈 Eccentricity (e): {e}")
-            print(f"   📐 Inclination (i): {inc}°")
-            
-            # Calculate approximate velocity (simplified)
-            GM = 1.32712440018e20  # m^3/s^2
-            a_m = a * 1.496e11  # Convert AU to meters
-            orbital_velocity = (GM / a_m) ** 0.5 / 1000  # Convert to km/s
-            print(f"   🚀 Orbital velocity: {orbital_velocity} km/s")
-            
-            # Get additional info
-            full_name = data.get('object', {}).get('fullname', name)
-            neo_flag = data.get('object', {}).get('neo', False)
-            pha_flag = data.get('object', {}).get('pha', False)
-            
-            print(f"   🎯 NEO: {neo_flag}, PHA: {pha_flag}")
-            
-            # Determine hazard level
-            if pha_flag:
-                hazard = "high"
-            elif neo_flag:
-                hazard = "medium" 
-            else:
-                hazard = "low"
-            
-            print(f"   ⚠️ Hazard level: {hazard}")
-            
-            asteroid = {
-                "nasa_id": spk_id,  # <-- ADD THIS LINE
-                "name": full_name,
-                "description": f"{'Potentially Hazardous ' if pha_flag else ''}{'Near-Earth ' if neo_flag else ''}Asteroid - Data from NASA JPL",
-                "a": round(a, 3),
-                "e": round(e, 3),
-                "inc": round(inc, 3),
-                "diameter": round(diameter, 2) if diameter else None,
-                "mass": mass,
-                "velocity": round(orbital_velocity, 1),
-                "hazard": hazard,
-                "image": f"{name.split(' ')[0].lower()}.jpg",
-                "mission": "Multiple observations"
-            }
-            
-            real_asteroids.append(asteroid)
-            print(f"   ✅ Successfully processed {name}\n")
-            
-        except Exception as e:
-            print(f"   ❌ ERROR fetching data for {name}: {e}")
-            print(f"   📋 Response content: {response.text if 'response' in locals() else 'No response'}\n")
-            # Fallback to placeholder data if API fails
-            real_asteroids.append({
-                "name": name,
-                "description": "Data temporarily unavailable",
-                "a": 0, "e": 0, "inc": 0, "diameter": 0, "mass": 0, "velocity": 0,
-                "hazard": "unknown", "image": "default.jpg", "mission": "Unknown"
-            })
-    
-    print(f"🎯 FINAL RESULT: Processed {len(real_asteroids)} asteroids")
-    for asteroid in real_asteroids:
-        print(f"   - {asteroid['name']}: a={asteroid['a']} AU, e={asteroid['e']}, inc={asteroid['inc']}°")
-    
-    return render_template("preset.html", asteroids=real_asteroids)
+    return render_template("preset.html", asteroids=asteroids, pagination=pagination)
+
+def _cached_json(body, etag, mimetype="application/json"):
+    """Cacheable response with a strong ETag; answers If-None-Match with 304"""
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = KINETIC_ENERGY_MAX_AGE
+    return response.make_conditional(request)
+
+def _kinetic_energy_mass():
+    mass = request.args.get("mass", DEFAULT_MASS, type=float)  # in kilograms
+    if not mass > 0 or math.isinf(mass):
+        raise ValueError("mass must be a positive number of kilograms")
+    return mass
 
 @app.route("/update-kinetic-energy")
 def update_kinetic_energy():
-    mass = 1000  # in kilograms
     velocity = request.args.get("velocity", type=float)  # Velocity in km/s
-    kinetic_energy = calculate_kinetic_energy(mass, velocity)
-    kinetic_energy_sci = "{:.2e}".format(kinetic_energy)  # Format in scientific notation
-    return jsonify({"kinetic_energy": kinetic_energy_sci})
+    try:
+        mass = _kinetic_energy_mass()
+        if velocity is None or not 0 <= velocity < math.inf:
+            raise ValueError("velocity is required as a non-negative number of km/s")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _cached_json(*kinetic_energy_grid.point(mass, velocity))
+
+@app.route("/update-kinetic-energy/curve")
+def kinetic_energy_curve():
+    """Kinetic energy at every velocity slider position for one mass"""
+    try:
+        mass = _kinetic_energy_mass()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _cached_json(*kinetic_energy_grid.curve(mass))
+
+@app.route("/impact-effects", methods=["GET", "POST"])
+def impact_effects():
+    """
+    Energy, TNT equivalent, craters and damage radii for a grid of
+    mass (kg), velocity (km/s), angle (deg) and density (kg/m^3).
+    GET takes comma lists or start:stop:step ranges, e.g.
+    /impact-effects?mass=1e6&velocity=11:72:1; POST takes the same keys
+    as JSON arrays plus an optional "grid": false for element-wise input.
+    """
+    defaults = {"angle": [DEFAULT_ANGLE], "density": [DEFAULT_DENSITY]}
+    try:
+        if request.method == "POST":
+            body = request.get_json(force=True) or {}
+            if not isinstance(body, dict):
+                raise ValueError("Expected a JSON object")
+            axes = {name: body.get(name, defaults.get(name)) for name in AXES}
+            grid = bool(body.get("grid", True))
+        else:
+            axes = {name: parse_axis(request.args[name]) if name in request.args else defaults.get(name)
+                    for name in AXES}
+            grid = _flag_arg("grid") is not False
+        missing = [name for name, values in axes.items() if values is None]
+        if missing:
+            raise ValueError(f"Missing {', '.join(missing)}")
+        effects = impact_grid(grid=grid, **axes)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    shape = next(iter(effects.values())).shape
+    response = {name: np.atleast_1d(axes[name]).astype(float).tolist() for name in AXES}
+    response.update({"grid": grid, "shape": list(shape)})
+    response.update({key: values.tolist() for key, values in effects.items()})
+    return jsonify(response)
+
+@app.route("/orbit-geometry")
+def orbit_geometry_buffer():
+    """
+    Orbit polyline as packed little-endian float32 xyz triples (km):
+    /orbit-geometry?a=12000&e=0.3&i=15&raan=40&argp=20&tolerance=1e-4
+    Angles in degrees; tolerance is the max chord error as a fraction of a.
+    """
+    try:
+        a = request.args.get("a", type=float)
+        e = request.args.get("e", type=float)
+        if a is None or e is None:
+            raise ValueError("a (km) and e are required")
+        angles = [float(request.args.get(name, 0)) for name in ("i", "raan", "argp")]
+        tolerance = float(request.args.get("tolerance", DEFAULT_TOLERANCE))
+        body, key = orbit_geometry(a, e, *angles, tolerance)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid orbit: {e}"}), 400
+
+    response = _cached_json(body, "orbit-" + "-".join(f"{x:g}" for x in key), "application/octet-stream")
+    response.headers["X-Point-Count"] = str(len(body) // 12)
+    return response
+
+@app.route("/convert-states", methods=["POST"])
+def convert_states():
+    """
+    Stream state vectors in, orbital elements out:
+    POST /convert-states?mu=earth&output=ndjson
+    The body is text rows (x y z vx vy vz, whitespace or commas, optional
+    header) or, with Content-Type application/octet-stream or ?input=binary,
+    packed little-endian float64 (N, 6). mu is a central body name or a
+    value in km^3/s^2. Output is NDJSON or, with ?output=binary, packed
+    float64 rows in the order of the X-Fields header.
+    """
+    mu = request.args.get("mu", "earth")
+    try:
+        mu = CENTRAL_BODIES[mu.lower()] if mu.lower() in CENTRAL_BODIES else float(mu)
+        if not mu > 0 or math.isinf(mu):
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"mu must be one of {sorted(CENTRAL_BODIES)} or a positive number"}), 400
+    output = request.args.get("output", "ndjson")
+    if output not in OUTPUT_FORMATS:
+        return jsonify({"error": f"output must be one of {list(OUTPUT_FORMATS)}"}), 400
+    binary_input = (request.args.get("input") == "binary"
+                    or request.mimetype == "application/octet-stream")
+    if binary_input and request.content_length and request.content_length % STATE_BYTES:
+        return jsonify({"error": f"Binary input must be a whole number of {STATE_BYTES}-byte states"}), 400
+
+    def chunks():
+        try:
+            yield from convert_stream(request.stream,
+                                      lambda states: converter.gmat_to_orbital_elements_batch(states, mu),
+                                      binary_input, output)
+        except ValueError as e:
+            # Headers are already sent: end NDJSON with an error line, cut binary short
+            log.warning("convert_states_failed", error=str(e))
+            if output == "ndjson":
+                yield (json.dumps({"error": str(e)}) + "\n").encode()
+
+    response = Response(stream_with_context(chunks()),
+                        mimetype="application/octet-stream" if output == "binary" else "application/x-ndjson")
+    response.headers["X-Fields"] = ",".join(ELEMENT_FIELDS)
+    return response
+
+@app.route("/trajectory")
+def trajectory_view():
+    """
+    Level-of-detail view of the GMAT trajectory, as one stream frame:
+    /trajectory?t_start=0&t_end=1e6&max_points=1000&format=json
+    Times are point indices; X-LOD-Level and X-LOD-Error-Km describe the level.
+    """
+    fmt = request.args.get("format", "json")
+    max_points = request.args.get("max_points", 1000, type=int)
+    if fmt not in ("json", "binary") or not 2 <= max_points <= MAX_LOD_POINTS:
+        return jsonify({"error": f"format must be json or binary and 2 <= max_points <= {MAX_LOD_POINTS}"}), 400
+    t_start, t_end = request.args.get("t_start", type=float), request.args.get("t_end", type=float)
+    if any(t is not None and not math.isfinite(t) for t in (t_start, t_end)):
+        return jsonify({"error": "t_start and t_end must be finite point indices"}), 400
+    rows, states, elements, info = converter.lod_view(t_start, t_end, max_points)
+    body = encode_frame(fmt, int(rows[0]) if len(rows) else 0, states, elements, info["total_points"], rows)
+    response = Response(body, mimetype="application/octet-stream" if fmt == "binary" else "application/json")
+    response.headers["X-LOD-Level"] = str(info["level"])
+    if info["error_km"] is not None:  # None: thinned past the coarsest level, no bound
+        response.headers["X-LOD-Error-Km"] = repr(info["error_km"])
+    return response
+
+MAX_CONJUNCTION_DAYS = 3650
+
+@app.route("/conjunctions")
+def conjunctions():
+    """
+    Close approaches of the preset asteroids between two dates:
+    /conjunctions?distance_km=7.5e6&days=365&start=2460000.5
+    start is a JD (default now). With pairs=1 the asteroids are screened
+    against each other instead of against Earth, by default within 1e6 km.
+    """
+    pairs = _flag_arg("pairs")
+    distance_km = request.args.get("distance_km", DEFAULT_PAIR_DISTANCE_KM if pairs else DEFAULT_DISTANCE_KM,
+                                   type=float)
+    days = request.args.get("days", 365.0, type=float)
+    start = request.args.get("start", type=float)
+    start = julian_date() if start is None else start
+    if not 0 < distance_km < math.inf or not 0 < days <= MAX_CONJUNCTION_DAYS or not math.isfinite(start):
+        return jsonify({"error": f"Need distance_km > 0, 0 < days <= {MAX_CONJUNCTION_DAYS} and a finite start JD"}), 400
+
+    catalog = OrbitCatalog.from_records(sbdb.get_many(PRESET_ASTEROIDS))
+    target = None if pairs else earth_catalog()
+    result = screen(catalog, start, start + days, distance_km / AU_KM, target)
+    return jsonify({
+        "start_jd": start,
+        "stop_jd": start + days,
+        "distance_km": distance_km,
+        "target": "Earth" if target is not None else None,
+        "stages": result["stages"],
+        "encounters": encounter_records(catalog, result, target),
+    })
+
+def _preset_record(body):
+    """The SBDB record of a preset asteroid, matched by name prefix"""
+    matches = [name for name in PRESET_ASTEROIDS if name.lower().startswith(body.lower())]
+    if not matches:
+        raise ValueError(f"Unknown asteroid {body!r}, expected one of {list(PRESET_ASTEROIDS)}")
+    return sbdb.get_with_orbit(matches[0], PRESET_ASTEROIDS[matches[0]])
+
+@app.route("/deflection")
+def deflection():
+    """
+    Best kinetic-impactor plans for a preset asteroid:
+    /deflection?body=Apophis&lead_days=10:3650:10&beta=1,2,3,4,5&direction_step=10
+    plus impactor_mass (kg), impactor_speed (km/s), mass (kg, default from
+    SBDB), start (JD, default now), days (encounter search window), top
+    and prune=0 to evaluate every candidate exactly.
+    """
+    global deflection_executor
+    try:
+        record = _preset_record(request.args.get("body", "Apophis"))
+        start = request.args.get("start", type=float)
+        days = request.args.get("days", DEFAULT_SEARCH_DAYS, type=float)
+        if not 0 < days <= MAX_CONJUNCTION_DAYS:
+            raise ValueError(f"days must be within (0, {MAX_CONJUNCTION_DAYS}]")
+        problem = DeflectionProblem.from_record(record, start, days, request.args.get("mass", type=float))
+        options = {name: request.args.get(name, type=float)
+                   for name in ("impactor_mass", "impactor_speed", "direction_step")}
+        options = {name: value for name, value in options.items() if value is not None}
+        if "lead_days" in request.args:
+            options["lead_days"] = parse_axis(request.args["lead_days"])
+        if "beta" in request.args:
+            options["betas"] = parse_axis(request.args["beta"])
+        job = DeflectionJob(problem, top=min(request.args.get("top", 10, type=int), 100),
+                            prune=_flag_arg("prune") is not False, **options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if deflection_executor is None:
+        deflection_executor = default_executor()
+    result = job.run(deflection_executor)
+    log.info("deflection_planned", body=problem.name, candidates=job.n, exact=result["stages"]["exact"],
+             elapsed_s=round(result["elapsed_s"], 3))
+    return jsonify(result)
 
 if __name__ == "__main__":
     app.run(debug=False)
\ No newline at end of file
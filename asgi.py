@@ -0,0 +1,256 @@
+# asgi.py
+"""
+Single-process ASGI entry point. One event loop serves:
+
+* the Flask routes of app.py (run on worker threads), except that the
+  preset list is fetched from JPL over a pooled async HTTP client
+* the GMAT WebSocket stream of gmat_integration.py, on any WebSocket path
+* the physics bridge endpoints of http_gmat_bridge.py
+
+    python asgi.py --host 0.0.0.0 --port 8000 [--broadcast]
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The gunicorn deployment (``gunicorn app:app``) is unaffected.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import websockets
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, catalog_requested, preset_page, sbdb
+from gmat_integration import SCENARIO_DIR, GMATIntegration
+from http_gmat_bridge import BridgeError, PhysicsBridge, PREFLIGHT_HEADERS, response_headers
+from metrics import HTTP_REQUEST_SECONDS
+from sbdb_service import PRESET_ASTEROIDS
+from scenario_recorder import ScenarioRecorder
+from structured_logging import get_logger
+
+log = get_logger("asgi")
+
+# Concurrent connections to the JPL API shared by all requests
+JPL_MAX_CONNECTIONS = 16
+
+# The page, stream and bridge share one origin here
+flask_app.config["GMAT_BRIDGE_URL"] = ""
+
+
+async def send_response(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class ASGIWebSocket:
+    """
+    The part of the websockets connection API that GMATIntegration uses
+    (send, wait_closed, ConnectionClosed on disconnect), over an ASGI
+    WebSocket scope. Incoming messages are ignored: the stream is one-way.
+    """
+
+    def __init__(self, scope, receive, send):
+        query = scope.get('query_string', b'').decode('latin1')
+        self.path = scope['path'] + (f"?{query}" if query else '')
+        self._receive = receive
+        self._send = send
+        self._closed = asyncio.Event()
+        self._reader = None
+
+    async def accept(self):
+        """Complete the handshake; False if the client left first"""
+        message = await self._receive()
+        if message['type'] != 'websocket.connect':
+            return False
+        await self._send({'type': 'websocket.accept'})
+        self._reader = asyncio.ensure_future(self._read())
+        return True
+
+    async def _read(self):
+        while (await self._receive())['type'] != 'websocket.disconnect':
+            pass
+        self._closed.set()
+
+    async def send(self, payload):
+        if self._closed.is_set():
+            raise websockets.exceptions.ConnectionClosed(None, None)
+        key = 'bytes' if isinstance(payload, (bytes, bytearray)) else 'text'
+        try:
+            await self._send({'type': 'websocket.send', key: payload})
+        except (OSError, RuntimeError):
+            self._closed.set()
+            raise websockets.exceptions.ConnectionClosed(None, None)
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if not self._closed.is_set():
+            self._closed.set()
+            try:
+                await self._send({'type': 'websocket.close', 'code': 1000})
+            except (OSError, RuntimeError):
+                pass
+
+
+class AsteroidSimASGI:
+    """Routes each ASGI scope to the bridge, the GMAT stream or Flask"""
+
+    def __init__(self, integration=None, bridge=None):
+        self.flask = WsgiToAsgi(flask_app)
+        self.integration = integration or GMATIntegration()
+        # The bridge's element feed and client events go to the stream's recording
+        self.bridge = bridge or PhysicsBridge(recorder=self.integration.recorder)
+        self.client = None
+
+    def http_client(self):
+        """Pooled async client for JPL, created on first use if lifespan is not run"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=JPL_MAX_CONNECTIONS))
+        return self.client
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'websocket':
+            await self.gmat_stream(scope, receive, send)
+        elif scope['path'] in PhysicsBridge.ROUTES:
+            await self.timed(scope, send, self.bridge_endpoint)
+        elif scope['path'] == '/preset-orbits' and scope['method'] == 'GET' and \
+                not catalog_requested(parse_qs(scope['query_string'].decode('latin1'))):
+            await self.timed(scope, send, self.preset_orbits)
+        else:
+            await self.flask(scope, receive, send)
+
+    async def timed(self, scope, send, handler):
+        """Run a route served here (not by Flask) into the request duration histogram"""
+        started = time.perf_counter()
+        status = None
+
+        async def recording_send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await handler(scope, recording_send)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(server='asgi', route=scope['path'], method=scope['method'],
+                                        status=status).observe(time.perf_counter() - started)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.http_client()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.client is not None:
+                    await self.client.aclose()
+                if self.integration._mc_executor:
+                    self.integration._mc_executor.shutdown(cancel_futures=True)
+                if self.integration.recorder is not None:
+                    self.integration.recorder.flush()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def gmat_stream(self, scope, receive, send):
+        websocket = ASGIWebSocket(scope, receive, send)
+        if not await websocket.accept():
+            return
+        try:
+            await self.integration.send_gmat_data(websocket, websocket.path)
+        finally:
+            await websocket.close()
+
+    async def bridge_endpoint(self, scope, send):
+        if scope['method'] == 'OPTIONS':
+            await send_response(send, 200, PREFLIGHT_HEADERS, b'')
+            return
+        params = parse_qs(scope['query_string'].decode('latin1'))
+        session_id = dict(scope['headers']).get(b'x-session-id', b'').decode('latin1') or None
+        try:
+            # Ephemeris windows can be large; keep the loop free while they serialize
+            data, session, no_cache = await asyncio.to_thread(
+                self.bridge.dispatch, scope['path'], params, session_id)
+            body = json.dumps(data).encode()
+        except BridgeError as e:
+            await send_response(send, e.status, [('Content-type', 'text/plain')], str(e).encode())
+            return
+        except Exception as e:
+            log.exception("bridge_request_failed", path=scope['path'], error=str(e))
+            await send_response(send, 500, [('Content-type', 'text/plain')], b'Internal server error')
+            return
+        headers = response_headers(session, no_cache) + [('Content-Length', str(len(body)))]
+        await send_response(send, 200, headers, body)
+
+    async def preset_orbits(self, scope, send):
+        """The preset list, fetched without holding a worker thread while JPL answers"""
+        records = await sbdb.get_many_async(PRESET_ASTEROIDS, self.http_client())
+        with flask_app.app_context():
+            page = preset_page(records)
+        request_headers = dict(scope['headers'])
+        encoding, body, etag = page.select(request_headers.get(b'accept-encoding', b'').decode('latin1'))
+        headers = [('Vary', 'Accept-Encoding'), ('ETag', f'"{etag}"'), ('Cache-Control', 'no-cache')]
+        if page.matches(request_headers.get(b'if-none-match', b'').decode('latin1'), etag):
+            await send_response(send, 304, headers, b'')
+            return
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        await send_response(send, 200, headers + [('Content-type', page.content_type),
+                                                  ('Content-Length', str(len(body)))], body)
+
+
+def create_app(broadcast=None):
+    """
+    Build the application and its GMAT integration. ``broadcast`` defaults
+    to GMAT_BROADCAST=1; GMAT_RECORD names a scenario recording to append
+    to and SCENARIO_DIR holds the ones to replay.
+    """
+    if broadcast is None:
+        broadcast = os.environ.get("GMAT_BROADCAST") == "1"
+    recorder = ScenarioRecorder(os.environ["GMAT_RECORD"]) if os.environ.get("GMAT_RECORD") else None
+    return AsteroidSimASGI(GMATIntegration(broadcast=broadcast, recorder=recorder,
+                                           scenario_dir=os.environ.get("SCENARIO_DIR", SCENARIO_DIR)))
+
+
+_app = None
+
+
+def __getattr__(name):
+    # ``asgi:app`` is built on first access, so main() can build its own instead
+    global _app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the simulator, GMAT stream and physics bridge in one process")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--broadcast", action="store_true",
+                        help="share one GMAT stream between all clients")
+    args = parser.parse_args()
+
+    server_app = create_app(broadcast=True if args.broadcast else None)
+    log.info("server_started", url=f"http://{args.host}:{args.port}", broadcast=args.broadcast)
+    uvicorn.run(server_app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
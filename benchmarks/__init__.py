@@ -0,0 +1,12 @@
+# benchmarks/__init__.py
+"""
+Regression benchmarks for the simulator's hot paths.
+
+    python -m benchmarks                       # run everything, print a table
+    python -m benchmarks -k elements --quick   # a subset, smallest sizes only
+    python -m benchmarks --save-baseline       # record benchmarks/baseline.json
+    python -m benchmarks --threshold 0.15      # fail on >15% slowdowns
+
+Results are written as JSON and compared against the stored baseline;
+the exit status is 1 when any case got slower than the threshold allows.
+"""
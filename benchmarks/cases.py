@@ -0,0 +1,184 @@
+# benchmarks/cases.py
+"""
+The benchmark cases. Trajectories are synthetic, built from the same
+curve as GMATIntegration.generate_sample_data, so no GMAT output is needed.
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from benchmarks.runner import benchmark
+from benchmarks.sbdb_stub import StubSBDBServer
+from gmat_integration import GMATIntegration
+from http_gmat_bridge import PhysicsBridge
+from orbit_propagator import solve_kepler
+from sbdb_service import SBDBService
+
+
+def synthetic_trajectory(n):
+    """(n, 6) states along generate_sample_data's curve, extended to n points"""
+    t = np.arange(n) * 0.1
+    return np.stack([
+        20000 * np.cos(t), 15000 * np.sin(t), 5000 * np.sin(t * 0.5),
+        -2000 * np.sin(t), 1500 * np.cos(t), 500 * np.cos(t * 0.5),
+    ], axis=1)
+
+
+def write_trajectory(path, states):
+    """Write states as a GMAT ReportFile: a header line, then whitespace separated rows"""
+    with open(path, 'w') as f:
+        f.write("Asteroid.EarthMJ2000Eq.X Asteroid.EarthMJ2000Eq.Y Asteroid.EarthMJ2000Eq.Z "
+                "Asteroid.EarthMJ2000Eq.VX Asteroid.EarthMJ2000Eq.VY Asteroid.EarthMJ2000Eq.VZ\n")
+        np.savetxt(f, states, fmt='%.12f')
+
+
+def presets(n):
+    return {f"Stub {k}": str(2000000 + k) for k in range(n)}
+
+
+@benchmark('kepler/solve_kepler', sizes=(1_000, 100_000, 1_000_000))
+def kepler_solve(size):
+    rng = np.random.default_rng(0)
+    M = rng.uniform(0, 2 * np.pi, size)
+    e = rng.uniform(0, 0.95, size)
+    yield lambda: solve_kepler(M, e)
+
+
+@benchmark('elements/scalar', sizes=(100, 1_000, 10_000))
+def elements_scalar(size):
+    integration = GMATIntegration()
+    states = synthetic_trajectory(size).tolist()
+    yield lambda: [integration.gmat_to_orbital_elements(state) for state in states]
+
+
+@benchmark('elements/batch', sizes=(1_000, 100_000, 1_000_000))
+def elements_batch(size):
+    integration = GMATIntegration()
+    states = synthetic_trajectory(size)
+    yield lambda: integration.gmat_to_orbital_elements_batch(states)
+
+
+@benchmark('trajectory/read_cold', sizes=(10_000, 100_000, 1_000_000))
+def trajectory_read_cold(size):
+    """Parse the text file and write the .npy sidecar, as on first use"""
+    workdir = tempfile.mkdtemp(prefix="bench-trajectory-")
+    path = os.path.join(workdir, "AsteroidTrajectory.txt")
+    write_trajectory(path, synthetic_trajectory(size))
+    integration = GMATIntegration()
+
+    def read():
+        integration._trajectories.clear()
+        for sidecar in integration._trajectory_cache_paths(path):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+        return integration.read_gmat_trajectory(path)
+
+    try:
+        yield read
+    finally:
+        shutil.rmtree(workdir)
+
+
+@benchmark('trajectory/read_warm', sizes=(10_000, 100_000, 1_000_000))
+def trajectory_read_warm(size):
+    """Open the existing .npy sidecar in a fresh process-level cache and touch every row"""
+    workdir = tempfile.mkdtemp(prefix="bench-trajectory-")
+    path = os.path.join(workdir, "AsteroidTrajectory.txt")
+    write_trajectory(path, synthetic_trajectory(size))
+    integration = GMATIntegration()
+    integration.read_gmat_trajectory(path)
+
+    def read():
+        integration._trajectories.clear()
+        return float(integration.read_gmat_trajectory(path)[:, 0].sum())
+
+    try:
+        yield read
+    finally:
+        shutil.rmtree(workdir)
+
+
+@benchmark('trajectory/lod_query', sizes=(100_000, 1_000_000))
+def trajectory_lod_query(size):
+    """1000-point views of shifting windows, index already built"""
+    integration = GMATIntegration(trajectory=synthetic_trajectory(size))
+    index = integration.trajectory_index()
+    windows = [(start, start + size // 10) for start in range(0, size - size // 10, size // 100)]
+    yield lambda: [index.query(start, stop, 1000) for start, stop in windows]
+
+
+@benchmark('frames/json', sizes=(1_000, 10_000, 100_000))
+def frames_json(size):
+    """One JSON message per point, as send_gmat_data streams by default"""
+    integration = GMATIntegration()
+    states = synthetic_trajectory(size)
+    yield lambda: sum(count for _, count in integration.iter_gmat_frames(states, 'json', 1))
+
+
+@benchmark('frames/json_batch64', sizes=(1_000, 10_000, 100_000))
+def frames_json_batched(size):
+    integration = GMATIntegration()
+    states = synthetic_trajectory(size)
+    yield lambda: sum(count for _, count in integration.iter_gmat_frames(states, 'json', 64))
+
+
+@benchmark('frames/binary_batch64', sizes=(1_000, 10_000, 100_000))
+def frames_binary_batched(size):
+    integration = GMATIntegration()
+    states = synthetic_trajectory(size)
+    yield lambda: sum(count for _, count in integration.iter_gmat_frames(states, 'binary', 64))
+
+
+@benchmark('bridge/generate_orbital_elements', sizes=(100, 1_000, 10_000))
+def bridge_orbital_elements(size):
+    """Successive /gmat-data polls, including the JSON encoding of each response"""
+    bridge = PhysicsBridge()
+    yield lambda: [json.dumps(bridge.generate_orbital_elements(counter)) for counter in range(size)]
+
+
+@benchmark('sbdb/get_many_cold', sizes=(8, 32, 128))
+def sbdb_cold(size):
+    """Preset fetch against the local stub with every record missing from the cache"""
+    with StubSBDBServer() as stub:
+        def fetch():
+            service = SBDBService(base_url=stub.url, cache_dir=None)
+            try:
+                return service.get_many(presets(size))
+            finally:
+                service.executor.shutdown()
+        yield fetch
+
+
+@benchmark('sbdb/get_many_async_cold', sizes=(8, 32, 128))
+def sbdb_async_cold(size):
+    """The same fetch on one event loop over a pooled async client (needs httpx)"""
+    try:
+        import httpx
+    except ImportError:
+        yield lambda: None
+        return
+    with StubSBDBServer() as stub:
+        async def fetch():
+            service = SBDBService(base_url=stub.url, cache_dir=None)
+            try:
+                async with httpx.AsyncClient(limits=httpx.Limits(max_connections=16)) as client:
+                    return await service.get_many_async(presets(size), client)
+            finally:
+                service.executor.shutdown()
+        yield lambda: asyncio.run(fetch())
+
+
+@benchmark('sbdb/get_many_warm', sizes=(8, 128))
+def sbdb_warm(size):
+    """Preset fetch served entirely from the in-memory cache"""
+    with StubSBDBServer() as stub:
+        service = SBDBService(base_url=stub.url, cache_dir=None)
+        service.get_many(presets(size))
+        try:
+            yield lambda: service.get_many(presets(size))
+        finally:
+            service.executor.shutdown()
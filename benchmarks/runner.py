@@ -0,0 +1,185 @@
+# benchmarks/runner.py
+"""
+Benchmark registry, timing, JSON results and baseline comparison.
+
+A case is a generator function taking an input size: it does its setup,
+yields the zero-argument callable to time, and cleans up after the yield.
+Each case is timed with timeit's autorange (at least 0.2 s per repeat) and
+summarized by the median and best time per call.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+BENCHMARKS = {}  # name -> (case, sizes)
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.20  # fractional slowdown of the median that counts as a regression
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+
+
+def benchmark(name, sizes):
+    """Register a case under ``name``, to be run at each input size"""
+    def register(case):
+        BENCHMARKS[name] = (case, tuple(sizes))
+        return case
+    return register
+
+
+def result_key(name, size):
+    return f"{name}[{size}]"
+
+
+def time_case(case, size, repeat=DEFAULT_REPEAT):
+    """Median and best seconds per call of one case at one size"""
+    setup = case(size)
+    try:
+        fn = next(setup)
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        runs = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    finally:
+        setup.close()
+    median = float(np.median(runs))
+    return {
+        'size': size,
+        'median_s': median,
+        'best_s': min(runs),
+        'items_per_s': size / median if median > 0 else None,
+        'loops': number,
+        'repeat': repeat,
+    }
+
+
+def run(pattern=None, quick=False, repeat=DEFAULT_REPEAT, log=print):
+    """Run the selected cases; returns {result key: result}"""
+    from benchmarks import cases  # noqa: F401 (registers the cases)
+
+    results = {}
+    for name, (case, sizes) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in sizes[:1] if quick else sizes:
+            result = time_case(case, size, repeat)
+            results[result_key(name, size)] = result
+            log(f"  {result_key(name, size):<40} {format_seconds(result['median_s']):>10}")
+    return results
+
+
+def environment():
+    """What the numbers were measured on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save(path, results):
+    with open(path, "w") as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    (key, current, baseline, change) rows for every case in both runs,
+    with change the fractional change of the median time, plus the keys
+    whose change exceeds ``threshold``.
+    """
+    rows, regressions = [], []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            rows.append((key, result['median_s'], None, None))
+            continue
+        change = result['median_s'] / before['median_s'] - 1
+        rows.append((key, result['median_s'], before['median_s'], change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def print_comparison(rows, threshold):
+    print(f"\n{'case':<40} {'median':>10} {'baseline':>10} {'change':>8}")
+    for key, current, before, change in rows:
+        if before is None:
+            print(f"{key:<40} {format_seconds(current):>10} {'-':>10} {'new':>8}")
+            continue
+        flag = "  << slower" if change > threshold else ("  faster" if change < -threshold else "")
+        print(f"{key:<40} {format_seconds(current):>10} {format_seconds(before):>10} {change:>+7.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the regression benchmarks")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="smallest input size of each case only")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write this run's results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional slowdown that fails the run (default %(default)s)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        from benchmarks import cases  # noqa: F401
+        for name, (_, sizes) in BENCHMARKS.items():
+            print(f"{name:<32} sizes {', '.join(map(str, sizes))}")
+        return
+
+    print(f"Running benchmarks ({'quick, ' if args.quick else ''}{args.repeat} repeats)...")
+    results = run(args.pattern, args.quick, args.repeat)
+    save(args.output, results)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        # Keep the cases this run skipped
+        stored = (load(args.baseline) or {}).get('results', {})
+        stored.update(results)
+        save(args.baseline, stored)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = load(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    rows, regressions = compare(results, baseline.get('results', {}), args.threshold)
+    print_comparison(rows, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
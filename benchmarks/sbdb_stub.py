@@ -0,0 +1,61 @@
+# benchmarks/sbdb_stub.py
+"""
+Local stand-in for the JPL SBDB API, so the preset fetch path can be
+timed without the network. Every lookup answers with the same canned
+record after a fixed delay that mimics the round trip to JPL.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_LATENCY = 0.05  # s per request, roughly a JPL round trip
+
+
+def sbdb_payload(spk_id):
+    """An sbdb.api response body in the shape extract_sbdb_fields reads"""
+    elements = {'a': '1.126', 'e': '0.2037', 'i': '6.035', 'om': '2.061', 'w': '66.22', 'ma': '101.7'}
+    return {
+        'object': {'spkid': spk_id, 'fullname': f"{spk_id} Stub", 'neo': True, 'pha': False},
+        'orbit': {
+            'epoch': '2455562.5',
+            'elements': [{'name': name, 'value': value} for name, value in elements.items()],
+        },
+        'physical_parameters': [{'name': 'diameter', 'value': '490'}],
+    }
+
+
+class StubSBDBHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        spk_id = parse_qs(urlparse(self.path).query).get('sstr', ['0'])[0]
+        body = json.dumps(sbdb_payload(spk_id)).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubSBDBServer(ThreadingHTTPServer):
+    """Threaded stub on a free local port; use as a context manager"""
+
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops bursts of concurrent connects
+
+    def __init__(self, latency=DEFAULT_LATENCY):
+        super().__init__(('127.0.0.1', 0), StubSBDBHandler)
+        self.latency = latency
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/sbdb.api"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,501 @@
+# conjunction.py
+"""
+Close-approach screening over many propagated objects.
+
+"Which objects pass within d of Earth (or of each other) between t0 and
+t1" is answered in stages, each cheaper than the next and each only
+seeing what the previous one let through:
+
+1. apsis filter: an orbit whose perihelion-aphelion band, widened by d,
+   misses the target's band can never come close
+2. orbit-path filter: the orbit must also come within d of the target's
+   orbital plane somewhere inside that radial band
+3. time grid: survivors are propagated on a shared time grid. Against a
+   target, each sample is a distance check; between objects, positions
+   are hashed into cubic cells per time sample, so only objects in the
+   same or neighbouring cells are ever compared
+4. refinement: Newton iterations on the two-body relative motion find
+   the time of closest approach near each candidate sample
+
+A sample is a candidate when straight-line relative motion, allowed to
+bend by the largest two-body acceleration either object feels, could
+bring the pair within d inside half a step of it; the real encounter
+always lies within half a step of some sample, so none is lost. Units
+are AU and days with JD times; elements are (N, 6) rows
+[a, e, i, raan, argp, M0] in AU and radians.
+
+    python conjunction.py --synthetic 100000 --distance-km 7.5e6 --days 365
+    python conjunction.py catalog.json --pairs --distance-km 1e6
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from monte_carlo import AU_KM, EARTH_ELEMENTS, ELEMENT_ORDER, J2000, MU_SUN_AU
+from orbit_propagator import MU_EARTH, elements_to_state, mean_motion
+
+DEFAULT_DISTANCE_KM = 7.5e6       # screening against Earth
+DEFAULT_PAIR_DISTANCE_KM = 1e6    # screening objects against each other
+MIN_STEP = 0.5      # days, smallest automatic grid step
+MAX_STEP = 5.0      # days, largest automatic grid step
+GRID_STATES = 2_000_000  # object-samples propagated per grid batch
+PATH_SAMPLES = 128  # eccentric anomalies checked by the orbit-path filter
+PATH_CHUNK = 4096   # orbits per orbit-path filter call
+REFINE_ITERATIONS = 5  # Newton steps towards each closest approach
+REFINE_CHUNK = 16384   # candidates per refinement call
+PAIR_CHUNK = 2_000_000  # object pairs expanded and checked at once
+
+MAX_CELL_KEYS = 2 ** 62  # (sample, cell) keys must fit an int64
+# Half of the 26 neighbouring cells, as (first, last) of runs of consecutive keys (z
+# varies fastest); the other half is covered from the far side
+NEIGHBOUR_RUNS = [((0, 0, 1), (0, 0, 1))] + [((dx, dy, -1), (dx, dy, 1))
+                                             for dx, dy in ((0, 1), (1, -1), (1, 0), (1, 1))]
+
+ENCOUNTER_COLUMNS = ('i', 'j', 'miss', 'tca', 'speed')
+
+
+def julian_date(timestamp=None):
+    """JD of a Unix timestamp (now by default)"""
+    return (time.time() if timestamp is None else timestamp) / 86400.0 + 2440587.5
+
+
+class OrbitCatalog:
+    """Osculating elements of N objects around one central body"""
+
+    def __init__(self, names, elements, epochs, mu=MU_SUN_AU):
+        self.names = list(names)
+        self.elements = np.asarray(elements, dtype=np.float64).reshape(-1, 6)
+        self.epochs = np.broadcast_to(np.asarray(epochs, dtype=np.float64), (len(self.elements),)).copy()
+        self.mu = mu
+        self.mean_motion = mean_motion(self.elements[:, 0], mu)
+
+    def __len__(self):
+        return len(self.elements)
+
+    @classmethod
+    def from_records(cls, records):
+        """Catalog of the SBDB records (as built by sbdb_service) that carry an "orbit" dict"""
+        orbits = [(record['name'], record['orbit']) for record in records if record.get('orbit')]
+        elements = [[orbit['a'], orbit['e']] + [math.radians(orbit[key]) for key in ELEMENT_ORDER[2:]]
+                    for _, orbit in orbits]
+        epochs = [orbit.get('epoch') or J2000 for _, orbit in orbits]
+        return cls([name for name, _ in orbits], elements, epochs)
+
+    @classmethod
+    def from_gmat(cls, names, elements, epoch, mu=MU_EARTH):
+        """
+        Catalog from gmat_to_orbital_elements(_batch) output (km, degrees)
+        around the body of ``mu`` (km^3/s^2). Lengths stay in km, times in days.
+        """
+        columns = [np.atleast_1d(np.asarray(elements[key], dtype=np.float64)) for key in ELEMENT_ORDER]
+        rows = np.stack(columns[:2] + [np.radians(c) for c in columns[2:]], axis=1)
+        return cls(names, rows, epoch, mu * 86400.0 ** 2)
+
+    def apsides(self):
+        """Periapsis and apoapsis distances"""
+        a, e = self.elements[:, 0], self.elements[:, 1]
+        return a * (1 - e), a * (1 + e)
+
+    def max_speeds(self):
+        """Periapsis speed, the fastest each object ever moves"""
+        a, e = self.elements[:, 0], self.elements[:, 1]
+        return np.sqrt(self.mu * (1 + e) / (a * (1 - e)))
+
+    def max_accelerations(self):
+        """Periapsis gravity, the largest acceleration each object feels"""
+        a, e = self.elements[:, 0], self.elements[:, 1]
+        return self.mu / (a * (1 - e)) ** 2
+
+    def plane_normals(self):
+        i, raan = self.elements[:, 2], self.elements[:, 3]
+        return np.stack([np.sin(i) * np.sin(raan), -np.sin(i) * np.cos(raan), np.cos(i)], axis=1)
+
+    def states(self, rows, times):
+        """
+        States of objects ``rows`` at JD ``times``: (len(rows), T, 6) for a
+        shared (T,) grid, or per-row times of shape (len(rows), T).
+        """
+        a, e, i, raan, argp, M0 = (self.elements[rows, k:k + 1] for k in range(6))
+        times = np.asarray(times, dtype=np.float64)
+        if times.ndim == 1:
+            times = times[None, :]
+        M = M0 + self.mean_motion[rows, None] * (times - self.epochs[rows, None])
+        return elements_to_state(a, e, i, raan, argp, M, self.mu)
+
+
+def earth_catalog():
+    """Earth's mean heliocentric orbit as a one-object target"""
+    return OrbitCatalog(['Earth'], [[EARTH_ELEMENTS[key] for key in ELEMENT_ORDER]], J2000)
+
+
+def synthetic_catalog(n, seed=None):
+    """NEO-like random catalog (perihelia inside 1.3 AU) for timing runs"""
+    rng = np.random.default_rng(seed)
+    q = rng.uniform(0.3, 1.3, n)
+    e = rng.uniform(0.0, 0.7, n)
+    elements = np.stack([
+        q / (1 - e), e, np.radians(rng.rayleigh(10.0, n)),
+        rng.uniform(0, 2 * np.pi, n), rng.uniform(0, 2 * np.pi, n), rng.uniform(0, 2 * np.pi, n),
+    ], axis=1)
+    return OrbitCatalog([f"synthetic-{k}" for k in range(n)], elements, J2000)
+
+
+def apsis_filter(catalog, target, distance):
+    """Objects whose radial band, widened by ``distance``, overlaps a target's band"""
+    q, Q = catalog.apsides()
+    target_q, target_Q = target.apsides()
+    keep = np.zeros(len(catalog), dtype=bool)
+    for tq, tQ in zip(target_q, target_Q):
+        keep |= (q - distance <= tQ) & (Q + distance >= tq)
+    return np.flatnonzero(keep)
+
+
+def orbit_path_filter(catalog, rows, target, distance):
+    """
+    Of ``rows``, the objects whose orbit passes within ``distance`` of a
+    target's orbital plane at a radius inside the target's band.
+
+    The orbit is sampled at PATH_SAMPLES eccentric anomalies; consecutive
+    samples are at most a * pi / PATH_SAMPLES from any point between them,
+    and both tests are widened by that much so no orbit is wrongly dropped.
+    """
+    target_q, target_Q = target.apsides()
+    normals = target.plane_normals()
+    E = np.linspace(0.0, 2 * np.pi, PATH_SAMPLES, endpoint=False)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    kept = []
+    for lo in range(0, len(rows), PATH_CHUNK):
+        chunk = rows[lo:lo + PATH_CHUNK]
+        a, e, i, raan, argp = (catalog.elements[chunk, k:k + 1] for k in range(5))
+        x_pf = a * (cos_E - e)
+        y_pf = a * np.sqrt(1 - e * e) * sin_E
+        cO, sO, co, so, ci, si = np.cos(raan), np.sin(raan), np.cos(argp), np.sin(argp), np.cos(i), np.sin(i)
+        p = np.stack([cO * co - sO * so * ci, sO * co + cO * so * ci, so * si], axis=-1)
+        q = np.stack([-cO * so - sO * co * ci, -sO * so + cO * co * ci, co * si], axis=-1)
+        positions = x_pf[..., None] * p + y_pf[..., None] * q  # (chunk, PATH_SAMPLES, 3)
+        radius = np.linalg.norm(positions, axis=-1)
+        pad = distance + a * np.pi / PATH_SAMPLES
+        keep = np.zeros(len(chunk), dtype=bool)
+        for normal, tq, tQ in zip(normals, target_q, target_Q):
+            near = (np.abs(positions @ normal) <= pad) & (radius >= tq - pad) & (radius <= tQ + pad)
+            keep |= near.any(axis=1)
+        kept.append(chunk[keep])
+    return np.concatenate(kept) if kept else np.empty(0, dtype=np.int64)
+
+
+def grid_step(distance, speed):
+    """Automatic grid step: objects at ``speed`` move about ``distance`` per step"""
+    if speed <= 0:
+        return MAX_STEP
+    return float(np.clip(distance / speed, MIN_STEP, MAX_STEP))
+
+
+def _grid_batches(n, times):
+    """Slices of the time grid holding about GRID_STATES object-samples each"""
+    per_batch = max(GRID_STATES // max(n, 1), 1)
+    return [times[lo:lo + per_batch] for lo in range(0, len(times), per_batch)]
+
+
+def may_close(rel, accel, distance, half):
+    """
+    Whether relative states ``rel`` (..., 6) can come within ``distance``
+    inside +/- ``half`` days: straight-line motion may bend by at most
+    accel * half^2 / 2 when the relative acceleration stays below ``accel``.
+    """
+    r, v = rel[..., :3], rel[..., 3:]
+    v2 = np.einsum('...c,...c->...', v, v)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dt = np.clip(-np.einsum('...c,...c->...', r, v) / v2, -half, half)
+    dt = np.where(v2 > 0, dt, 0.0)
+    miss = np.linalg.norm(r + v * dt[..., None], axis=-1)
+    return miss <= distance + accel * half ** 2 / 2
+
+
+def target_candidates(catalog, rows, target, times, distance, step):
+    """
+    (object, target, sample time) triples where a closer-than-``distance``
+    encounter may lie within half a step of a grid sample.
+    """
+    accels = catalog.max_accelerations()[rows]
+    target_accels = target.max_accelerations()
+    found = []
+    for batch in _grid_batches(len(rows), times):
+        states = catalog.states(rows, batch)
+        for t, target_states in enumerate(target.states(np.arange(len(target)), batch)):
+            close = may_close(states - target_states[None], (accels + target_accels[t])[:, None],
+                              distance, step / 2)
+            obj, sample = np.nonzero(close)
+            found.append(np.stack([rows[obj], np.full(len(obj), t), batch[sample]], axis=1))
+    return np.concatenate(found) if found else np.empty((0, 3))
+
+
+def _cell_keys(positions, samples, cell):
+    """
+    Lexicographic int64 keys of (sample, cell x, cell y, cell z), with a
+    spare cell on every side, and the (first, last) key offsets of each
+    NEIGHBOUR_RUNS run. The cell size grows if the grid would not fit the key.
+    """
+    low = positions.min(axis=0)
+    extent = positions.max(axis=0) - low
+    per_sample = MAX_CELL_KEYS / (samples.max() + 1)
+    while np.prod(np.floor(extent / cell) + 3) > per_sample:
+        cell *= 2
+    shape = (np.floor(extent / cell) + 3).astype(np.int64)
+    cells = np.floor((positions - low) / cell).astype(np.int64) + 1
+    strides = np.array([shape[1] * shape[2], shape[2], 1], dtype=np.int64)
+    keys = samples.astype(np.int64) * int(np.prod(shape)) + cells @ strides
+    return keys, [(int(np.dot(first, strides)), int(np.dot(last, strides))) for first, last in NEIGHBOUR_RUNS]
+
+
+def _expand_ranges(items, lo, hi):
+    """Pairs (item, position) for every position in [lo, hi) of each item"""
+    counts = hi - lo
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    return np.repeat(items, counts), starts + np.arange(total)
+
+
+def _find_cells(cells, bounds, first, last):
+    """
+    Sorted item range [lo, hi) of the occupied cells with keys in
+    [first, last], for sorted queries. Only the slice of ``cells`` the
+    queries can reach is searched, which keeps the lookups in cache.
+    """
+    a = np.searchsorted(cells, first[0])
+    window = cells[a:np.searchsorted(cells, last[-1], side='right')]
+    return bounds[a + np.searchsorted(window, first)], bounds[a + np.searchsorted(window, last, side='right')]
+
+
+def _chunks(counts, size):
+    """Item ranges [lo, hi) whose counts add up to about ``size`` (at least one item each)"""
+    total = np.cumsum(counts)
+    edges = np.searchsorted(total, np.arange(size, total[-1], size), side='left') + 1 if len(total) else []
+    edges = np.unique(np.concatenate([[0], edges, [len(counts)]]).astype(np.int64))
+    return zip(edges[:-1], edges[1:])
+
+
+def pair_candidates(catalog, rows, times, distance, step):
+    """
+    (object, object, sample time) triples of objects near each other at a
+    grid sample, found through a hash grid of cubic cells per sample.
+    Cells are as wide as the largest separation that may still hide a
+    closer-than-``distance`` encounter, so only neighbouring cells are
+    paired. Pairs are expanded and checked PAIR_CHUNK at a time.
+    """
+    if len(rows) < 2:
+        return np.empty((0, 3))
+    speeds = catalog.max_speeds()[rows]
+    accels = catalog.max_accelerations()[rows]
+    half = step / 2
+    cell = distance + speeds.max() * step + accels.max() * half ** 2
+    found = []
+    for batch in _grid_batches(len(rows), times):
+        states = catalog.states(rows, batch).transpose(1, 0, 2).reshape(-1, 6)
+        positions = states[:, :3]
+        samples = np.repeat(np.arange(len(batch)), len(rows))
+        objects = np.tile(np.arange(len(rows)), len(batch))
+        keys, neighbour_runs = _cell_keys(positions, samples, cell)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        # Everything below works on sorted positions, so gathers stay close together
+        objects = objects[order]
+        states = states[order]
+        positions = states[:, :3]
+
+        # Runs of items sharing a cell; neighbours are looked up once per occupied cell
+        new_cell = np.ones(len(order), dtype=bool)
+        new_cell[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        starts = np.flatnonzero(new_cell)
+        bounds = np.append(starts, len(order))
+        cells = sorted_keys[starts]
+        cell_of = np.cumsum(new_cell) - 1
+        ends = bounds[cell_of + 1]
+
+        # Pairs per item, estimated as if its 13 neighbouring cells were as full as its own
+        items = np.arange(len(order))
+        for a, b in _chunks((ends - starts[cell_of]) * 14, PAIR_CHUNK):
+            mine = items[a:b]
+            first_cell, last_cell = cell_of[a], cell_of[b - 1] + 1
+            local = cell_of[a:b] - first_cell
+            # Same cell: each item pairs with the items after it in its run
+            pairs = [_expand_ranges(mine, mine + 1, ends[a:b])]
+            for first_offset, last_offset in neighbour_runs:
+                lo, hi = _find_cells(cells, bounds, cells[first_cell:last_cell] + first_offset,
+                                     cells[first_cell:last_cell] + last_offset)
+                pairs.append(_expand_ranges(mine, lo[local], hi[local]))
+            first = np.concatenate([p[0] for p in pairs])
+            second = np.concatenate([p[1] for p in pairs])
+            i, j = objects[first], objects[second]
+
+            # Positions alone rule out most pairs: closing to ``distance`` within half a
+            # step needs a separation below it plus the most both can move meanwhile
+            rel = positions[first] - positions[second]
+            reach = distance + (speeds[i] + speeds[j]) * half + (accels[i] + accels[j]) * half ** 2 / 2
+            near = np.einsum('nc,nc->n', rel, rel) <= reach ** 2
+            first, second, i, j = first[near], second[near], i[near], j[near]
+
+            keep = may_close(states[first] - states[second], accels[i] + accels[j], distance, half)
+            sample, i, j = samples[order[first[keep]]], rows[i[keep]], rows[j[keep]]
+            found.append(np.stack([np.minimum(i, j), np.maximum(i, j), batch[sample]], axis=1))
+    if not found:
+        return np.empty((0, 3))
+    return np.unique(np.concatenate(found), axis=0)
+
+
+def _relative_motion(catalog, other, i, j, t):
+    """Relative position, velocity and two-body acceleration of pairs (i, j) at times t"""
+    first, second = catalog.states(i, t[:, None])[:, 0], other.states(j, t[:, None])[:, 0]
+    accel = (-catalog.mu * first[:, :3] / np.linalg.norm(first[:, :3], axis=1, keepdims=True) ** 3
+             + other.mu * second[:, :3] / np.linalg.norm(second[:, :3], axis=1, keepdims=True) ** 3)
+    return first[:, :3] - second[:, :3], first[:, 3:] - second[:, 3:], accel
+
+
+def refine(catalog, other, candidates, step, start, stop):
+    """
+    Closest approach near each candidate: Newton's method on
+    d/dt |r|^2 / 2 = r.v, with the two-body accelerations in the
+    derivative, starting at the sample and kept within +/- one step of it
+    (and inside [start, stop]). ``other`` holds the second object of each
+    pair (the target catalog, or ``catalog`` itself).
+
+    An iteration that ends on the edge of its window has not found a
+    minimum: the sample nearest the real minimum is a candidate of its
+    own. Such rows are dropped unless the edge is ``start`` or ``stop``.
+    Returns (n, 5) rows of ENCOUNTER_COLUMNS.
+    """
+    out = []
+    for lo in range(0, len(candidates), REFINE_CHUNK):
+        chunk = candidates[lo:lo + REFINE_CHUNK]
+        i, j = chunk[:, 0].astype(np.int64), chunk[:, 1].astype(np.int64)
+        low = np.maximum(chunk[:, 2] - step, start)
+        high = np.minimum(chunk[:, 2] + step, stop)
+        t = chunk[:, 2].copy()
+        for _ in range(REFINE_ITERATIONS):
+            r, v, accel = _relative_motion(catalog, other, i, j, t)
+            v2 = np.einsum('nc,nc->n', v, v)
+            curvature = v2 + np.einsum('nc,nc->n', r, accel)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Far from a minimum the curvature can turn negative: step as if the motion were straight
+                dt = -np.einsum('nc,nc->n', r, v) / np.where(curvature > 0, curvature, v2)
+            t = np.clip(t + np.where(np.isfinite(dt), dt, 0.0), low, high)
+        r, v, _ = _relative_motion(catalog, other, i, j, t)
+        minimum = ((t > low) & (t < high)) | (t <= start) | (t >= stop)
+        miss = np.linalg.norm(r, axis=1)
+        speed = np.linalg.norm(v, axis=1)
+        out.append(np.stack([i, j, miss, t, speed], axis=1)[minimum])
+    return np.concatenate(out) if out else np.empty((0, len(ENCOUNTER_COLUMNS)))
+
+
+def merge_encounters(encounters, step):
+    """One row per encounter: candidates of the same pair within a step of each other collapse to the closest"""
+    if not len(encounters):
+        return encounters
+    order = np.lexsort((encounters[:, 3], encounters[:, 1], encounters[:, 0]))
+    encounters = encounters[order]
+    new = np.ones(len(encounters), dtype=bool)
+    new[1:] = ((encounters[1:, 0] != encounters[:-1, 0]) | (encounters[1:, 1] != encounters[:-1, 1])
+               | (encounters[1:, 3] - encounters[:-1, 3] > step))
+    group = np.cumsum(new) - 1
+    best = np.lexsort((encounters[:, 2], group))
+    first = np.ones(len(best), dtype=bool)
+    first[1:] = group[best[1:]] != group[best[:-1]]
+    merged = encounters[best[first]]
+    return merged[np.argsort(merged[:, 3], kind='stable')]
+
+
+def screen(catalog, start, stop, distance, target=None, step=None):
+    """
+    Encounters closer than ``distance`` between JD ``start`` and ``stop``:
+    of each object with ``target`` (an OrbitCatalog, e.g. earth_catalog())
+    or, without a target, of every pair of objects in ``catalog``.
+
+    Returns a dict with 'encounters', an (n, 5) array of ENCOUNTER_COLUMNS
+    sorted by time, the grid 'step' and 'stages', the number of objects or
+    pairs left after each stage.
+    """
+    started = time.perf_counter()
+    stages = {'objects': len(catalog)}
+    rows = np.arange(len(catalog))
+    if target is not None:
+        rows = apsis_filter(catalog, target, distance)
+        stages['apsis_filter'] = len(rows)
+        rows = orbit_path_filter(catalog, rows, target, distance)
+        stages['orbit_path_filter'] = len(rows)
+
+    speeds = catalog.max_speeds()[rows]
+    if target is not None:
+        speeds = np.concatenate([speeds, target.max_speeds()])
+    if step is None:
+        step = grid_step(distance, float(np.median(speeds)) if len(speeds) else 0.0)
+    times = np.arange(start, stop + step, step) if stop > start else np.array([float(start)])
+
+    if target is not None:
+        candidates = target_candidates(catalog, rows, target, times, distance, step)
+    else:
+        candidates = pair_candidates(catalog, rows, times, distance, step)
+    stages['grid_candidates'] = len(candidates)
+
+    encounters = refine(catalog, target if target is not None else catalog, candidates, step, start, stop)
+    encounters = encounters[encounters[:, 2] <= distance]
+    encounters = merge_encounters(encounters, step)
+    stages['encounters'] = len(encounters)
+    return {
+        'encounters': encounters,
+        'step': step,
+        'stages': stages,
+        'elapsed_s': time.perf_counter() - started,
+    }
+
+
+def encounter_records(catalog, result, target=None, length_km=AU_KM):
+    """JSON-ready encounters; ``length_km`` converts catalog lengths to km"""
+    other = target if target is not None else catalog
+    return [{
+        'object': catalog.names[int(i)],
+        'other': other.names[int(j)],
+        'miss_distance_km': float(miss * length_km),
+        'time_jd': float(tca),
+        'relative_speed_km_s': float(speed * length_km / 86400.0),
+    } for i, j, miss, tca, speed in result['encounters']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a catalog for close approaches")
+    parser.add_argument("catalog", nargs="?", help="JSON list of SBDB records with orbit elements")
+    parser.add_argument("--synthetic", type=int, help="screen a random NEO-like catalog of this size instead")
+    parser.add_argument("--pairs", action="store_true", help="screen objects against each other, not Earth")
+    parser.add_argument("--distance-km", type=float,
+                        help=f"default {DEFAULT_DISTANCE_KM:g}, or {DEFAULT_PAIR_DISTANCE_KM:g} with --pairs")
+    parser.add_argument("--start", type=float, help="start JD (default: now)")
+    parser.add_argument("--days", type=float, default=365.0)
+    parser.add_argument("--step", type=float, help="grid step in days (default: automatic)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        catalog = synthetic_catalog(args.synthetic, args.seed)
+    elif args.catalog:
+        with open(args.catalog) as f:
+            catalog = OrbitCatalog.from_records(json.load(f))
+    else:
+        parser.error("give a catalog file or --synthetic N")
+
+    start = julian_date() if args.start is None else args.start
+    target = None if args.pairs else earth_catalog()
+    distance_km = args.distance_km or (DEFAULT_PAIR_DISTANCE_KM if args.pairs else DEFAULT_DISTANCE_KM)
+    result = screen(catalog, start, start + args.days, distance_km / AU_KM, target, args.step)
+    print(json.dumps({
+        'stages': result['stages'],
+        'step_days': result['step'],
+        'elapsed_s': round(result['elapsed_s'], 3),
+        'encounters': encounter_records(catalog, result, target)[:20],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
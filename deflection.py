@@ -0,0 +1,481 @@
+# deflection.py
+"""
+Kinetic-impactor deflection planning.
+
+A spacecraft of mass m striking a body of mass M at relative speed U
+changes the body's velocity by dv = beta * m * U / M, where beta >= 1 is
+the momentum enhancement from the ejecta. The planner sweeps the impact
+epoch (as a lead time before the nominal closest approach), the direction
+of dv and beta, and scores each candidate by the miss distance of the
+deflected two-body orbit at that encounter.
+
+Candidates pass two stages:
+
+1. linear screen: to first order the miss vector at closest approach is
+   m0 + J dv, with J the 3x3 sensitivity for the lead time, found by
+   central differences. A region (one lead time and beta) whose bound
+   |m0| + max |J u| dv cannot reach the best plans found so far is pruned
+   whole; surviving regions are then filtered candidate by candidate. The
+   bounds allow for twice the linearization error measured on random
+   probes.
+2. exact: survivors are kicked, turned back into elements and refined to
+   their new closest approach with Newton iterations (as in conjunction),
+   in vectorized chunks over a ProcessPoolExecutor; candidates and results
+   live in shared memory, so each task only carries a slice range.
+
+Units follow the body's OrbitCatalog: AU (or km) and days, with JD times.
+
+    python deflection.py --a 0.9224 --e 0.1911 --i 3.339 --raan 203.96 --argp 126.61 --M0 0 --mass 6.1e10
+"""
+import math
+import time
+
+import numpy as np
+
+from conjunction import OrbitCatalog, earth_catalog, julian_date
+from impact_effects import DEFAULT_DENSITY
+from monte_carlo import AU_KM, J2000, default_executor, impact_radius_au
+from orbit_propagator import R_EARTH, elements_to_state, mean_motion, state_to_elements
+from shared_jobs import SharedMemoryJob, run_slice
+
+DEFAULT_IMPACTOR_MASS = 580.0   # kg, DART at impact
+DEFAULT_IMPACTOR_SPEED = 6.1    # km/s, DART relative to Dimorphos
+DEFAULT_BETAS = (1.0, 2.0, 3.0, 4.0, 5.0)
+DEFAULT_LEAD_DAYS = (10.0, 3650.0, 10.0)  # start, stop, step
+DEFAULT_DIRECTION_STEP = 10.0   # degrees between kick directions
+DEFAULT_SEARCH_DAYS = 3650.0    # window searched for the nominal encounter
+DEFAULT_TOP = 10
+
+MAX_CANDIDATES = 5_000_000
+SCAN_STEP = 0.25        # days, largest step of the nominal encounter scan
+SCAN_PER_ORBIT = 64     # scan samples per orbital period, at least
+SCAN_CHUNK = 200_000    # samples per scan call
+WINDOW_STEPS = 4        # scan steps either side of the nominal encounter searched after a kick
+WINDOW_ROUNDS = 8       # times a window is moved on when the minimum lies beyond its edge
+REFINE_ITERATIONS = 8   # Newton steps towards each closest approach
+PROBES = 512            # candidates evaluated exactly to measure the linearization error
+ERROR_SAFETY = 2.0      # margin on the largest probe error
+TASK_SIZE = 20000       # candidates per pool task
+KERNEL_CHUNK = 4096     # candidates per vectorized kernel call
+
+INPUT_COLUMNS = ('impact_time', 'kick_x', 'kick_y', 'kick_z')
+RESULT_COLUMNS = ('miss_x', 'miss_y', 'miss_z', 'tca', 'speed')
+
+
+def body_mass(record, density=DEFAULT_DENSITY):
+    """Mass (kg) of an SBDB record, or of a sphere of its diameter (km) at ``density`` (kg/m^3)"""
+    if record.get('mass'):
+        return float(record['mass'])
+    if record.get('diameter'):
+        return density * math.pi / 6 * (record['diameter'] * 1000.0) ** 3
+    raise ValueError(f"No mass or diameter known for {record.get('name', 'this body')}")
+
+
+def _direction_grid(step_deg):
+    """(azimuths, elevations, whether the top elevation is the +90 pole) of the kick_directions grid"""
+    if not 0 < step_deg <= 90:
+        raise ValueError("direction step must be within (0, 90] degrees")
+    elevations = math.floor(180.0 / step_deg + 1e-9) + 1
+    return math.ceil(360.0 / step_deg - 0.5), elevations, (elevations - 1) * step_deg > 180.0 - 1e-7
+
+
+def direction_count(step_deg=DEFAULT_DIRECTION_STEP):
+    """Number of kick_directions(step_deg), without building them"""
+    azimuths, elevations, top_pole = _direction_grid(step_deg)
+    poles = 2 if top_pole else 1
+    return azimuths * (elevations - poles) + poles
+
+
+def kick_directions(step_deg=DEFAULT_DIRECTION_STEP):
+    """
+    (D, 2) azimuth and elevation (radians) on a ``step_deg`` grid, one
+    direction at each pole. Azimuth 0 is along the velocity, 90 away from
+    the central body; elevation 90 is along the orbit normal.
+    """
+    azimuths, elevations, top_pole = _direction_grid(step_deg)
+    az, el = np.meshgrid(np.radians(np.arange(azimuths) * step_deg),
+                         np.radians(np.arange(1, elevations - top_pole) * step_deg - 90.0))
+    top = [(0.0, math.pi / 2)] if top_pole else np.empty((0, 2))
+    return np.concatenate([[(0.0, -math.pi / 2)], np.column_stack([az.ravel(), el.ravel()]), top])
+
+
+def impact_frame(states):
+    """(n, 3, 3) unit vectors [along-track, outward in-plane, orbit normal] of states (n, 6)"""
+    along = states[:, 3:] / np.linalg.norm(states[:, 3:], axis=1, keepdims=True)
+    normal = np.cross(states[:, :3], states[:, 3:])
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+    return np.stack([along, np.cross(along, normal), normal], axis=1)
+
+
+def direction_vectors(frames, directions):
+    """(n, D, 3) kick unit vectors of every direction in every frame"""
+    az, el = directions[:, 0], directions[:, 1]
+    local = np.stack([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)], axis=1)
+    return np.einsum('dk,nkc->ndc', local, frames)
+
+
+class DeflectionProblem:
+    """
+    A body's nominal orbit and mass, and its closest approach to the
+    target (Earth's orbit, or the central body itself when ``target`` is
+    None) between ``start`` and ``stop``.
+    """
+
+    def __init__(self, body, mass, start, stop, target=None, length_km=AU_KM, name=None):
+        if len(body) != 1:
+            raise ValueError("Deflection planning needs exactly one body")
+        self.body = body
+        self.mass = float(mass)
+        if not (math.isfinite(self.mass) and self.mass > 0):
+            raise ValueError("body mass must be a positive number of kilograms")
+        self.start = float(start)
+        self.stop = float(stop)
+        self.target = target
+        self.length_km = length_km
+        self.name = name or body.names[0]
+        periods = [2 * math.pi / float(body.mean_motion[0])]
+        if target is not None:
+            periods.append(2 * math.pi / float(target.mean_motion[0]))
+        self.step = min(SCAN_STEP, min(periods) / SCAN_PER_ORBIT)
+        self.nominal = self._nominal_encounter()
+
+    @classmethod
+    def from_record(cls, record, start=None, days=DEFAULT_SEARCH_DAYS, mass=None):
+        """Heliocentric problem against Earth for an SBDB record (as built by sbdb_service)"""
+        if not record.get('orbit'):
+            raise ValueError(f"No orbital elements available for {record.get('name', 'this body')}")
+        start = julian_date() if start is None else start
+        mass = body_mass(record) if mass is None else mass
+        return cls(OrbitCatalog.from_records([record]), mass, start, start + days,
+                   earth_catalog(), AU_KM, record.get('name'))
+
+    @classmethod
+    def from_gmat(cls, elements, epoch=0.0, days=1.0, mass=None, name='GMAT object'):
+        """
+        Geocentric problem for gmat_to_orbital_elements output (km, degrees,
+        mass in kg): the miss distance is measured from Earth's centre.
+        ``epoch`` and the search window are in days.
+        """
+        body = OrbitCatalog.from_gmat([name], elements, epoch)
+        mass = float(np.atleast_1d(elements['mass'])[0]) if mass is None else mass
+        return cls(body, mass, epoch, epoch + days, None, 1.0, name)
+
+    @property
+    def mu(self):
+        return self.body.mu
+
+    def kick_scale(self):
+        """Catalog velocity units per km/s"""
+        return 86400.0 / self.length_km
+
+    def states_at(self, times):
+        """Nominal states (n, 6) of the body at JD ``times`` (n,)"""
+        return self.body.states([0], np.asarray(times, dtype=np.float64))[0]
+
+    def _target_motion(self, t):
+        if self.target is None:
+            zeros = np.zeros((len(t), 3))
+            return zeros, zeros, zeros
+        state = self.target.states([0], t)[0]
+        r = state[:, :3]
+        return r, state[:, 3:], -self.target.mu * r / np.linalg.norm(r, axis=1, keepdims=True) ** 3
+
+    def relative_motion(self, elements, epochs, t):
+        """Position, velocity and two-body acceleration relative to the target, for per-row elements"""
+        a, e, i, raan, argp, M0 = elements.T
+        state = elements_to_state(a, e, i, raan, argp, M0 + mean_motion(a, self.mu) * (t - epochs), self.mu)
+        r = state[:, :3]
+        accel = -self.mu * r / np.linalg.norm(r, axis=1, keepdims=True) ** 3
+        target_r, target_v, target_accel = self._target_motion(t)
+        return r - target_r, state[:, 3:] - target_v, accel - target_accel
+
+    def closest_approach(self, elements, epochs, guess, low, high):
+        """
+        Newton's method on d/dt |r|^2 / 2 = r.v from ``guess``, kept inside
+        [low, high]. Returns (n, 5) rows of RESULT_COLUMNS.
+        """
+        t = np.array(guess, dtype=np.float64)
+        for _ in range(REFINE_ITERATIONS):
+            r, v, accel = self.relative_motion(elements, epochs, t)
+            v2 = np.einsum('nc,nc->n', v, v)
+            curvature = v2 + np.einsum('nc,nc->n', r, accel)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Far from a minimum the curvature can turn negative: step as if the motion were straight
+                dt = -np.einsum('nc,nc->n', r, v) / np.where(curvature > 0, curvature, v2)
+            t = np.clip(t + np.where(np.isfinite(dt), dt, 0.0), low, high)
+        r, v, _ = self.relative_motion(elements, epochs, t)
+        return np.column_stack([r, t, np.linalg.norm(v, axis=1)])
+
+    def _nominal_encounter(self):
+        """The undeflected closest approach: a scan over [start, stop], then refinement"""
+        times = np.arange(self.start, self.stop + self.step / 2, self.step)
+        elements, epochs = self.body.elements[:1], self.body.epochs[:1]
+        best, best_t = math.inf, self.start
+        for lo in range(0, len(times), SCAN_CHUNK):
+            t = times[lo:lo + SCAN_CHUNK]
+            r, _, _ = self.relative_motion(np.repeat(elements, len(t), axis=0), np.repeat(epochs, len(t)), t)
+            dist2 = np.einsum('nc,nc->n', r, r)
+            k = int(np.argmin(dist2))
+            if dist2[k] < best:
+                best, best_t = float(dist2[k]), float(t[k])
+        low, high = max(best_t - self.step, self.start), min(best_t + self.step, self.stop)
+        return self.closest_approach(elements, epochs, [best_t], low, high)[0]
+
+    def approach(self, impact_times, kicks):
+        """
+        Closest approach near the nominal one after adding ``kicks`` (n, 3),
+        in catalog velocity units, to the velocity at ``impact_times`` (n,).
+        The search starts WINDOW_STEPS scan steps either side of the nominal
+        encounter and moves outwards while the minimum lies beyond an edge.
+        Returns (n, 5) rows of RESULT_COLUMNS.
+        """
+        impact_times = np.asarray(impact_times, dtype=np.float64)
+        states = self.states_at(impact_times)
+        states[:, 3:] += kicks
+        elements = state_to_elements(states, self.mu)
+        tca = self.nominal[3]
+        window = WINDOW_STEPS * self.step
+        low = np.full(len(states), max(tca - window, self.start))
+        high = np.full(len(states), min(tca + window, self.stop))
+        rows = self.closest_approach(elements, impact_times, np.full(len(states), tca), low, high)
+        # A large kick can move the encounter past the window: follow it outwards
+        for _ in range(WINDOW_ROUNDS):
+            early = (rows[:, 3] <= low) & (low > self.start)
+            late = (rows[:, 3] >= high) & (high < self.stop)
+            edge = early | late
+            if not edge.any():
+                break
+            high[early], low[early] = low[early], np.maximum(low[early] - window, self.start)
+            low[late], high[late] = high[late], np.minimum(high[late] + window, self.stop)
+            rows[edge] = self.closest_approach(elements[edge], impact_times[edge], rows[edge, 3],
+                                               low[edge], high[edge])
+        return rows
+
+    def impact_radius(self, speed):
+        """Distance (catalog units) below which the body hits Earth"""
+        if self.target is None:
+            return np.full(np.shape(speed), R_EARTH / self.length_km)
+        return impact_radius_au(np.asarray(speed) * AU_KM / self.length_km) * AU_KM / self.length_km
+
+
+def sensitivities(problem, impact_times, step):
+    """(E, 3, 3) derivative of the miss vector with respect to the kick at each impact time"""
+    n = len(impact_times)
+    offsets = np.concatenate([np.eye(3), -np.eye(3)]) * step
+    rows = problem.approach(np.repeat(impact_times, 6), np.tile(offsets, (n, 1)))
+    miss = rows[:, :3].reshape(n, 2, 3, 3)  # (time, sign, kick axis, miss component)
+    return np.transpose((miss[:, 0] - miss[:, 1]) / (2 * step), (0, 2, 1))
+
+
+def _run_task(problem, input_name, output_name, n, start, stop):
+    """Pool task: evaluate candidates[start:stop] from shared memory into the shared results"""
+    return run_slice(lambda candidates: problem.approach(candidates[:, 0], candidates[:, 1:]),
+                     input_name, output_name, n, len(INPUT_COLUMNS), len(RESULT_COLUMNS), start, stop,
+                     KERNEL_CHUNK)
+
+
+class DeflectionJob(SharedMemoryJob):
+    """One sweep of impact lead time, kick direction and beta for a DeflectionProblem"""
+
+    task_size = TASK_SIZE
+    output_columns = len(RESULT_COLUMNS)
+
+    def __init__(self, problem, impactor_mass=DEFAULT_IMPACTOR_MASS, impactor_speed=DEFAULT_IMPACTOR_SPEED,
+                 lead_days=None, betas=DEFAULT_BETAS, direction_step=DEFAULT_DIRECTION_STEP,
+                 top=DEFAULT_TOP, prune=True, seed=0):
+        if lead_days is None:
+            start, stop, step = DEFAULT_LEAD_DAYS
+            lead_days = np.arange(start, stop + step / 2, step)
+        self.problem = problem
+        self.impactor_mass = float(impactor_mass)
+        self.impactor_speed = float(impactor_speed)
+        self.betas = np.asarray(betas, dtype=np.float64).ravel()
+        self.top = max(int(top), 1)
+        self.prune = prune
+        self.seed = seed
+        if not (self.impactor_mass > 0 and self.impactor_speed > 0 and len(self.betas)
+                and np.all(self.betas > 0)):
+            raise ValueError("impactor mass, impactor speed and every beta must be positive")
+
+        # Impacts must fall inside the search window and before the encounter
+        lead_days = np.unique(np.asarray(lead_days, dtype=np.float64).ravel())
+        tca = problem.nominal[3]
+        lead_days = lead_days[(lead_days > 0) & (tca - lead_days >= problem.start)]
+        if not len(lead_days):
+            raise ValueError("No lead time puts the impact between the search start and the encounter")
+        self.lead_days = lead_days
+        self.impact_times = tca - lead_days
+        # Checked before the directions are built: a fine step makes millions of them
+        self.n = len(lead_days) * len(self.betas) * direction_count(direction_step)
+        if self.n > MAX_CANDIDATES:
+            raise ValueError(f"Sweep of {self.n} candidates exceeds the limit of {MAX_CANDIDATES}")
+        self.directions = kick_directions(direction_step)
+
+        # Velocity change of each beta, km/s and catalog units
+        self.delta_v = self.betas * self.impactor_mass * self.impactor_speed / problem.mass
+        self.kicks = self.delta_v * problem.kick_scale()
+        self.units = direction_vectors(impact_frame(problem.states_at(self.impact_times)), self.directions)
+
+    def _split(self, ids):
+        D, B = len(self.directions), len(self.betas)
+        return ids // (B * D), ids // D % B, ids % D
+
+    def _inputs(self, ids):
+        """(n, 4) rows of INPUT_COLUMNS for candidate ids"""
+        lead, beta, direction = self._split(ids)
+        kicks = self.kicks[beta, None] * self.units[lead, direction]
+        return np.column_stack([self.impact_times[lead], kicks])
+
+    def screen(self):
+        """
+        Linear stage: ids of the candidates that may rank among the best
+        plans overall or for their beta, and the stage counts.
+        """
+        started = time.perf_counter()
+        D, B = len(self.directions), len(self.betas)
+        stages = {'candidates': self.n, 'regions': len(self.lead_days) * B}
+        if not self.prune:
+            stages.update(regions_kept=stages['regions'], linear_kept=self.n)
+            return np.arange(self.n), stages, 0.0
+
+        m0 = self.problem.nominal[:3]
+        jacobians = sensitivities(self.problem, self.impact_times, float(self.kicks.max()))
+        gains = np.einsum('eij,edj->edi', jacobians, self.units)  # miss change per unit kick, (E, D, 3)
+        bounds = np.linalg.norm(m0) + np.linalg.norm(gains, axis=2).max(axis=1)[:, None] * self.kicks[None, :]
+
+        def linear(lead, beta):
+            return np.linalg.norm(m0 + self.kicks[beta] * gains[lead], axis=1)
+
+        # Linearization error on random candidates
+        rng = np.random.default_rng(self.seed)
+        probes = rng.choice(self.n, min(PROBES, self.n), replace=False)
+        lead, beta, direction = self._split(probes)
+        rows = self._inputs(probes)
+        exact = np.linalg.norm(self.problem.approach(rows[:, 0], rows[:, 1:])[:, :3], axis=1)
+        predicted = np.linalg.norm(m0 + self.kicks[beta, None] * gains[lead, direction], axis=1)
+        error = float(np.max(np.abs(exact - predicted)))
+        margin = 2 * ERROR_SAFETY * error
+
+        # Best-first over regions: a region is pruned once its bound falls below the plans already found
+        best = np.empty(0)
+        best_per_beta = np.full(B, -np.inf)
+        kept = []
+        order = np.argsort(-bounds, axis=None)
+        for region in order:
+            lead, beta = divmod(int(region), B)
+            kth = best.min() if len(best) >= self.top else -np.inf
+            if bounds[lead, beta] < min(kth, best_per_beta.min()) - margin:
+                break
+            if bounds[lead, beta] < min(kth, best_per_beta[beta]) - margin:
+                continue
+            values = linear(lead, beta)
+            best = np.concatenate([best, values])
+            if len(best) > self.top:
+                best = np.partition(best, -self.top)[-self.top:]
+            best_per_beta[beta] = max(best_per_beta[beta], values.max())
+            kept.append((region * D + np.arange(D), values))
+        stages['regions_kept'] = len(kept)
+
+        kth = best.min() if len(best) >= self.top else -np.inf
+        ids = np.concatenate([region_ids for region_ids, _ in kept])
+        values = np.concatenate([region_values for _, region_values in kept])
+        ids = ids[values >= np.minimum(kth, best_per_beta[self._split(ids)[1]]) - margin]
+        stages['linear_kept'] = len(ids)
+        stages['linear_s'] = round(time.perf_counter() - started, 4)
+        return ids, stages, error
+
+    def prepare(self):
+        """Screen and return the surviving candidates' INPUT_COLUMNS rows"""
+        self.ids, self.stages, self.error = self.screen()
+        self.m = len(self.ids)
+        return self._inputs(self.ids)
+
+    def task(self, input_name, output_name, start, stop):
+        return _run_task, (self.problem, input_name, output_name, self.m, start, stop)
+
+    def collect(self, results):
+        return self.summarize(results)
+
+    def plan(self, candidate, row):
+        """JSON-ready description of one evaluated candidate"""
+        lead, beta, direction = (int(x) for x in self._split(candidate))
+        miss = float(np.linalg.norm(row[:3]))
+        nominal = float(np.linalg.norm(self.problem.nominal[:3]))
+        length_km = self.problem.length_km
+        return {
+            'impact_jd': float(self.impact_times[lead]),
+            'lead_days': float(self.lead_days[lead]),
+            'azimuth_deg': round(math.degrees(self.directions[direction, 0]), 6),
+            'elevation_deg': round(math.degrees(self.directions[direction, 1]), 6),
+            'beta': float(self.betas[beta]),
+            'delta_v_mm_s': float(self.delta_v[beta] * 1e6),
+            'miss_distance_km': miss * length_km,
+            'miss_increase_km': (miss - nominal) * length_km,
+            'closest_approach_jd': float(row[3]),
+            'impacts': bool(miss < self.problem.impact_radius(row[4])),
+        }
+
+    def summarize(self, results):
+        problem = self.problem
+        miss = np.linalg.norm(results[:, :3], axis=1)
+        order = np.argsort(-miss, kind='stable')
+        betas = self._split(self.ids[order])[1]
+        first = np.unique(betas, return_index=True)[1]
+        nominal_miss = float(np.linalg.norm(problem.nominal[:3]))
+        self.stages['exact'] = self.m
+        return {
+            'body': problem.name,
+            'mass_kg': problem.mass,
+            'impactor_mass_kg': self.impactor_mass,
+            'impactor_speed_km_s': self.impactor_speed,
+            'nominal': {
+                'miss_distance_km': nominal_miss * problem.length_km,
+                'closest_approach_jd': float(problem.nominal[3]),
+                'relative_speed_km_s': float(problem.nominal[4]) * problem.length_km / 86400.0,
+                'impacts': bool(nominal_miss < problem.impact_radius(problem.nominal[4])),
+            },
+            'stages': self.stages,
+            'linear_error_km': self.error * problem.length_km,
+            'plans': [self.plan(self.ids[k], results[k]) for k in order[:self.top]],
+            'best_by_beta': [self.plan(self.ids[order[k]], results[order[k]]) for k in first],
+        }
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Kinetic-impactor deflection planning")
+    parser.add_argument("--a", type=float, default=0.9224, help="semi-major axis (AU)")
+    parser.add_argument("--e", type=float, default=0.1911)
+    parser.add_argument("--i", type=float, default=3.339, help="inclination (deg)")
+    parser.add_argument("--raan", type=float, default=203.96)
+    parser.add_argument("--argp", type=float, default=126.61)
+    parser.add_argument("--M0", type=float, default=0.0)
+    parser.add_argument("--epoch", type=float, default=J2000, help="JD (TDB)")
+    parser.add_argument("--mass", type=float, default=6.1e10, help="body mass (kg)")
+    parser.add_argument("--start", type=float, help="search start JD (default: epoch)")
+    parser.add_argument("--days", type=float, default=DEFAULT_SEARCH_DAYS)
+    parser.add_argument("--lead-step", type=float, default=DEFAULT_LEAD_DAYS[2], help="days between impact epochs")
+    parser.add_argument("--direction-step", type=float, default=DEFAULT_DIRECTION_STEP)
+    parser.add_argument("--beta", type=float, nargs="+", default=list(DEFAULT_BETAS))
+    parser.add_argument("--impactor-mass", type=float, default=DEFAULT_IMPACTOR_MASS)
+    parser.add_argument("--impactor-speed", type=float, default=DEFAULT_IMPACTOR_SPEED)
+    parser.add_argument("--no-prune", action="store_true", help="evaluate every candidate exactly")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    record = {'name': 'body', 'mass': args.mass,
+              'orbit': {k: getattr(args, k) for k in ('a', 'e', 'i', 'raan', 'argp', 'M0', 'epoch')}}
+    problem = DeflectionProblem.from_record(record, args.epoch if args.start is None else args.start, args.days)
+    lead_days = np.arange(args.lead_step, args.days + args.lead_step / 2, args.lead_step)
+    job = DeflectionJob(problem, args.impactor_mass, args.impactor_speed, lead_days, args.beta,
+                        args.direction_step, prune=not args.no_prune)
+    print(f"{job.n} candidates")
+    with default_executor(args.workers) as executor:
+        result = job.run(executor, lambda done, total: print(f"{done}/{total} exact evaluations"))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,170 @@
 # gmat_integration.py
+import itertools
 import json
 import math
+import os
+import struct
 import asyncio
 import websockets
 import threading
 import time
+import weakref
+import numpy as np
+from urllib.parse import urlparse, parse_qs
+
+from gmat_protocol import ELEMENT_FIELDS, MAX_BATCH, encode_frame, parse_stream_options
+from metrics import GMAT_CONVERSION_SECONDS, QUEUE_DEPTH, WEBSOCKET_CLIENTS, WEBSOCKET_SEND_SECONDS, start_metrics_server
+from monte_carlo import MonteCarloJob, default_executor
+from scenario_recorder import EXTENSION, KIND_EVENT, Scenario, ScenarioRecorder, event_message, state_columns
+from trajectory_index import TrajectoryIndex
+from trajectory_tail import HISTORY_ROWS, TrajectoryTail, make_watcher, parse_state_lines
+from sbdb_service import PRESET_ASTEROIDS, SBDBService
+from structured_logging import get_logger
+
+# Earth gravitational parameter (km^3/s^2)
+MU_EARTH = 3.986004418e5
+
+# Gravitational parameters (km^3/s^2) of central bodies selectable by name
+CENTRAL_BODIES = {
+    'earth': MU_EARTH,
+    'moon': 4.9028000661e3,
+    'sun': 1.32712440018e11,
+    'mars': 4.282837e4,
+    'jupiter': 1.26686534e8,
+}
+
+# Rows parsed per chunk when streaming a GMAT ReportFile
+TRAJECTORY_CHUNK_ROWS = 65536
+
+# Fixed size of the .npy header written for trajectory caches
+NPY_HEADER_SIZE = 128
+
+# Default trajectory streamed to clients and delay between frames (s)
+TRAJECTORY_FILE = 'AsteroidTrajectory.txt'
+FRAME_INTERVAL = 0.05
+
+# Upper bounds on clones and propagation span (days) per Monte Carlo request
+MAX_MC_CLONES = 5_000_000
+MAX_MC_DAYS = 3650
+
+# Where ?replay=NAME looks for scenario recordings
+SCENARIO_DIR = 'scenarios'
+
+
+def _write_npy_header(f, rows):
+    """Write a fixed-size .npy v1.0 header for an (rows, 6) float64 array"""
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, 6), }" % rows
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+    f.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1"))
+
+
+def _cache_key(filename):
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+log = get_logger('gmat')
+
+# Live integrations, for the client and queue gauges
+_integrations = weakref.WeakSet()
+
+def _total(count):
+    return lambda: sum(count(integration) for integration in list(_integrations))
+
+WEBSOCKET_CLIENTS.labels(stream='all').set_function(_total(lambda i: len(i.connected_clients)))
+WEBSOCKET_CLIENTS.labels(stream='broadcast').set_function(_total(lambda i: len(i.subscribers)))
+WEBSOCKET_CLIENTS.labels(stream='follow').set_function(_total(lambda i: len(i.followers)))
+QUEUE_DEPTH.labels(queue='broadcast').set_function(
+    _total(lambda i: sum(s.queue.qsize() for s in list(i.subscribers.values()))))
+QUEUE_DEPTH.labels(queue='follow').set_function(
+    _total(lambda i: sum(s.queue.qsize() for s in list(i.followers.values()))))
+
+
+async def timed_send(websocket, payload, stream):
+    """websocket.send, observed in the send-duration histogram"""
+    started = time.perf_counter()
+    await websocket.send(payload)
+    WEBSOCKET_SEND_SECONDS.labels(stream=stream).observe(time.perf_counter() - started)
+
+
+def timed_encode_frame(fmt, start, states, elements, total, indices=None):
+    """encode_frame, observed in the conversion histogram"""
+    started = time.perf_counter()
+    payload = encode_frame(fmt, start, states, elements, total, indices)
+    GMAT_CONVERSION_SECONDS.labels(stage='encode', format=fmt).observe(time.perf_counter() - started)
+    return payload
+
+class Subscriber:
+    """
+    A client in broadcast mode. Frames are queued as already-serialized
+    payloads and drained by the client's own writer task, so a slow
+    browser only ever delays itself.
+    """
+
+    def __init__(self, websocket, queue_size, options, stream='broadcast'):
+        self.websocket = websocket
+        self.stream = stream
+        self.encoding = (options['format'], options['batch'])
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.needs_full_pass = True
+
+    def offer(self, payload):
+        """Queue a payload, dropping the oldest one if the client is behind"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(payload)
+
+    async def run(self):
+        """Send queued payloads until the connection closes"""
+        while True:
+            payload = await self.queue.get()
+            if payload is None:
+                return
+            await timed_send(self.websocket, payload, self.stream)
+
 
 class GMATIntegration:
-    def __init__(self):
+    def __init__(self, broadcast=False, trajectory_file=TRAJECTORY_FILE,
+                 frame_interval=FRAME_INTERVAL, queue_size=256, trajectory=None, mc_workers=None,
+                 follow=False, mu=MU_EARTH, recorder=None, scenario_dir=SCENARIO_DIR):
         self.connected_clients = set()
         self.server = None
+        self.mu = mu  # central body gravitational parameter (km^3/s^2)
         self.loop = None
+        self._trajectories = {}  # filename -> (cache key, trajectory array)
+        self._indexes = {}       # filename -> (cache key, TrajectoryIndex)
+        self._memory_index = None  # (trajectory, TrajectoryIndex) for an in-memory trajectory
+
+        # Broadcast mode: one producer computes and serializes each frame once
+        self.broadcast = broadcast
+        self.trajectory_file = trajectory_file
+        self.trajectory = trajectory  # optional in-memory (N, 6) states, e.g. from nbody
+        self.frame_interval = frame_interval
+        self.queue_size = queue_size
+        self.subscribers = {}  # websocket -> Subscriber
+        self._encodings = {}   # (format, batch) -> subscribers using it
+        self._producer = None
+        self._subscriber_joined = None
+        
+        # Follow mode: one task tails the trajectory file and pushes appended states
+        self.follow = follow
+        self.followers = {}  # websocket -> Subscriber
+        self._follower = None
+        self._tail = None
+        self._tail_lock = None  # held while the tail is read and its states fanned out
+        
+        # Monte Carlo jobs share one process pool, created on first use
+        self.mc_workers = mc_workers
+        self._mc_executor = None
+        self._sbdb = None
+        
+        # Scenario recording of everything streamed (a ScenarioRecorder), and saved ones to replay
+        self.recorder = recorder
+        self.scenario_dir = scenario_dir
+        self._channels = itertools.count(1)  # tells apart per-client streams in the recording
+        _integrations.add(self)
         
     def cross_product(self, a, b):
         """Calculate cross product of two 3D vectors"""
@@ -28,17 +182,17 @@ class GMATIntegration:
         """Calculate magnitude of a vector"""
         return math.sqrt(sum(x*x for x in v))
     
-    def gmat_to_orbital_elements(self, gmat_data):
+    def gmat_to_orbital_elements(self, gmat_data, mu=None):
         """
         Convert GMAT Cartesian coordinates to Keplerian orbital elements
+        about a central body with gravitational parameter mu (default self.mu)
         """
         if gmat_data is None or len(gmat_data) < 6:
             return None
             
         x, y, z, vx, vy, vz = gmat_data[:6]
         
-        # Constants
-        mu = 3.986004418e5  # Earth gravitational parameter (km^3/s^2)
+        mu = self.mu if mu is None else mu
         
         # Position and velocity vectors
         r_vec = [x, y, z]
@@ -51,12 +205,12 @@ class GMATIntegration:
         h_vec = self.cross_product(r_vec, v_vec)
         h = self.vector_norm(h_vec)
         
-        # Eccentricity vector
-        h_cross_v = self.cross_product(h_vec, v_vec)
+        # Eccentricity vector e = (v x h) / mu - r / |r|
+        v_cross_h = self.cross_product(v_vec, h_vec)
         e_vec = [
-            h_cross_v[0] / mu - r_vec[0] / r,
-            h_cross_v[1] / mu - r_vec[1] / r,
-            h_cross_v[2] / mu - r_vec[2] / r
+            v_cross_h[0] / mu - r_vec[0] / r,
+            v_cross_h[1] / mu - r_vec[1] / r,
+            v_cross_h[2] / mu - r_vec[2] / r
         ]
         e = self.vector_norm(e_vec)
         
@@ -113,31 +267,222 @@ class GMATIntegration:
             'velocity': v                     # current velocity (km/s)
         }
     
+    def gmat_to_orbital_elements_batch(self, states, mu=None):
+        """
+        Vectorized gmat_to_orbital_elements for an (N, 6) array of states.
+        Returns a dict of length-N arrays keyed by ELEMENT_FIELDS.
+        """
+        started = time.perf_counter()
+        states = np.asarray(states, dtype=np.float64).reshape(-1, 6)
+        mu = self.mu if mu is None else mu
+
+        r_vec = states[:, 0:3]
+        v_vec = states[:, 3:6]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.sqrt(np.einsum('ij,ij->i', r_vec, r_vec))
+            v = np.sqrt(np.einsum('ij,ij->i', v_vec, v_vec))
+
+            # Specific angular momentum
+            h_vec = np.cross(r_vec, v_vec)
+            h = np.sqrt(np.einsum('ij,ij->i', h_vec, h_vec))
+
+            # Eccentricity vector e = (v x h) / mu - r / |r|
+            e_vec = np.cross(v_vec, h_vec) / mu - r_vec / r[:, None]
+            e = np.sqrt(np.einsum('ij,ij->i', e_vec, e_vec))
+
+            # Semi-major axis
+            energy = v**2 / 2 - mu / r
+            a = np.where(energy < 0, -mu / (2 * energy), np.inf)
+
+            # Inclination
+            i = np.where(h != 0, np.arccos(np.clip(h_vec[:, 2] / h, -1, 1)), 0.0)
+
+            # Right ascension of ascending node (n = k x h)
+            n_vec = np.stack([-h_vec[:, 1], h_vec[:, 0], np.zeros_like(h)], axis=1)
+            n = np.sqrt(np.einsum('ij,ij->i', n_vec, n_vec))
+            raan = np.arccos(np.clip(n_vec[:, 0] / n, -1, 1))
+            raan = np.where(n_vec[:, 1] < 0, 2 * np.pi - raan, raan)
+            raan = np.where(n != 0, raan, 0.0)
+
+            # Argument of periapsis
+            eccentric = e > 1e-10
+            argp = np.arccos(np.clip(np.einsum('ij,ij->i', n_vec, e_vec) / (n * e), -1, 1))
+            argp = np.where(e_vec[:, 2] < 0, 2 * np.pi - argp, argp)
+            argp = np.where((n != 0) & eccentric, argp, 0.0)
+
+            # True anomaly
+            nu = np.arccos(np.clip(np.einsum('ij,ij->i', e_vec, r_vec) / (e * r), -1, 1))
+            nu = np.where(np.einsum('ij,ij->i', r_vec, v_vec) < 0, 2 * np.pi - nu, nu)
+            nu = np.where(eccentric, nu, 0.0)
+
+            # Mean anomaly (via eccentric anomaly)
+            E = 2 * np.arctan(np.sqrt((1 - e) / (1 + e)) * np.tan(nu / 2))
+            M = np.where(e < 1, E - e * np.sin(E), nu)
+
+        elements = {
+            'a': a,
+            'e': e,
+            'i': np.degrees(i),
+            'raan': np.degrees(raan),
+            'argp': np.degrees(argp),
+            'M0': np.degrees(M),
+            'mass': np.full(len(states), 1e6),
+            'velocity': v,
+        }
+        GMAT_CONVERSION_SECONDS.labels(stage='elements', format='').observe(time.perf_counter() - started)
+        return elements
+
+    def elements_row(self, elements, index):
+        """Pick one row out of a batch result as a gmat_to_orbital_elements dict"""
+        return {field: float(elements[field][index]) for field in ELEMENT_FIELDS}
+
+    def iter_gmat_trajectory(self, filename, chunk_rows=TRAJECTORY_CHUNK_ROWS):
+        """
+        Stream a GMAT output file as (k, 6) arrays of at most chunk_rows rows
+        """
+        with open(filename, 'r') as f:
+            first = f.readline()
+            # Skip header line if present
+            lines = [] if 'X' in first else [first]
+            for line in f:
+                lines.append(line)
+                if len(lines) >= chunk_rows:
+                    yield parse_state_lines(lines)
+                    lines = []
+            if lines:
+                yield parse_state_lines(lines)
+
+    def _trajectory_cache_paths(self, filename):
+        return f"{filename}.npy", f"{filename}.npy.json"
+
+    def _load_trajectory_cache(self, filename, key):
+        """Memory-map the sidecar cache if it matches the file's size and mtime"""
+        cache_path, key_path = self._trajectory_cache_paths(filename)
+        try:
+            with open(key_path, 'r') as f:
+                if json.load(f) != key:
+                    return None
+            return np.load(cache_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def _build_trajectory_cache(self, filename, key):
+        """Parse the file once, streaming it into the sidecar .npy cache"""
+        cache_path, key_path = self._trajectory_cache_paths(filename)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            rows = 0
+            with open(tmp_path, 'wb') as f:
+                _write_npy_header(f, 0)
+                for chunk in self.iter_gmat_trajectory(filename):
+                    f.write(np.ascontiguousarray(chunk, dtype='<f8').tobytes())
+                    rows += len(chunk)
+                # Now that the row count is known, fix up the header
+                f.seek(0)
+                _write_npy_header(f, rows)
+            os.replace(tmp_path, cache_path)
+            with open(key_path, 'w') as f:
+                json.dump(key, f)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return np.load(cache_path, mmap_mode='r')
+
     def read_gmat_trajectory(self, filename):
         """
-        Read GMAT output file and extract trajectory data
+        Read GMAT output file and extract trajectory data as an (N, 6) array.
+        The first read writes a memory-mapped .npy cache next to the file;
+        later reads reuse it until the file's size or mtime changes.
         """
         try:
-            data = []
-            with open(filename, 'r') as f:
-                lines = f.readlines()
-                # Skip header line if present
-                start_line = 1 if len(lines) > 1 and 'X' in lines[0] else 0
-                
-                for line in lines[start_line:]:
-                    values = line.strip().split()
-                    if len(values) >= 6:
-                        # Convert to float and take first 6 values (X, Y, Z, VX, VY, VZ)
-                        data.append([float(x) for x in values[:6]])
+            key = _cache_key(filename)
+            cached = self._trajectories.get(filename)
+            if cached and cached[0] == key:
+                return cached[1]
+
+            data = self._load_trajectory_cache(filename, key)
+            if data is None:
+                try:
+                    data = self._build_trajectory_cache(filename, key)
+                except OSError as e:
+                    # e.g. read-only directory: parse without caching
+                    log.warning("trajectory_cache_failed", file=filename, error=str(e))
+                    chunks = list(self.iter_gmat_trajectory(filename))
+                    data = np.concatenate(chunks) if chunks else np.empty((0, 6))
+
+            self._trajectories[filename] = (key, data)
             return data
         except Exception as e:
-            print(f"Error reading GMAT file: {e}")
+            log.warning("trajectory_read_failed", file=filename, error=str(e))
             # Return sample data for testing
-            return self.generate_sample_data()
+            return np.array(self.generate_sample_data())
+    
+    def load_trajectory(self):
+        """States to stream: the in-memory trajectory if set, else the GMAT file"""
+        if self.trajectory is not None:
+            return self.trajectory
+        return self.read_gmat_trajectory(self.trajectory_file)
+    
+    def read_trajectory_index(self, filename):
+        """
+        Level-of-detail index of a GMAT file. Built on first use and saved
+        next to the file; rebuilt when the file's size or mtime changes.
+        """
+        data = self.read_gmat_trajectory(filename)
+        try:
+            key = _cache_key(filename)
+        except OSError:
+            # Sample data stands in for a missing file: index it, but nothing to key a cache on
+            return TrajectoryIndex.build(np.asarray(data))
+        cached = self._indexes.get(filename)
+        if cached and cached[0] == key:
+            return cached[1]
+        index = TrajectoryIndex.load(filename, key)
+        if index is None:
+            started = time.perf_counter()
+            index = TrajectoryIndex.build(data)
+            log.info("trajectory_index_built", file=filename, points=index.n, levels=len(index.levels),
+                     elapsed_s=round(time.perf_counter() - started, 3))
+            try:
+                index.save(filename, key)
+            except OSError as e:
+                log.warning("trajectory_index_cache_failed", file=filename, error=str(e))
+        self._indexes[filename] = (key, index)
+        return index
+    
+    def trajectory_index(self):
+        """Level-of-detail index of the states load_trajectory() returns"""
+        if self.trajectory is None:
+            return self.read_trajectory_index(self.trajectory_file)
+        if self._memory_index is None or self._memory_index[0] is not self.trajectory:
+            self._memory_index = (self.trajectory, TrajectoryIndex.build(np.asarray(self.trajectory)))
+        return self._memory_index[1]
+    
+    def lod_view(self, t_start=None, t_end=None, max_points=1000):
+        """
+        At most ``max_points`` states covering point indices [t_start, t_end],
+        from the finest index level that fits. Returns (rows, states,
+        elements, info), info describing the level for the client.
+        """
+        index = self.trajectory_index()
+        level, rows, error = index.query(t_start, t_end, max_points)
+        states = np.asarray(self.load_trajectory())[rows]
+        info = {
+            'type': 'lod',
+            'level': level,
+            'levels': len(index.levels),
+            'error_km': error,
+            't_start': int(rows[0]) if len(rows) else None,
+            't_end': int(rows[-1]) if len(rows) else None,
+            'count': len(rows),
+            'total_points': index.n,
+        }
+        return rows, states, self.gmat_to_orbital_elements_batch(states), info
     
     def generate_sample_data(self):
         """Generate sample orbital data for testing"""
-        print("Generating sample orbital data...")
+        log.info("sample_data_generated")
         sample_data = []
         # Sample elliptical orbit
         for i in range(100):
@@ -151,34 +496,72 @@ class GMATIntegration:
             sample_data.append([x, y, z, vx, vy, vz])
         return sample_data
     
-    async def send_gmat_data(self, websocket, path):
+    def iter_element_chunks(self, gmat_data):
+        """Yield (start, states, elements) for the trajectory, converting chunk by chunk"""
+        for start in range(0, len(gmat_data), TRAJECTORY_CHUNK_ROWS):
+            states = np.asarray(gmat_data[start:start + TRAJECTORY_CHUNK_ROWS])
+            yield start, states, self.gmat_to_orbital_elements_batch(states)
+    
+    def iter_gmat_frames(self, gmat_data, fmt='json', batch=1):
+        """Yield (payload, point count) frames for the trajectory in the given encoding"""
+        total = len(gmat_data)
+        for start, states, elements in self.iter_element_chunks(gmat_data):
+            yield from self._encode_frames(start, states, elements, total, fmt, batch)
+    
+    def _encode_frames(self, start, states, elements, total, fmt, batch):
+        """Yield (payload, point count) frames for one converted chunk"""
+        for b in range(0, len(states), batch):
+            frame_elements = {field: values[b:b + batch] for field, values in elements.items()}
+            frame_states = states[b:b + batch]
+            yield timed_encode_frame(fmt, start + b, frame_states, frame_elements, total), len(frame_states)
+    
+    def _request_path(self, websocket, path):
+        """Request path for both the legacy (websocket, path) and the new handler API"""
+        if path is not None:
+            return path
+        request = getattr(websocket, 'request', None)
+        return getattr(request, 'path', None) or getattr(websocket, 'path', '')
+    
+    async def send_gmat_data(self, websocket, path=None):
         """
         WebSocket server to send GMAT data to the web interface
         """
+        request_path = self._request_path(websocket, path)
+        if urlparse(request_path).path == '/monte-carlo':
+            return await self.run_monte_carlo(websocket, request_path)
+        
+        options = parse_stream_options(request_path)
+        if options['replay']:
+            return await self.replay_scenario(websocket, options)
+        if options['max_points']:
+            return await self.send_lod_view(websocket, options)
+        if options['follow'] or self.follow:
+            return await self.follow_trajectory(websocket, options)
+        if self.broadcast:
+            return await self.subscribe(websocket, options)
+        
         self.connected_clients.add(websocket)
         try:
             # Read GMAT data
-            gmat_data = self.read_gmat_trajectory('AsteroidTrajectory.txt')
+            gmat_data = self.load_trajectory()
             
-            if gmat_data:
-                print(f"Sending {len(gmat_data)} GMAT data points to client...")
+            if len(gmat_data):
+                log.info("stream_started", points=len(gmat_data), format=options['format'], batch=options['batch'])
                 
-                # Convert to orbital elements for each time step
-                for i, state in enumerate(gmat_data):
-                    if len(state) >= 6:
-                        orbital_elements = self.gmat_to_orbital_elements(state)
-                        
-                        if orbital_elements:
-                            message = {
-                                'type': 'gmat_data',
-                                'elements': orbital_elements,
-                                'timestamp': i,
-                                'cartesian': state[:6],
-                                'total_points': len(gmat_data)
-                            }
-                            
-                            await websocket.send(json.dumps(message))
-                            await asyncio.sleep(0.05)  # Control update rate
+                total = len(gmat_data)
+                channel = next(self._channels)
+                for start, states, elements in self.iter_element_chunks(gmat_data):
+                    offset = 0
+                    for payload, count in self._encode_frames(start, states, elements, total,
+                                                              options['format'], options['batch']):
+                        await timed_send(websocket, payload, 'stream')
+                        if self.recorder is not None:
+                            self.recorder.record_states(
+                                'stream', start + offset, states[offset:offset + count],
+                                {field: values[offset:offset + count] for field, values in elements.items()},
+                                total, channel)
+                        offset += count
+                        await asyncio.sleep(self.frame_interval * count)  # Control update rate
             
             # Send completion message
             await websocket.send(json.dumps({
@@ -187,9 +570,9 @@ class GMATIntegration:
             }))
             
         except websockets.exceptions.ConnectionClosed:
-            print("Client disconnected")
+            log.info("client_disconnected", stream='stream')
         except Exception as e:
-            print(f"Error in WebSocket handler: {e}")
+            log.exception("stream_failed", error=str(e))
             await websocket.send(json.dumps({
                 'type': 'error',
                 'message': str(e)
@@ -197,6 +580,340 @@ class GMATIntegration:
         finally:
             self.connected_clients.remove(websocket)
     
+    async def send_lod_view(self, websocket, options):
+        """Level-of-detail query: the lod message, the selected points at once, then complete"""
+        self.connected_clients.add(websocket)
+        try:
+            loop = asyncio.get_running_loop()
+            # The first query of a file may build its index
+            rows, states, elements, info = await loop.run_in_executor(
+                None, self.lod_view, options['t_start'], options['t_end'], options['max_points'])
+            await websocket.send(json.dumps(info))
+            fmt = options['format']
+            for b in range(0, len(rows), MAX_BATCH):
+                frame_elements = {field: values[b:b + MAX_BATCH] for field, values in elements.items()}
+                payload = timed_encode_frame(fmt, int(rows[b]), states[b:b + MAX_BATCH], frame_elements,
+                                             info['total_points'], rows[b:b + MAX_BATCH])
+                await timed_send(websocket, payload, 'lod')
+            await websocket.send(json.dumps({
+                'type': 'complete',
+                'message': f"Sent {len(rows)} of {info['total_points']} points (level {info['level']})"
+            }))
+        except websockets.exceptions.ConnectionClosed:
+            log.info("client_disconnected", stream='lod')
+        except Exception as e:
+            log.exception("lod_view_failed", error=str(e))
+            await websocket.send(json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+        finally:
+            self.connected_clients.discard(websocket)
+    
+    async def subscribe(self, websocket, options):
+        """Broadcast mode: register the client and drain its queue until it leaves"""
+        subscriber = Subscriber(websocket, self.queue_size, options)
+        self.connected_clients.add(websocket)
+        self.subscribers[websocket] = subscriber
+        self._encodings.setdefault(subscriber.encoding, set()).add(subscriber)
+        
+        if self._subscriber_joined is None:
+            self._subscriber_joined = asyncio.Event()
+        self._subscriber_joined.set()
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.ensure_future(self._broadcast_producer())
+        
+        writer = asyncio.ensure_future(subscriber.run())
+        closed = asyncio.ensure_future(websocket.wait_closed())
+        try:
+            # Notice disconnects even while the producer is idle
+            await asyncio.wait({writer, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                writer.result()
+            else:
+                log.info("client_disconnected", stream='broadcast')
+        except websockets.exceptions.ConnectionClosed:
+            log.info("client_disconnected", stream='broadcast')
+        finally:
+            writer.cancel()
+            closed.cancel()
+            del self.subscribers[websocket]
+            group = self._encodings[subscriber.encoding]
+            group.discard(subscriber)
+            if not group:
+                del self._encodings[subscriber.encoding]
+            self.connected_clients.discard(websocket)
+            if subscriber.dropped:
+                log.warning("slow_client_frames_dropped", stream='broadcast', dropped=subscriber.dropped)
+    
+    async def follow_trajectory(self, websocket, options):
+        """
+        Follow mode: send the states written so far (the latest HISTORY_ROWS
+        of them), then every batch GMAT appends, as soon as the file watcher
+        reports it.
+        """
+        subscriber = Subscriber(websocket, self.queue_size, options, stream='follow')
+        if self._tail_lock is None:
+            self._tail_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        async with self._tail_lock:
+            producer_running = self._follower is not None and not self._follower.done()
+            if not producer_running and (self._tail is None or self._tail.filename != self.trajectory_file):
+                self._tail = TrajectoryTail(self.trajectory_file)
+            # Nobody was following: catch up with whatever GMAT wrote meanwhile. The producer
+            # cannot read while the lock is held, so no appended batch is missed or repeated
+            first, history, total = await loop.run_in_executor(
+                None, self._tail_snapshot, not producer_running)
+            self.connected_clients.add(websocket)
+            self.followers[websocket] = subscriber
+            if not producer_running:
+                self._follower = asyncio.ensure_future(self._follow_producer())
+        
+        writer = closed = None
+        try:
+            fmt, batch = subscriber.encoding
+            for start in range(0, len(history), TRAJECTORY_CHUNK_ROWS):
+                states = history[start:start + TRAJECTORY_CHUNK_ROWS]
+                elements = await loop.run_in_executor(None, self.gmat_to_orbital_elements_batch, states)
+                for payload, _ in self._encode_frames(first + start, states, elements, total, fmt, batch):
+                    await timed_send(websocket, payload, 'follow')
+            writer = asyncio.ensure_future(subscriber.run())
+            closed = asyncio.ensure_future(websocket.wait_closed())
+            await asyncio.wait({writer, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                writer.result()
+            else:
+                log.info("client_disconnected", stream='follow')
+        except websockets.exceptions.ConnectionClosed:
+            log.info("client_disconnected", stream='follow')
+        finally:
+            for task in (writer, closed):
+                if task:
+                    task.cancel()
+            del self.followers[websocket]
+            self.connected_clients.discard(websocket)
+            if subscriber.dropped:
+                log.warning("slow_client_frames_dropped", stream='follow', dropped=subscriber.dropped)
+    
+    def _tail_snapshot(self, catch_up):
+        """(first row number, latest states, rows read) of the followed file, read to its end first if catch_up"""
+        if catch_up:
+            while len(self._tail.read_new()[0]):
+                pass
+        first, history = self._tail.states()
+        return first, history, self._tail.rows
+    
+    def _read_tail(self, tail):
+        """Next appended batch: (start row, states, restarted, elements)"""
+        start = tail.rows
+        states, restarted = tail.read_new()
+        elements = self.gmat_to_orbital_elements_batch(states) if len(states) else None
+        return 0 if restarted else start, states, restarted, elements
+    
+    async def _follow_producer(self, idle_timeout=1.0):
+        """
+        Tail the trajectory file and push appended states while anyone
+        follows it. Reads and conversions run on the default executor.
+        """
+        tail = self._tail
+        loop = asyncio.get_running_loop()
+        watcher = make_watcher(tail.filename)
+        try:
+            while self.followers:
+                async with self._tail_lock:
+                    start, states, restarted, elements = await loop.run_in_executor(None, self._read_tail, tail)
+                    if restarted:
+                        log.info("trajectory_restarted", file=tail.filename)
+                        if self.recorder is not None:
+                            self.recorder.record_event('restart', source='follow')
+                        for subscriber in list(self.followers.values()):
+                            subscriber.offer(json.dumps({'type': 'restart', 'message': 'New GMAT run'}))
+                    if len(states):
+                        if self.recorder is not None:
+                            self.recorder.record_states('follow', start, states, elements, tail.rows)
+                        groups = {}
+                        for subscriber in self.followers.values():
+                            groups.setdefault(subscriber.encoding, []).append(subscriber)
+                        for (fmt, batch), group in groups.items():
+                            for payload, _ in self._encode_frames(start, states, elements, tail.rows, fmt, batch):
+                                for subscriber in group:
+                                    subscriber.offer(payload)
+                if not len(states):
+                    # The timeout also covers events the watcher might miss
+                    await watcher.wait(idle_timeout)
+                    continue
+                # Let writers run before the next read
+                await asyncio.sleep(0)
+        finally:
+            watcher.close()
+    
+    def scenario_path(self, name):
+        """Recording file for a ?replay= name, which may not leave scenario_dir"""
+        if not name or os.path.basename(name) != name or name.startswith('.'):
+            raise ValueError(f"Invalid scenario name {name!r}")
+        if not name.endswith(EXTENSION):
+            name += EXTENSION
+        path = os.path.join(self.scenario_dir, name)
+        if not os.path.exists(path):
+            raise ValueError(f"No scenario named {name!r}")
+        return path
+    
+    async def replay_scenario(self, websocket, options):
+        """
+        Replay mode: stream a saved scenario from options['replay_from']
+        seconds on, pacing frames by their recorded times divided by
+        options['speed']. Points are re-encoded straight from the memory-mapped
+        records; events are sent as scenario_event messages in between.
+        """
+        self.connected_clients.add(websocket)
+        try:
+            scenario = Scenario(self.scenario_path(options['replay']))
+            first = scenario.seek(options['replay_from'])
+            t_from = options['replay_from'] or 0.0
+            speed = options['speed']
+            await websocket.send(json.dumps({
+                'type': 'replay', 'scenario': os.path.basename(scenario.filename),
+                'records': len(scenario), 'duration': scenario.duration,
+                'from': t_from, 'speed': speed, 'created': scenario.created,
+            }))
+            log.info("replay_started", scenario=scenario.filename, start=first, speed=speed)
+            
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            fmt, batch = options['format'], options['batch']
+            sent = 0
+            for t, records in scenario.iter_frames(first, batch, options['source']):
+                delay = started + (t - t_from) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if records[0]['kind'] == KIND_EVENT:
+                    await timed_send(websocket, json.dumps(event_message(records[0])), 'replay')
+                    continue
+                states, elements = state_columns(records)
+                payload = timed_encode_frame(fmt, int(records[0]['index']), states, elements,
+                                             int(records[-1]['total']))
+                await timed_send(websocket, payload, 'replay')
+                sent += len(records)
+            
+            await websocket.send(json.dumps({
+                'type': 'complete',
+                'message': f'Replayed {sent} data points'
+            }))
+        except websockets.exceptions.ConnectionClosed:
+            log.info("client_disconnected", stream='replay')
+        except Exception as e:
+            log.warning("replay_failed", error=str(e))
+            await websocket.send(json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+        finally:
+            self.connected_clients.discard(websocket)
+    
+    def _preset_orbit(self, body):
+        """Osculating elements of a preset asteroid, matched by name prefix"""
+        matches = [name for name in PRESET_ASTEROIDS if name.lower().startswith(body.lower())]
+        if not matches:
+            raise ValueError(f"Unknown asteroid {body!r}, expected one of {list(PRESET_ASTEROIDS)}")
+        if self._sbdb is None:
+            self._sbdb = SBDBService()
+        return matches[0], self._sbdb.get_with_orbit(matches[0], PRESET_ASTEROIDS[matches[0]])['orbit']
+    
+    async def run_monte_carlo(self, websocket, path):
+        """
+        Monte Carlo impact probabilities for a preset asteroid:
+        /monte-carlo?body=Apophis&clones=100000&days=365&sigma_scale=1
+        Streams mc_progress messages while the pool works, then one mc_result.
+        """
+        params = parse_qs(urlparse(path).query)
+        self.connected_clients.add(websocket)
+        try:
+            body = params.get('body', ['Apophis'])[0]
+            clones = min(int(params.get('clones', ['100000'])[0]), MAX_MC_CLONES)
+            days = float(params.get('days', ['365'])[0])
+            sigma_scale = float(params.get('sigma_scale', ['1'])[0])
+            if clones < 1 or not 0 < days <= MAX_MC_DAYS or not 0 <= sigma_scale < math.inf:
+                raise ValueError(f"clones must be positive, 0 < days <= {MAX_MC_DAYS} and sigma_scale finite")
+            
+            loop = asyncio.get_running_loop()
+            name, orbit = await loop.run_in_executor(None, self._preset_orbit, body)
+            # Sampling millions of clones takes a while: keep it off the event loop
+            job = await loop.run_in_executor(
+                None, lambda: MonteCarloJob(orbit, clones, days, sigma_scale=sigma_scale))
+            if self._mc_executor is None:
+                self._mc_executor = default_executor(self.mc_workers)
+            
+            log.info("monte_carlo_started", body=name, clones=clones, days=days)
+            
+            async def progress(done, total):
+                await timed_send(websocket, json.dumps({
+                    'type': 'mc_progress', 'body': name, 'done': done, 'total': total
+                }), 'monte_carlo')
+            
+            result = await job.run_async(self._mc_executor, progress)
+            result.update({'type': 'mc_result', 'body': name, 'days': days, 'sigma_scale': sigma_scale})
+            await timed_send(websocket, json.dumps(result), 'monte_carlo')
+            
+        except websockets.exceptions.ConnectionClosed:
+            log.info("client_disconnected", stream='monte_carlo')
+        except Exception as e:
+            log.warning("monte_carlo_failed", error=str(e))
+            await websocket.send(json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+        finally:
+            self.connected_clients.discard(websocket)
+    
+    def _fan_out(self, message):
+        """Serialize a message once and queue the same payload for every subscriber"""
+        payload = json.dumps(message)
+        for subscriber in list(self.subscribers.values()):
+            subscriber.offer(payload)
+    
+    async def _broadcast_producer(self):
+        """
+        Play the trajectory to all subscribers. Another pass starts while any
+        subscriber joined too late to see the previous one from the start.
+        """
+        while self.subscribers:
+            self._subscriber_joined.clear()
+            for subscriber in self.subscribers.values():
+                subscriber.needs_full_pass = False
+            
+            gmat_data = self.load_trajectory()
+            total = len(gmat_data)
+            log.info("broadcast_pass_started", points=total, clients=len(self.subscribers))
+            
+            for start, states, elements in self.iter_element_chunks(gmat_data):
+                last = len(states) - 1
+                for j in range(len(states)):
+                    if not self.subscribers:
+                        return
+                    # Each encoding in use is built once per frame and shared
+                    for (fmt, batch), group in list(self._encodings.items()):
+                        if j % batch != batch - 1 and j != last:
+                            continue
+                        b = j - j % batch
+                        frame_elements = {field: values[b:j + 1] for field, values in elements.items()}
+                        payload = timed_encode_frame(fmt, start + b, states[b:j + 1], frame_elements, total)
+                        for subscriber in list(group):
+                            subscriber.offer(payload)
+                    if self.recorder is not None:
+                        self.recorder.record_states('broadcast', start + j, states[j:j + 1],
+                                                    {field: values[j:j + 1] for field, values in elements.items()},
+                                                    total)
+                    await asyncio.sleep(self.frame_interval)  # Control update rate
+            
+            self._fan_out({
+                'type': 'complete',
+                'message': f'Processed {len(gmat_data)} data points'
+            })
+            
+            if not any(s.needs_full_pass for s in self.subscribers.values()):
+                # Everyone has seen a full pass: idle until someone new joins
+                await self._subscriber_joined.wait()
+    
     def start_server(self):
         """Start the WebSocket server in the current thread"""
         try:
@@ -208,14 +925,13 @@ class GMATIntegration:
             start_server = websockets.serve(self.send_gmat_data, "localhost", 8765)
             self.server = self.loop.run_until_complete(start_server)
             
-            print("GMAT Integration Bridge running on ws://localhost:8765")
-            print("Server is ready to accept connections...")
+            log.info("server_started", url="ws://localhost:8765")
             
             # Run the event loop
             self.loop.run_forever()
             
         except Exception as e:
-            print(f"Server error: {e}")
+            log.exception("server_failed", error=str(e))
         finally:
             if self.server:
                 self.server.close()
@@ -229,6 +945,10 @@ class GMATIntegration:
             self.server.close()
             self.loop.run_until_complete(self.server.wait_closed())
             self.loop.stop()
+        if self._mc_executor:
+            self._mc_executor.shutdown(cancel_futures=True)
+        if self.recorder is not None:
+            self.recorder.close()
 
 # Simple test function
 def test_orbital_calculation():
@@ -249,13 +969,31 @@ def test_orbital_calculation():
 
 # Run the integration bridge
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="GMAT Integration Bridge")
+    parser.add_argument("--broadcast", action="store_true",
+                        help="compute each frame once and fan it out to all clients")
+    parser.add_argument("--follow", action="store_true",
+                        help="tail the trajectory file while GMAT writes it and push new states live")
+    parser.add_argument("--trajectory", default=TRAJECTORY_FILE, help="GMAT ReportFile to stream")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--record", metavar="FILE",
+                        help="append everything streamed to this scenario recording")
+    parser.add_argument("--scenarios", default=SCENARIO_DIR, help="directory of recordings clients can ?replay=")
+    args = parser.parse_args()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    
     print("Starting GMAT Integration Bridge...")
     
     # Test the calculation
     test_orbital_calculation()
     
     # Create and start the server
-    integrator = GMATIntegration()
+    integrator = GMATIntegration(broadcast=args.broadcast, trajectory_file=args.trajectory, follow=args.follow,
+                                 recorder=ScenarioRecorder(args.record) if args.record else None,
+                                 scenario_dir=args.scenarios)
     
     try:
         # Start server in the main thread (no separate thread needed)
@@ -0,0 +1,144 @@
+# gmat_protocol.py
+"""
+Frame encodings for the GMAT WebSocket stream.
+
+Clients pick an encoding with query parameters on the WebSocket URL,
+e.g. ``ws://localhost:8765/?format=binary&batch=64``:
+
+* ``format=json`` (default) with ``batch=1`` sends the original one
+  ``gmat_data`` message per point.
+* ``format=json`` with ``batch=K`` sends ``gmat_batch`` messages holding
+  K points as column arrays.
+* ``format=binary`` sends binary frames: a 24-byte header followed by
+  ``count`` rows of FRAME_FIELDS as packed little-endian float64.
+
+``follow=1`` tails a trajectory file that is still being written: the
+states so far are sent, then each batch of appended states as it lands.
+Frames carry the running point count as ``total``.
+
+``max_points=N`` (with optional ``t_start``/``t_end``, in point indices)
+asks for a level-of-detail view instead of a replay: at most N points of
+the window are sent at once, after a ``lod`` message naming the level
+and its error bound. Their frames carry the point indices, as an
+``indices`` array in JSON and as a leading ``index`` column
+(LOD_FRAME_FIELDS) in binary frames.
+
+``replay=NAME`` streams a saved scenario recording instead (see
+scenario_recorder.py), from ``from`` seconds into it (default 0) at
+``speed`` times the recorded pace (default 1), optionally only the points
+of one ``source``. Points come in the negotiated encoding; recorded
+events arrive as ``scenario_event`` messages between them, after a
+``replay`` message describing the recording.
+
+Control messages (``complete``, ``error``, ``restart``) are always JSON text frames.
+"""
+import json
+import struct
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+BINARY_MAGIC = b'GMAT'
+PROTOCOL_VERSION = 1
+
+# magic, version, fields per point, first point index, point count, total points, padding
+FRAME_HEADER = struct.Struct('<4sHHIII4x')
+
+STATE_FIELDS = ('x', 'y', 'z', 'vx', 'vy', 'vz')
+ELEMENT_FIELDS = ('a', 'e', 'i', 'raan', 'argp', 'M0', 'mass', 'velocity')
+FRAME_FIELDS = STATE_FIELDS + ELEMENT_FIELDS
+LOD_FRAME_FIELDS = ('index',) + FRAME_FIELDS
+
+MAX_BATCH = 4096
+MAX_LOD_POINTS = 100_000
+MAX_REPLAY_SPEED = 1e6
+
+
+def parse_stream_options(path):
+    """Read the negotiated encoding from the WebSocket request path"""
+    params = parse_qs(urlparse(path or '').query)
+    fmt = params.get('format', ['json'])[0]
+    if fmt not in ('json', 'binary'):
+        fmt = 'json'
+    try:
+        batch = int(params.get('batch', ['1'])[0])
+    except ValueError:
+        batch = 1
+    follow = params.get('follow', ['0'])[0].lower() in ('1', 'true', 'yes')
+    options = {'format': fmt, 'batch': min(max(batch, 1), MAX_BATCH), 'follow': follow,
+               'max_points': None, 't_start': None, 't_end': None,
+               'replay': params.get('replay', [None])[0], 'replay_from': None, 'speed': 1.0,
+               'source': params.get('source', [None])[0]}
+    try:
+        if 'max_points' in params:
+            options['max_points'] = min(max(int(params['max_points'][0]), 2), MAX_LOD_POINTS)
+        for name in ('t_start', 't_end'):
+            if name in params:
+                options[name] = float(params[name][0])
+        if 'from' in params:
+            options['replay_from'] = max(float(params['from'][0]), 0.0)
+        if 'speed' in params:
+            speed = float(params['speed'][0])
+            if speed > 0:
+                options['speed'] = min(speed, MAX_REPLAY_SPEED)
+    except ValueError:
+        pass
+    return options
+
+
+def encode_frame(fmt, start, states, elements, total, indices=None):
+    """
+    Encode points ``start .. start + len(states)`` of a trajectory, or the
+    points at ``indices`` (starting with ``start``) for level-of-detail views.
+    ``elements`` holds one array per ELEMENT_FIELDS entry, aligned with ``states``.
+    """
+    count = len(states)
+    if fmt == 'binary':
+        fields = FRAME_FIELDS if indices is None else LOD_FRAME_FIELDS
+        rows = np.empty((count, len(fields)), dtype='<f8')
+        offset = len(fields) - len(FRAME_FIELDS)
+        if offset:
+            rows[:, 0] = indices
+        rows[:, offset:offset + 6] = states[:, :6]
+        for column, field in enumerate(ELEMENT_FIELDS, start=offset + 6):
+            rows[:, column] = elements[field]
+        header = FRAME_HEADER.pack(BINARY_MAGIC, PROTOCOL_VERSION, len(fields), start, count, total)
+        return header + rows.tobytes()
+
+    if indices is not None:
+        return json.dumps({
+            'type': 'gmat_batch',
+            'start': start,
+            'count': count,
+            'total_points': total,
+            'indices': np.asarray(indices).tolist(),
+            'cartesian': states[:, :6].tolist(),
+            'elements': {field: elements[field].tolist() for field in ELEMENT_FIELDS},
+        })
+
+    if count == 1:
+        return json.dumps({
+            'type': 'gmat_data',
+            'elements': {field: float(elements[field][0]) for field in ELEMENT_FIELDS},
+            'timestamp': start,
+            'cartesian': states[0, :6].tolist(),
+            'total_points': total
+        })
+
+    return json.dumps({
+        'type': 'gmat_batch',
+        'start': start,
+        'count': count,
+        'total_points': total,
+        'cartesian': states[:, :6].tolist(),
+        'elements': {field: elements[field].tolist() for field in ELEMENT_FIELDS},
+    })
+
+
+def decode_binary_frame(payload):
+    """Decode a binary frame into (start, total, (count, len(FRAME_FIELDS)) array)"""
+    magic, version, fields, start, count, total = FRAME_HEADER.unpack_from(payload)
+    if magic != BINARY_MAGIC or version != PROTOCOL_VERSION:
+        raise ValueError("Not a GMAT binary frame")
+    rows = np.frombuffer(payload, dtype='<f8', count=count * fields, offset=FRAME_HEADER.size)
+    return start, total, rows.reshape(count, fields)
@@ -1,134 +1,224 @@
 # http_gmat_bridge.py
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import json
 import math
+import os
+import threading
 import time
+import uuid
 
-class PhysicsGMATHandler(BaseHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
+import numpy as np
+
+from gmat_protocol import ELEMENT_FIELDS
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, render as render_metrics
+from orbit_propagator import EphemerisTable, R_EARTH
+from scenario_recorder import EVENT_FIELDS, ScenarioRecorder
+from structured_logging import get_logger
+
+log = get_logger("bridge")
+
+# Orbits served by the bridge: (name, a [km], e, i, raan, argp [deg])
+ORBIT_PRESETS = [
+    ("Low Earth Orbit", R_EARTH + 400, 0.0005, 51.6, 0, 0),
+    ("Geostationary Transfer", 24500, 0.73, 28.5, 0, 180),
+    ("Molniya Orbit", 26500, 0.74, 63.4, 0, 270),
+    ("Highly Elliptical", 30000, 0.8, 45, 0, 90),
+]
+
+POLL_TIME_STEP = 60.0      # simulated seconds per /gmat-data poll
+MAX_WINDOW_POINTS = 10000  # states per /ephemeris response
+
+def build_ephemerides():
+    """Precompute one ephemeris table per orbit preset"""
+    return [
+        EphemerisTable(a, e, math.radians(i), math.radians(raan), math.radians(argp))
+        for _, a, e, i, raan, argp in ORBIT_PRESETS
+    ]
+
+PREFLIGHT_HEADERS = [
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, X-Session-Id'),
+]
+
+def response_headers(session, no_cache=False):
+    """Headers for a bridge JSON response: CORS and the client's session ID"""
+    headers = [
+        ('Content-type', 'application/json'),
+        ('Access-Control-Allow-Origin', '*'),
+        ('Access-Control-Expose-Headers', 'X-Session-Id'),
+        ('X-Session-Id', session.session_id),
+    ]
+    if no_cache:
+        headers.append(('Cache-Control', 'no-cache'))
+    return headers
+
+class SimulationSession:
+    """Per-client simulation state; the lock guards counter and simulation_active"""
+    
+    def __init__(self, session_id):
+        self.session_id = session_id
         self.counter = 0
         self.simulation_active = True
-        super().__init__(*args, **kwargs)
+        self.last_seen = time.time()
+        self.lock = threading.Lock()
+
+class SessionRegistry:
+    """Server-wide, thread-safe registry of simulation sessions"""
     
-    def do_GET(self):
-        if self.path == '/gmat-data':
-            self.send_physics_data()
-        elif self.path == '/control' and 'command' in self.path:
-            self.handle_control_command()
-        elif self.path == '/status':
-            self.send_status()
-        elif self.path == '/':
-            self.send_home_page()
-        else:
-            self.send_error(404)
+    def __init__(self, idle_timeout=3600):
+        self.idle_timeout = idle_timeout
+        self.requests_served = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def get(self, session_id=None):
+        """Return the session for session_id, creating a new one if it is unknown"""
+        now = time.time()
+        with self._lock:
+            self.requests_served += 1
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                self._expire(now)
+                session = SimulationSession(uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+            session.last_seen = now
+            return session
     
-    def handle_control_command(self):
+    def _expire(self, now):
+        """Drop sessions idle for longer than idle_timeout (caller holds the lock)"""
+        stale = [sid for sid, session in self._sessions.items()
+                 if now - session.last_seen > self.idle_timeout]
+        for sid in stale:
+            del self._sessions[sid]
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+def session_channel(session):
+    """Recording channel of a session: the first 32 bits of its ID"""
+    return int(session.session_id[:8], 16)
+
+class BridgeError(Exception):
+    """A bridge request that cannot be served, with its HTTP status"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class PhysicsBridge:
+    """
+    The bridge endpoints independent of any HTTP server: shared by the
+    threaded server below and by the single-process ASGI app (asgi.py).
+    """
+    
+    # path -> (method name, send Cache-Control: no-cache)
+    ROUTES = {
+        '/gmat-data': ('physics_data', True),
+        '/control': ('handle_control_command', False),
+        '/status': ('status', False),
+        '/ephemeris': ('ephemeris', False),
+        '/event': ('record_event', True),
+    }
+    
+    def __init__(self, sessions=None, recorder=None):
+        self.sessions = sessions or SessionRegistry()
+        self.ephemerides = build_ephemerides()
+        self.recorder = recorder  # optional ScenarioRecorder for the element feed and client events
+    
+    def dispatch(self, path, params, session_id=None):
+        """
+        Serve a bridge endpoint: params as parsed by parse_qs, session_id from
+        ?session= or the X-Session-Id header. Returns (data, session, no_cache),
+        or None for paths the bridge does not serve. Raises BridgeError.
+        """
+        route = self.ROUTES.get(path)
+        if route is None:
+            return None
+        method, no_cache = route
+        session = self.sessions.get(params.get('session', [None])[0] or session_id)
+        data = getattr(self, method)(params, session)
+        data['session_id'] = session.session_id
+        return data, session, no_cache
+    
+    def handle_control_command(self, params, session):
         """Handle control commands from the web interface"""
-        from urllib.parse import urlparse, parse_qs
-        
-        parsed = urlparse(self.path)
-        params = parse_qs(parsed.query)
         command = params.get('command', [''])[0]
         
-        if command == 'start':
-            self.simulation_active = True
-            response = {'status': 'started', 'message': 'GMAT simulation started'}
-        elif command == 'stop':
-            self.simulation_active = False
-            response = {'status': 'stopped', 'message': 'GMAT simulation stopped'}
-        elif command == 'reset':
-            self.counter = 0
-            response = {'status': 'reset', 'message': 'Counter reset'}
-        else:
-            response = {'status': 'error', 'message': 'Unknown command'}
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
-    
-    def send_status(self):
-        """Send current server status"""
-        status = {
-            'simulation_active': self.simulation_active,
-            'counter': self.counter,
-            'clients_served': self.counter,
-            'server_time': time.time()
-        }
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(status).encode())
-    
-    def send_physics_data(self):
-        """Send orbital physics data to the JavaScript client"""
-        if not self.simulation_active:
-            data = {
-                'simulation_active': False,
-                'message': 'GMAT simulation is paused'
+        with session.lock:
+            if command == 'start':
+                session.simulation_active = True
+                result = {'status': 'started', 'message': 'GMAT simulation started'}
+            elif command == 'stop':
+                session.simulation_active = False
+                result = {'status': 'stopped', 'message': 'GMAT simulation stopped'}
+            elif command == 'reset':
+                session.counter = 0
+                result = {'status': 'reset', 'message': 'Counter reset'}
+            else:
+                return {'status': 'error', 'message': 'Unknown command'}
+        if self.recorder is not None:
+            self.recorder.record_event(command, source='bridge', channel=session_channel(session))
+        return result
+    
+    def status(self, params, session):
+        """Current server status"""
+        with session.lock:
+            return {
+                'simulation_active': session.simulation_active,
+                'counter': session.counter,
+                'clients_served': self.sessions.requests_served,
+                'active_sessions': len(self.sessions),
+                'server_time': time.time()
             }
-        else:
-            data = self.generate_orbital_elements()
+    
+    def physics_data(self, params, session):
+        """Orbital physics data for the JavaScript client"""
+        with session.lock:
+            if not session.simulation_active:
+                return {
+                    'simulation_active': False,
+                    'message': 'GMAT simulation is paused'
+                }
+            session.counter += 1
+            data = self.generate_orbital_elements(session.counter)
             data['simulation_active'] = True
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Cache-Control', 'no-cache')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        if self.recorder is not None:
+            self.recorder.record_states('bridge', data['counter'], np.array([data['cartesian']]),
+                                        {field: np.array([data[field]]) for field in ELEMENT_FIELDS},
+                                        data['counter'] + 1, session_channel(session))
+        return data
     
-    def generate_orbital_elements(self):
-        """Generate realistic orbital elements with proper physics"""
-        self.counter += 1
-        t = self.counter * 0.1
-        
+    def record_event(self, params, session):
+        """
+        A client-side event for the scenario recording:
+        /event?type=impact&sim_time=<s>&x=<km>&y=<km>&z=<km>&mass=<kg>&a=<km>&e=<e>
+        (deflection takes the same fields). Accepted, unrecorded, when not recording.
+        """
+        event = params.get('type', [''])[0]
+        if event not in ('impact', 'deflection'):
+            raise BridgeError(400, 'Unknown event type')
+        try:
+            fields = {name: float(params[name][0]) for name in EVENT_FIELDS[event] if name in params}
+        except ValueError:
+            raise BridgeError(400, 'Invalid event field')
+        if self.recorder is None:
+            return {'recorded': False}
+        self.recorder.record_event(event, fields, source='client', channel=session_channel(session))
+        return {'recorded': True}
+    
+    def generate_orbital_elements(self, counter):
+        """Orbital elements and state of the session's orbit, propagated to the poll's sim time"""
         # Different orbit types
-        orbit_type = (self.counter // 100) % 4
+        orbit_type = (counter // 100) % len(ORBIT_PRESETS)
+        orbit_name, a, e, i, raan, argp = ORBIT_PRESETS[orbit_type]
         
-        if orbit_type == 0:
-            # Low Earth Orbit (ISS-like)
-            a = 6371 + 400
-            e = 0.0005
-            i = 51.6
-            raan = (t * 0.3) % 360
-            argp = 0
-            nu = (t * 4.0) % 360
-            velocity = 7.66
-            orbit_name = "Low Earth Orbit"
-        elif orbit_type == 1:
-            # Geostationary Transfer Orbit
-            a = 24500
-            e = 0.73
-            i = 28.5
-            raan = (t * 0.2) % 360
-            argp = 180
-            nu = (t * 1.5) % 360
-            velocity = 9.9
-            orbit_name = "Geostationary Transfer"
-        elif orbit_type == 2:
-            # Molniya Orbit
-            a = 26500
-            e = 0.74
-            i = 63.4
-            raan = (t * 0.15) % 360
-            argp = 270
-            nu = (t * 0.8) % 360
-            velocity = 9.5
-            orbit_name = "Molniya Orbit"
-        else:
-            # Highly Elliptical Orbit
-            a = 30000
-            e = 0.8
-            i = 45
-            raan = (t * 0.25) % 360
-            argp = 90
-            nu = (t * 0.6) % 360
-            velocity = 8.2
-            orbit_name = "Highly Elliptical"
+        t = counter * POLL_TIME_STEP
+        table = self.ephemerides[orbit_type]
+        state = table.states_at([t])[0]
+        M, nu = table.anomalies_at(t)
         
         return {
             'a': a,
@@ -136,37 +226,140 @@ class PhysicsGMATHandler(BaseHTTPRequestHandler):
             'i': i,
             'raan': raan,
             'argp': argp,
-            'M0': nu,
-            'velocity': velocity,
+            'M0': math.degrees(M),
+            'true_anomaly': math.degrees(nu),
+            'velocity': float(np.linalg.norm(state[3:])),
             'mass': 1e6,
             'orbit_type': orbit_name,
-            'altitude': a - 6371,
-            'period_hours': (2 * math.pi * math.sqrt(a**3 / 3.986004418e5)) / 3600,
-            'counter': self.counter,
+            'orbit_index': orbit_type,
+            'altitude': a - R_EARTH,
+            'period_hours': table.period / 3600,
+            'cartesian': state.tolist(),
+            'sim_time': t,
+            'counter': counter,
             'timestamp': time.time(),
         }
     
+    def ephemeris(self, params, session):
+        """
+        A window of interpolated states in one response:
+        /ephemeris?orbit=<index>&t0=<s>&t1=<s>&step=<s>
+        Defaults to the session's current orbit, starting at its sim time.
+        """
+        with session.lock:
+            counter = session.counter
+        
+        try:
+            orbit_type = int(params.get('orbit', [(counter // 100) % len(ORBIT_PRESETS)])[0])
+            t0 = float(params.get('t0', [counter * POLL_TIME_STEP])[0])
+            step = float(params.get('step', [POLL_TIME_STEP])[0])
+            t1 = float(params.get('t1', [t0 + 100 * step])[0])
+            if not 0 <= orbit_type < len(ORBIT_PRESETS) or step <= 0 or t1 < t0 \
+                    or not all(math.isfinite(x) for x in (t0, t1, step)):
+                raise ValueError
+        except ValueError:
+            raise BridgeError(400, 'Invalid ephemeris request')
+        
+        # Coarsen the step rather than sending an unbounded window
+        step = max(step, (t1 - t0) / (MAX_WINDOW_POINTS - 1))
+        times, states = self.ephemerides[orbit_type].window(t0, t1, step)
+        
+        return {
+            'orbit_type': ORBIT_PRESETS[orbit_type][0],
+            'orbit_index': orbit_type,
+            'step': step,
+            'times': times.tolist(),
+            'states': states.tolist(),
+        }
+
+class PhysicsGMATServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the bridge shared by all handlers"""
+    daemon_threads = True
+    
+    def __init__(self, server_address, handler_class, sessions=None, recorder=None):
+        super().__init__(server_address, handler_class)
+        self.bridge = PhysicsBridge(sessions, recorder)
+        self.sessions = self.bridge.sessions
+
+class PhysicsGMATHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        started = time.perf_counter()
+        parsed = urlparse(self.path)
+        self.params = parse_qs(parsed.query)
+        self.status = None
+        try:
+            self.route_get(parsed)
+        finally:
+            known = parsed.path in PhysicsBridge.ROUTES or parsed.path in ('/', '/metrics')
+            HTTP_REQUEST_SECONDS.labels(server='bridge', route=parsed.path if known else 'unmatched',
+                                        method='GET', status=self.status).observe(time.perf_counter() - started)
+    
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+    
+    def route_get(self, parsed):
+        if parsed.path == '/':
+            self.send_home_page()
+            return
+        if parsed.path == '/metrics':
+            self.send_metrics()
+            return
+        try:
+            result = self.server.bridge.dispatch(parsed.path, self.params, self.headers.get('X-Session-Id'))
+        except BridgeError as e:
+            self.send_error(e.status, str(e))
+            return
+        if result is None:
+            self.send_error(404)
+        else:
+            self.send_json(*result)
+    
+    def send_json(self, data, session, no_cache=False):
+        """Send a JSON response tagged with the client's session ID"""
+        body = json.dumps(data).encode()
+        
+        self.send_response(200)
+        for header, value in response_headers(session, no_cache):
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_metrics(self):
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('Content-type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        for header, value in PREFLIGHT_HEADERS:
+            self.send_header(header, value)
         self.end_headers()
     
-    def log_message(self, format, *args):
-        pass
+    def log_request(self, code='-', size='-'):
+        log.debug("request", client=self.client_address[0], request=self.requestline, status=code)
+    
+    def log_error(self, format, *args):
+        log.info("request_failed", client=self.client_address[0], request=self.requestline, message=format % args)
 
-def run_server():
+def run_server(record=None):
+    """Serve the bridge; ``record`` names a scenario recording to append the element feed and events to"""
     server_address = ('localhost', 8765)
-    httpd = HTTPServer(server_address, PhysicsGMATHandler)
-    print("🚀 GMAT Physics HTTP Bridge running on http://localhost:8765")
-    print("📡 Connect your asteroid simulator to this bridge")
-    print("⏹️  Press Ctrl+C to stop the server")
+    recorder = ScenarioRecorder(record) if record else None
+    httpd = PhysicsGMATServer(server_address, PhysicsGMATHandler, recorder=recorder)
+    log.info("bridge_started", url="http://localhost:8765", metrics="http://localhost:8765/metrics")
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
-        print("\n🛑 Server stopped")
+        log.info("bridge_stopped")
+    finally:
+        if recorder is not None:
+            recorder.close()
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    run_server(os.environ.get("GMAT_RECORD"))
\ No newline at end of file
@@ -0,0 +1,194 @@
+# impact_effects.py
+"""
+Impact effects for whole parameter grids in one vectorized call.
+
+Energy and the red/orange/green damage radii follow the model the impact
+map has always used (C = E / 4.184e15 km, radii 0.5C, 3C, 8C). Crater
+sizes use the Collins et al. (2005) pi-scaling, which brings in the
+impactor's density and entry angle.
+"""
+import hashlib
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+
+J_PER_MEGATON = 4.184e15  # J per megaton of TNT
+
+# Damage radii in units of C = E / J_PER_MEGATON (km)
+DAMAGE_RADII = {
+    'red': 0.5,
+    'orange': 3.0,
+    'green': 8.0,
+}
+
+EARTH_GRAVITY = 9.81         # m/s^2
+TARGET_DENSITY = 2500.0      # kg/m^3, sedimentary/crystalline rock
+DEFAULT_ANGLE = 45.0         # degrees from horizontal
+DEFAULT_DENSITY = 3000.0     # kg/m^3, stony asteroid
+SIMPLE_CRATER_LIMIT = 3200.0  # m, simple-to-complex crater transition
+
+AXES = ('mass', 'velocity', 'angle', 'density')
+MAX_GRID_POINTS = 1_000_000
+
+
+def kinetic_energy(mass, velocity):
+    """Kinetic energy (J) from mass (kg) and velocity (km/s)"""
+    return 0.5 * mass * (velocity * 1000) ** 2
+
+
+def impactor_diameter(mass, density):
+    """Diameter (m) of a spherical impactor"""
+    return (6 * mass / (np.pi * density)) ** (1 / 3)
+
+
+def crater_diameter(mass, velocity, angle, density, target_density=TARGET_DENSITY):
+    """Transient and final crater diameters (m)"""
+    L = impactor_diameter(mass, density)
+    v = velocity * 1000
+    transient = (1.161 * (density / target_density) ** (1 / 3) * L ** 0.78 * v ** 0.44
+                 * EARTH_GRAVITY ** -0.22 * np.sin(np.radians(angle)) ** (1 / 3))
+    simple = 1.25 * transient
+    complex_ = 1.17 * transient ** 1.13 / SIMPLE_CRATER_LIMIT ** 0.13
+    return transient, np.where(simple < SIMPLE_CRATER_LIMIT, simple, complex_)
+
+
+def impact_effects(mass, velocity, angle=DEFAULT_ANGLE, density=DEFAULT_DENSITY):
+    """
+    Effects for every combination of the broadcast inputs: mass (kg),
+    velocity (km/s), entry angle (degrees from horizontal) and density (kg/m^3).
+    Returns a dict of arrays with the broadcast shape.
+    """
+    mass, velocity, angle, density = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (mass, velocity, angle, density)))
+    energy = kinetic_energy(mass, velocity)
+    megatons = energy / J_PER_MEGATON
+    transient, final = crater_diameter(mass, velocity, angle, density)
+
+    effects = {
+        'energy_j': energy,
+        'tnt_megatons': megatons,
+        'impactor_diameter_m': impactor_diameter(mass, density),
+        'transient_crater_m': transient,
+        'crater_diameter_m': final,
+    }
+    for zone, factor in DAMAGE_RADII.items():
+        effects[f'radius_{zone}_km'] = factor * megatons
+    return effects
+
+
+@lru_cache(maxsize=256)
+def _cached_grid(mass, velocity, angle, density, grid):
+    if grid:
+        # One axis per parameter: shape (len(mass), len(velocity), len(angle), len(density))
+        axes = np.ix_(*(np.array(values) for values in (mass, velocity, angle, density)))
+    else:
+        axes = (np.array(values) for values in (mass, velocity, angle, density))
+    effects = impact_effects(*axes)
+    for values in effects.values():
+        values.flags.writeable = False
+    return effects
+
+
+def impact_grid(mass, velocity, angle=(DEFAULT_ANGLE,), density=(DEFAULT_DENSITY,), grid=True):
+    """
+    Memoized effects over sequences of parameter values. With ``grid`` the
+    result covers the full cartesian product of the four axes; otherwise
+    the sequences are broadcast element-wise. Returned arrays are read-only.
+    """
+    values = [tuple(float(x) for x in np.atleast_1d(v)) for v in (mass, velocity, angle, density)]
+    if grid:
+        points = int(np.prod([len(v) for v in values]))
+    else:
+        points = int(np.prod(np.broadcast_shapes(*((len(v),) for v in values))))
+    if points > MAX_GRID_POINTS:
+        raise ValueError(f"Grid of {points} points exceeds the limit of {MAX_GRID_POINTS}")
+    for name, axis in zip(AXES, values):
+        if not axis or min(axis) <= 0 or not all(np.isfinite(axis)):
+            raise ValueError(f"{name} values must be positive numbers")
+    return _cached_grid(*values, bool(grid))
+
+
+def parse_axis(text):
+    """
+    Parse a query-string axis: comma separated values ("1e6,2e6") or an
+    inclusive range "start:stop:step" ("11:72:1").
+    """
+    if ':' in text:
+        start, stop, step = (float(x) for x in text.split(':'))
+        if step <= 0 or stop < start or (stop - start) / step > MAX_GRID_POINTS:
+            raise ValueError(f"Invalid range {text!r}")
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(x) for x in text.split(',') if x.strip()])
+
+
+class KineticEnergyGrid:
+    """
+    Kinetic energies over the mass and velocity domains of the UI sliders
+    (10^3..10^9 kg in 0.1 dex, 11..72 km/s in 1 km/s), precomputed with
+    their JSON bodies and strong ETags so responses are pure lookups.
+    """
+
+    def __init__(self, mass_exponents=(3.0, 9.0, 0.1), velocities=(11.0, 72.0, 1.0)):
+        self.exp_start, self.exp_stop, self.exp_step = mass_exponents
+        self.v_start, self.v_stop, self.v_step = velocities
+        self.mass_exponents = np.round(np.arange(self.exp_start, self.exp_stop + self.exp_step / 2, self.exp_step), 6)
+        self.velocities = np.round(np.arange(self.v_start, self.v_stop + self.v_step / 2, self.v_step), 6)
+        self.energy = kinetic_energy(10.0 ** self.mass_exponents[:, None], self.velocities[None, :])
+
+        self._points = {}  # (mass index, velocity index) -> (body, etag)
+        self._curves = {}  # mass index -> (body, etag)
+        for i, exp in enumerate(self.mass_exponents):
+            mass = float(10.0 ** exp)
+            for j, velocity in enumerate(self.velocities):
+                self._points[i, j] = self.encode(point_body(mass, float(velocity), self.energy[i, j]))
+            self._curves[i] = self.encode(curve_body(mass, self.velocities, self.energy[i]))
+
+    @staticmethod
+    def encode(data):
+        body = json.dumps(data, separators=(',', ':')).encode()
+        return body, hashlib.sha1(body).hexdigest()[:20]
+
+    def mass_index(self, mass):
+        """Grid row for a mass (kg), or None outside the slider domain"""
+        if mass <= 0:
+            return None
+        i = int(round((math.log10(mass) - self.exp_start) / self.exp_step))
+        return i if 0 <= i < len(self.mass_exponents) else None
+
+    def velocity_index(self, velocity):
+        j = int(round((velocity - self.v_start) / self.v_step))
+        return j if 0 <= j < len(self.velocities) else None
+
+    def point(self, mass, velocity):
+        """(body, etag) for one mass and velocity, snapped to the grid when inside it"""
+        i, j = self.mass_index(mass), self.velocity_index(velocity)
+        if i is not None and j is not None:
+            return self._points[i, j]
+        return self.encode(point_body(mass, velocity, kinetic_energy(mass, velocity)))
+
+    def curve(self, mass):
+        """(body, etag) for the energy at every slider velocity"""
+        i = self.mass_index(mass)
+        if i is not None:
+            return self._curves[i]
+        return self.encode(curve_body(mass, self.velocities, kinetic_energy(mass, self.velocities)))
+
+
+def point_body(mass, velocity, energy):
+    return {
+        'kinetic_energy': "{:.2e}".format(energy),  # scientific notation, as the UI displays it
+        'kinetic_energy_j': float(energy),
+        'mass': mass,
+        'velocity': velocity,
+    }
+
+
+def curve_body(mass, velocities, energies):
+    return {
+        'mass': mass,
+        'velocity': [float(v) for v in velocities],
+        'kinetic_energy': ["{:.2e}".format(e) for e in energies],
+        'kinetic_energy_j': [float(e) for e in energies],
+    }
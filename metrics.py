@@ -0,0 +1,286 @@
+# metrics.py
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in one registry per process and
+render() produces the body of a /metrics endpoint. Recording is a
+bisect, a lock and two additions, cheap enough for per-frame use.
+Gauges are either set directly or computed by a callback at scrape time,
+which suits queue depths and client counts.
+
+Under gunicorn every worker process reports its own numbers, as
+prometheus_client does outside its multiprocess mode.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; requests and upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; per-frame work
+FAST_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        return [(name, (), self.value)]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Report function() at scrape time instead of a stored value"""
+        self._function = function
+
+    @property
+    def value(self):
+        return self._function() if self._function else self._value
+
+    def samples(self, name):
+        return [(name, (), self.value)]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        rows, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            rows.append((f'{name}_bucket', (('le', _number(bound)),), cumulative))
+        rows.append((f'{name}_sum', (), total))
+        rows.append((f'{name}_count', (), cumulative))
+        return rows
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """The series for one combination of label values"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key, child in sorted(self._children.items()):
+            base = tuple(zip(self.labelnames, key))
+            for sample, extra, value in child.samples(self.name):
+                lines.append(f'{sample}{_labels(base + extra)} {_number(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def render():
+    """The process's metrics as a /metrics response body"""
+    return REGISTRY.render()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread, for processes without an HTTP server of their own"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+    return server
+
+
+# The simulator's metrics
+HTTP_REQUEST_SECONDS = Histogram(
+    'asteroid_http_request_duration_seconds',
+    'Time to serve an HTTP request, streamed bodies included',
+    ('server', 'route', 'method', 'status'))
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    'asteroid_upstream_request_duration_seconds',
+    'Calls to upstream APIs by response status',
+    ('service', 'status'))
+SBDB_CACHE_LOOKUPS = Counter(
+    'asteroid_sbdb_cache_lookups_total',
+    'SBDB record cache lookups: hit, stale (served, then revalidated) or miss',
+    ('result',))
+GMAT_CONVERSION_SECONDS = Histogram(
+    'asteroid_gmat_conversion_duration_seconds',
+    'State-to-element conversion of one batch (stage=elements) and encoding of one frame (stage=encode)',
+    ('stage', 'format'), FAST_BUCKETS)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    'asteroid_websocket_send_duration_seconds',
+    'Time for one WebSocket send',
+    ('stream',), FAST_BUCKETS)
+WEBSOCKET_CLIENTS = Gauge(
+    'asteroid_websocket_clients',
+    'Connected WebSocket clients by stream mode',
+    ('stream',))
+QUEUE_DEPTH = Gauge(
+    'asteroid_queue_depth',
+    'Items waiting in in-process queues',
+    ('queue',))
+PAGE_CACHE_LOOKUPS = Counter(
+    'asteroid_page_cache_lookups_total',
+    'Rendered page cache lookups by page and result (hit or miss)',
+    ('page', 'result'))
+SCENARIO_RECORDS = Counter(
+    'asteroid_scenario_records_total',
+    'Records appended to the scenario recording, by source',
+    ('source',))
+LOG_RECORDS_SAMPLED_OUT = Counter(
+    'asteroid_log_records_sampled_out_total',
+    'Log records dropped by sampling',
+    ('logger',))
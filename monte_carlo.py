@@ -0,0 +1,189 @@
+# monte_carlo.py
+"""
+Monte Carlo close-approach and impact probabilities for a small body.
+
+Clones are sampled from a Gaussian cloud around the body's osculating
+elements and propagated (heliocentric two-body) alongside Earth on a
+shared time grid. Work is split over a ProcessPoolExecutor; the clone
+elements and per-clone results live in shared memory (shared_jobs.py),
+so each task only carries a slice range.
+
+Units inside the kernel are AU, days and radians.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from orbit_propagator import elements_to_state, mean_motion
+from shared_jobs import SharedMemoryJob, run_slice
+
+GAUSS_K = 0.01720209895          # Gaussian gravitational constant
+MU_SUN_AU = GAUSS_K ** 2         # AU^3/day^2
+AU_KM = 149597870.7
+R_EARTH_AU = 6371.0 / AU_KM
+MU_EARTH_AU = 3.986004418e5 * 86400 ** 2 / AU_KM ** 3  # AU^3/day^2
+J2000 = 2451545.0
+
+# Earth's mean heliocentric elements at J2000 (AU, rad)
+EARTH_ELEMENTS = {
+    'a': 1.00000261,
+    'e': 0.01671123,
+    'i': math.radians(-0.00001531),
+    'raan': 0.0,
+    'argp': math.radians(102.93768193),
+    'M0': math.radians(100.46457166 - 102.93768193),
+}
+
+# Default 1-sigma element uncertainties: a [AU], e, then angles [deg]
+DEFAULT_SIGMAS = (1e-6, 1e-6, 1e-5, 1e-5, 1e-5, 1e-4)
+
+ELEMENT_ORDER = ('a', 'e', 'i', 'raan', 'argp', 'M0')
+RESULT_COLUMNS = ('miss_distance_au', 'time_days', 'v_inf_au_per_day')
+
+TASK_SIZE = 20000   # clones per pool task
+KERNEL_CHUNK = 256  # clones per vectorized kernel call
+REFINE_POINTS = 33  # fine samples across +/- one coarse step
+
+
+def sample_clones(elements, n, sigmas=DEFAULT_SIGMAS, sigma_scale=1.0, seed=None):
+    """
+    (n, 6) clone elements [a, e, i, raan, argp, M0] in AU and radians,
+    drawn around ``elements`` (AU and degrees, as in SBDB records).
+    """
+    rng = np.random.default_rng(seed)
+    nominal = np.array([elements['a'], elements['e']] +
+                       [math.radians(elements.get(key) or 0.0) for key in ELEMENT_ORDER[2:]])
+    spread = np.array(sigmas[:2] + tuple(math.radians(s) for s in sigmas[2:])) * sigma_scale
+    clones = nominal + rng.standard_normal((n, 6)) * spread
+    clones[:, 1] = np.clip(clones[:, 1], 0.0, 0.999999)
+    return clones
+
+
+def earth_states(times, epoch):
+    """Earth heliocentric states (T, 6) at ``times`` days after JD ``epoch``"""
+    el = EARTH_ELEMENTS
+    M = el['M0'] + float(mean_motion(el['a'], MU_SUN_AU)) * (epoch - J2000 + np.asarray(times))
+    return elements_to_state(el['a'], el['e'], el['i'], el['raan'], el['argp'], M, MU_SUN_AU)
+
+
+def close_approach_kernel(clones, times, earth, epoch):
+    """
+    Minimum Earth distance for each clone: a coarse scan over ``times``,
+    then a fine scan of REFINE_POINTS around the coarse minimum and a
+    final linear-motion correction.
+    Returns (n, 3): miss distance [AU], time [days], relative speed [AU/day].
+    """
+    a, e, i, raan, argp, M0 = (clones[:, k:k + 1] for k in range(6))
+    n = mean_motion(a, MU_SUN_AU)
+
+    rel = elements_to_state(a, e, i, raan, argp, M0 + n * times[None, :], MU_SUN_AU) - earth[None]
+    dist2 = np.einsum('ntc,ntc->nt', rel[..., :3], rel[..., :3])
+    coarse = times[np.argmin(dist2, axis=1)]
+
+    step = times[1] - times[0] if len(times) > 1 else 0.0
+    fine = coarse[:, None] + np.linspace(-step, step, REFINE_POINTS)[None, :]  # (n, R)
+    rel = (elements_to_state(a, e, i, raan, argp, M0 + n * fine, MU_SUN_AU)
+           - earth_states(fine, epoch))
+    dist2 = np.einsum('nrc,nrc->nr', rel[..., :3], rel[..., :3])
+    k = np.argmin(dist2, axis=1)
+    rows = np.arange(len(clones))
+    r = rel[rows, k, :3]
+    v = rel[rows, k, 3:]
+
+    # Closest approach of the straight-line relative motion within one fine step
+    fine_step = 2 * step / (REFINE_POINTS - 1)
+    v2 = np.einsum('nc,nc->n', v, v)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dt = np.clip(-np.einsum('nc,nc->n', r, v) / v2, -fine_step, fine_step)
+    dt = np.where(v2 > 0, dt, 0.0)
+    miss = np.linalg.norm(r + v * dt[:, None], axis=1)
+    return np.stack([miss, fine[rows, k] + dt, np.sqrt(v2)], axis=1)
+
+
+def _run_task(input_name, output_name, n, start, stop, days, step, epoch):
+    """Pool task: process clones[start:stop] from shared memory into the shared results"""
+    times = np.arange(0.0, days + step / 2, step)
+    earth = earth_states(times, epoch)
+    return run_slice(lambda clones: close_approach_kernel(clones, times, earth, epoch),
+                     input_name, output_name, n, 6, len(RESULT_COLUMNS), start, stop, KERNEL_CHUNK)
+
+
+def impact_radius_au(v_inf):
+    """Earth capture radius including gravitational focusing"""
+    with np.errstate(divide='ignore'):
+        return R_EARTH_AU * np.sqrt(1 + 2 * MU_EARTH_AU / (R_EARTH_AU * v_inf ** 2))
+
+
+def summarize(results, approach_au):
+    """Probabilities and statistics from per-clone results (n, 3)"""
+    miss, _, v_inf = results.T
+    impacts = miss < impact_radius_au(v_inf)
+    n = len(results)
+    return {
+        'clones': n,
+        'impact_probability': float(impacts.mean()) if n else 0.0,
+        'close_approach_probability': float((miss < approach_au).mean()) if n else 0.0,
+        'close_approach_threshold_km': approach_au * AU_KM,
+        'min_miss_distance_km': float(miss.min() * AU_KM) if n else None,
+        'median_miss_distance_km': float(np.median(miss) * AU_KM) if n else None,
+    }
+
+
+class MonteCarloJob(SharedMemoryJob):
+    """One impact-probability run over a cloud of clones"""
+
+    task_size = TASK_SIZE
+    output_columns = len(RESULT_COLUMNS)
+
+    def __init__(self, elements, clones=100000, days=365.0, step=2.0, approach_km=7.5e6,
+                 sigma_scale=1.0, sigmas=DEFAULT_SIGMAS, seed=None):
+        self.elements = elements
+        self.n = int(clones)
+        self.days = float(days)
+        self.step = float(step)
+        self.approach_au = approach_km / AU_KM
+        self.epoch = elements.get('epoch') or J2000
+        self.clones = sample_clones(elements, self.n, sigmas, sigma_scale, seed)
+
+    def prepare(self):
+        return self.clones
+
+    def task(self, input_name, output_name, start, stop):
+        return _run_task, (input_name, output_name, self.n, start, stop, self.days, self.step, self.epoch)
+
+    def collect(self, results):
+        return summarize(results, self.approach_au)
+
+
+def default_executor(workers=None):
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Monte Carlo Earth impact probability")
+    parser.add_argument("--a", type=float, default=0.9224, help="semi-major axis (AU)")
+    parser.add_argument("--e", type=float, default=0.1911)
+    parser.add_argument("--i", type=float, default=3.339, help="inclination (deg)")
+    parser.add_argument("--raan", type=float, default=203.96)
+    parser.add_argument("--argp", type=float, default=126.61)
+    parser.add_argument("--M0", type=float, default=0.0)
+    parser.add_argument("--epoch", type=float, default=J2000, help="JD (TDB)")
+    parser.add_argument("--clones", type=int, default=100000)
+    parser.add_argument("--days", type=float, default=365.0)
+    parser.add_argument("--sigma-scale", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    elements = {k: getattr(args, k) for k in ('a', 'e', 'i', 'raan', 'argp', 'M0', 'epoch')}
+    job = MonteCarloJob(elements, args.clones, args.days, sigma_scale=args.sigma_scale)
+    with default_executor(args.workers) as executor:
+        result = job.run(executor, lambda done, total: print(f"{done}/{total} clones"))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
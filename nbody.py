@@ -0,0 +1,245 @@
+# nbody.py
+"""
+Vectorized N-body propagation of the Sun, Earth and Moon together with
+any number of massless asteroids.
+
+Two schemes are available:
+
+* ``leapfrog``: fixed-step, symplectic kick-drift-kick
+* ``rk45``: adaptive Dormand-Prince 5(4) with a shared step for the batch
+
+Units are km, s and km^3/s^2. Output trajectories use the same
+``[x, y, z, vx, vy, vz]`` rows as GMATIntegration.read_gmat_trajectory,
+centred on Earth by default.
+"""
+import math
+import time
+
+import numpy as np
+
+from orbit_propagator import elements_to_state, MU_EARTH
+
+MU_SUN = 1.32712440018e11  # km^3/s^2
+MU_MOON = 4.9028000661e3   # km^3/s^2
+AU_KM = 149597870.7
+
+SUN, EARTH, MOON = 0, 1, 2
+MASSIVE_BODIES = ('Sun', 'Earth', 'Moon')
+
+SCHEMES = ('leapfrog', 'rk45')
+
+
+def default_massive_states(earth_phase=0.0, moon_phase=0.0):
+    """
+    Approximate barycentric states (3, 6) of the Sun, Earth and Moon.
+    Earth-Moon barycentre on Earth's mean heliocentric orbit, Moon on its
+    mean geocentric orbit; total momentum is zero.
+    """
+    mu_em = MU_EARTH + MU_MOON
+    barycentre = elements_to_state(AU_KM * 1.00000261, 0.01671123, math.radians(-0.00001531),
+                                   0.0, math.radians(102.93768193), earth_phase, MU_SUN + mu_em)
+    moon_rel = elements_to_state(384400.0, 0.0549, math.radians(5.145), 0.0, 0.0, moon_phase, mu_em)
+
+    states = np.zeros((3, 6))
+    states[EARTH] = barycentre - moon_rel * (MU_MOON / mu_em)
+    states[MOON] = barycentre + moon_rel * (MU_EARTH / mu_em)
+
+    # Put the Sun where the total momentum (and centre of mass) is zero
+    mus = np.array([MU_SUN, MU_EARTH, MU_MOON])
+    states[SUN] = -(mus[1:, None] * states[1:]).sum(axis=0) / MU_SUN
+    return states
+
+
+class NBodySystem:
+    """Massive bodies plus a batch of massless asteroids, integrated together"""
+
+    def __init__(self, massive_states=None, massive_mu=(MU_SUN, MU_EARTH, MU_MOON)):
+        massive = default_massive_states() if massive_states is None else massive_states
+        self.massive_mu = np.asarray(massive_mu, dtype=np.float64)
+        self.n_massive = len(self.massive_mu)
+        self.states = np.array(massive, dtype=np.float64).reshape(self.n_massive, 6)
+        self.t = 0.0
+        self.stats = {}
+
+    @property
+    def n_particles(self):
+        return len(self.states) - self.n_massive
+
+    def add_particles(self, states, center=EARTH):
+        """
+        Add asteroids from (N, 6) states relative to a massive body
+        (Earth by default, like GMAT EarthMJ2000Eq output). Returns their indices.
+        """
+        states = np.asarray(states, dtype=np.float64).reshape(-1, 6)
+        if center is not None:
+            states = states + self.states[center]
+        first = len(self.states)
+        self.states = np.concatenate([self.states, states])
+        return np.arange(first, len(self.states))
+
+    def accelerations(self, r):
+        """Accelerations (B, 3) of every body from the massive bodies"""
+        m = self.n_massive
+        d = r[None, :m, :] - r[:, None, :]  # (B, M, 3): from body to source
+        dist2 = np.einsum('bmc,bmc->bm', d, d)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = self.massive_mu[None, :] / (dist2 * np.sqrt(dist2))
+        scale[np.arange(m), np.arange(m)] = 0.0  # no self-attraction
+        return np.einsum('bm,bmc->bc', scale, d)
+
+    def _derivative(self, y):
+        return np.concatenate([y[:, 3:], self.accelerations(y[:, :3])], axis=1)
+
+    def _leapfrog(self, y, dt, a):
+        """One kick-drift-kick step from y with accelerations a; returns (y, a) at its end"""
+        v_half = y[:, 3:] + 0.5 * dt * a
+        r = y[:, :3] + dt * v_half
+        a = self.accelerations(r)
+        v = v_half + 0.5 * dt * a
+        return np.concatenate([r, v], axis=1), a
+
+    # Dormand-Prince 5(4) tableau
+    _DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+    _DP_A = (
+        (),
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    )
+    _DP_B5 = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+    _DP_B4 = np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+    def _dormand_prince(self, y, dt, k1):
+        """One DP5(4) step; returns (y5, error estimate, derivative at y5)"""
+        k = [k1]
+        for stage in range(1, 7):
+            increment = sum(a * k[j] for j, a in enumerate(self._DP_A[stage]) if a)
+            k.append(self._derivative(y + dt * increment))
+        ks = np.stack(k)
+        y5 = y + dt * np.tensordot(self._DP_B5, ks, axes=1)
+        error = dt * np.tensordot(self._DP_B5 - self._DP_B4, ks, axes=1)
+        return y5, error, k[6]
+
+    def propagate(self, duration, dt=600.0, scheme='leapfrog', output_step=None,
+                  rtol=1e-9, atol=1e-3, max_steps=10_000_000):
+        """
+        Integrate for ``duration`` seconds. ``dt`` is the fixed step for
+        leapfrog and the initial step for rk45. States are recorded every
+        ``output_step`` seconds (default: every leapfrog step / ``dt``).
+        Returns (times, states) with states shaped (T, bodies, 6). Raises
+        RuntimeError if rk45 needs more than ``max_steps`` steps.
+        """
+        if scheme not in SCHEMES:
+            raise ValueError(f"Unknown scheme {scheme!r}, expected one of {SCHEMES}")
+        output_step = output_step or dt
+        if scheme == 'leapfrog':
+            # Leapfrog outputs land on whole steps
+            output_step = dt * max(1, round(output_step / dt))
+
+        t_end = self.t + duration
+        outputs = np.arange(self.t, t_end + output_step / 2, output_step)
+        times = [self.t]
+        frames = [self.states.copy()]
+        y = self.states
+        t = self.t
+        steps = 0
+        rejected = 0
+        start = time.perf_counter()
+
+        if scheme == 'leapfrog':
+            per_output = int(round(output_step / dt))
+            n_steps = int(round(duration / dt))
+            a = self.accelerations(y[:, :3])
+            for step in range(1, n_steps + 1):
+                y, a = self._leapfrog(y, dt, a)
+                steps += 1
+                if step % per_output == 0 or step == n_steps:
+                    times.append(self.t + step * dt)
+                    frames.append(y.copy())
+            t = self.t + n_steps * dt
+        else:
+            h = dt
+            k1 = self._derivative(y)
+            next_output = 1
+            while t < t_end - 1e-9 and steps < max_steps:
+                # Never step past the next output epoch
+                target = outputs[next_output] if next_output < len(outputs) else t_end
+                h_step = min(h, target - t)
+                y_new, error, k_new = self._dormand_prince(y, h_step, k1)
+                scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+                err = float(np.sqrt(np.mean((error / scale) ** 2)))
+                if err <= 1.0:
+                    t += h_step
+                    y, k1 = y_new, k_new
+                    steps += 1
+                    if abs(t - target) < 1e-9:
+                        times.append(t)
+                        frames.append(y.copy())
+                        next_output += 1
+                else:
+                    rejected += 1
+                factor = 0.9 * err ** -0.2 if err > 0 else 5.0
+                h = h_step * min(5.0, max(0.2, factor))
+            if t < t_end - 1e-9:
+                raise RuntimeError(f"rk45 stopped after max_steps={max_steps} accepted steps "
+                                   f"at t={t:.1f} s, short of t={t_end:.1f} s")
+
+        elapsed = time.perf_counter() - start
+        self.states = y
+        self.t = t
+        self.stats = {
+            'scheme': scheme,
+            'steps': steps,
+            'rejected_steps': rejected,
+            'bodies': len(y),
+            'elapsed_s': elapsed,
+            'steps_per_second': steps / elapsed if elapsed > 0 else float('inf'),
+            'body_steps_per_second': steps * len(y) / elapsed if elapsed > 0 else float('inf'),
+        }
+        return np.array(times), np.stack(frames)
+
+    @staticmethod
+    def trajectory(states, index, center=EARTH):
+        """(T, 6) rows [x, y, z, vx, vy, vz] of one body relative to ``center``"""
+        rows = states[:, index, :]
+        if center is not None:
+            rows = rows - states[:, center, :]
+        return np.ascontiguousarray(rows)
+
+
+def write_report_file(filename, rows):
+    """Write (T, 6) states as a GMAT-style ReportFile readable by read_gmat_trajectory"""
+    with open(filename, 'w') as f:
+        f.write("X Y Z VX VY VZ\n")
+        np.savetxt(f, rows, fmt='%.10f')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Propagate an asteroid with the Sun, Earth and Moon")
+    parser.add_argument("--state", type=float, nargs=6, metavar=("X", "Y", "Z", "VX", "VY", "VZ"),
+                        default=[1.5e6, 0.0, 0.0, -1.0, 0.3, 0.0],
+                        help="Earth-centred initial state (km, km/s)")
+    parser.add_argument("--days", type=float, default=30.0)
+    parser.add_argument("--dt", type=float, default=600.0, help="step (leapfrog) or initial step (rk45), s")
+    parser.add_argument("--output-step", type=float, default=3600.0, help="s between recorded states")
+    parser.add_argument("--scheme", choices=SCHEMES, default="leapfrog")
+    parser.add_argument("--out", default="AsteroidTrajectory.txt")
+    args = parser.parse_args()
+
+    system = NBodySystem()
+    index = system.add_particles(args.state)[0]
+    _, states = system.propagate(args.days * 86400, args.dt, args.scheme, args.output_step)
+    write_report_file(args.out, NBodySystem.trajectory(states, index))
+
+    stats = system.stats
+    print(f"{stats['steps']} {stats['scheme']} steps in {stats['elapsed_s']:.3f} s "
+          f"({stats['steps_per_second']:.0f} steps/s), wrote {len(states)} states to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# orbit_geometry.py
+"""
+Curvature-adaptive orbit polylines for the 3D view.
+
+Points are spaced along the ellipse so that no chord strays further than
+``tolerance`` from the true curve: dense around a sharp periapsis, sparse
+along the flat stretches. Results are packed float32 xyz buffers kept in
+a bounded LRU cache keyed on quantized elements.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 1e-4  # max chord deviation as a fraction of a
+MIN_POINTS = 32
+MAX_POINTS = 16384
+DENSITY_SAMPLES = 4096    # grid used to integrate the point density
+
+# Quantization of cache keys: a and tolerance (significant digits), e, angles [deg]
+A_DIGITS = 6
+E_QUANTUM = 1e-4
+ANGLE_QUANTUM = 0.01
+TOLERANCE_DIGITS = 2
+
+
+def adaptive_eccentric_anomalies(e, tolerance=DEFAULT_TOLERANCE):
+    """
+    Eccentric anomalies in [0, 2 pi] for a unit-a ellipse such that each
+    chord's sagitta stays within ``tolerance``.
+
+    For a step dE the sagitta is about k |r'|^2 dE^2 / 8 with curvature
+    k = b / |r'|^3 and speed |r'| = sqrt(sin^2 E + b^2 cos^2 E), so the
+    point density is 1 / dE = sqrt(b / (8 tolerance |r'|)).
+    """
+    b = math.sqrt(1 - e * e)
+    E = np.linspace(0.0, 2 * np.pi, DENSITY_SAMPLES + 1)
+    speed = np.sqrt(np.sin(E) ** 2 + (b * np.cos(E)) ** 2)
+    density = np.sqrt(b / (8 * tolerance * speed))
+
+    # Cumulative point count along the orbit (trapezoid rule), then invert it
+    cumulative = np.concatenate([[0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(E))])
+    count = int(min(max(math.ceil(cumulative[-1]), MIN_POINTS), MAX_POINTS))
+    return np.interp(np.linspace(0.0, cumulative[-1], count + 1), cumulative, E)
+
+
+def orbit_points(a, e, i, raan, argp, tolerance=DEFAULT_TOLERANCE):
+    """
+    Closed (N + 1, 3) polyline of the orbit in the inertial frame. Angles
+    are in degrees; the first point (periapsis) is repeated at the end.
+    """
+    E = adaptive_eccentric_anomalies(e, tolerance)
+    x_pf = a * (np.cos(E) - e)
+    y_pf = a * math.sqrt(1 - e * e) * np.sin(E)
+
+    # First two columns of R = R3(raan) * R1(i) * R3(argp)
+    cO, sO = math.cos(math.radians(raan)), math.sin(math.radians(raan))
+    co, so = math.cos(math.radians(argp)), math.sin(math.radians(argp))
+    ci, si = math.cos(math.radians(i)), math.sin(math.radians(i))
+    p = np.array([cO * co - sO * so * ci, sO * co + cO * so * ci, so * si])
+    q = np.array([-cO * so - sO * co * ci, -sO * so + cO * co * ci, co * si])
+    return x_pf[:, None] * p + y_pf[:, None] * q
+
+
+def quantize(a, e, i, raan, argp, tolerance):
+    """
+    Cache key: elements snapped to display precision. a keeps A_DIGITS
+    significant digits, so small orbits do not collapse to a point, and e
+    stays below 1 so the key is still an ellipse.
+    """
+    return (
+        float(f"{a:.{A_DIGITS - 1}e}"),
+        min(round(e / E_QUANTUM) * E_QUANTUM, 1 - E_QUANTUM),
+        round(i / ANGLE_QUANTUM) * ANGLE_QUANTUM,
+        round((raan % 360) / ANGLE_QUANTUM) * ANGLE_QUANTUM,
+        round((argp % 360) / ANGLE_QUANTUM) * ANGLE_QUANTUM,
+        float(f"{tolerance:.{TOLERANCE_DIGITS - 1}e}"),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _packed_geometry(a, e, i, raan, argp, tolerance):
+    return orbit_points(a, e, i, raan, argp, tolerance).astype('<f4').tobytes()
+
+
+def orbit_geometry(a, e, i=0.0, raan=0.0, argp=0.0, tolerance=DEFAULT_TOLERANCE):
+    """
+    Packed little-endian float32 xyz buffer for an orbit (a in km, angles
+    in degrees), plus the quantized key it was built from.
+    """
+    if not a > 0 or not 0 <= e < 1 or not 0 < tolerance < 1:
+        raise ValueError("Need a > 0, 0 <= e < 1 and 0 < tolerance < 1")
+    if not all(map(math.isfinite, (a, i, raan, argp))):
+        raise ValueError("Orbital elements must be finite")
+    key = quantize(a, e, i, raan, argp, tolerance)
+    return _packed_geometry(*key), key
@@ -0,0 +1,165 @@
+# orbit_propagator.py
+"""
+Vectorized two-body propagation: Kepler's equation over many bodies and
+epochs at once, and per-orbit ephemeris tables that serve interpolated
+states for any time range.
+"""
+import math
+
+import numpy as np
+
+MU_EARTH = 3.986004418e5  # Earth gravitational parameter (km^3/s^2)
+R_EARTH = 6371.0          # mean Earth radius (km)
+
+
+def solve_kepler(M, e, tol=1e-12, max_iter=50):
+    """
+    Solve Kepler's equation E - e sin E = M for elliptic orbits with
+    Newton-Raphson. M and e broadcast against each other; iteration stops
+    once every element has converged to ``tol``.
+    """
+    M, e = np.broadcast_arrays(np.asarray(M, dtype=np.float64), np.asarray(e, dtype=np.float64))
+    M = np.remainder(M, 2 * np.pi)
+    E = np.where(e < 0.8, M, np.pi)  # initial guess
+    for _ in range(max_iter):
+        dE = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E = E - dE
+        if np.all(np.abs(dE) < tol):
+            break
+    return E
+
+
+def true_anomaly(E, e):
+    """True anomaly (radians) from eccentric anomaly"""
+    return 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+
+
+def mean_motion(a, mu=MU_EARTH):
+    return np.sqrt(mu / np.asarray(a, dtype=np.float64) ** 3)
+
+
+def elements_to_state(a, e, i, raan, argp, M, mu=MU_EARTH):
+    """
+    Cartesian states (..., 6) from Keplerian elements. Angles are in
+    radians; all arguments broadcast against each other.
+    """
+    a, e, i, raan, argp, M = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                                   for x in (a, e, i, raan, argp, M)))
+    E = solve_kepler(M, e)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    root = np.sqrt(1 - e * e)
+
+    # Perifocal position and velocity
+    x_pf = a * (cos_E - e)
+    y_pf = a * root * sin_E
+    rate = np.sqrt(mu / a) / (1 - e * cos_E)
+    vx_pf = -rate * sin_E
+    vy_pf = rate * root * cos_E
+
+    # Rotation matrix R = R3(raan) * R1(i) * R3(argp), first two columns
+    cO, sO = np.cos(raan), np.sin(raan)
+    co, so = np.cos(argp), np.sin(argp)
+    ci, si = np.cos(i), np.sin(i)
+    p = np.stack([cO * co - sO * so * ci, sO * co + cO * so * ci, so * si], axis=-1)
+    q = np.stack([-cO * so - sO * co * ci, -sO * so + cO * co * ci, co * si], axis=-1)
+
+    r = x_pf[..., None] * p + y_pf[..., None] * q
+    v = vx_pf[..., None] * p + vy_pf[..., None] * q
+    return np.concatenate([r, v], axis=-1)
+
+
+def state_to_elements(states, mu=MU_EARTH):
+    """
+    Keplerian elements (..., 6) [a, e, i, raan, argp, M] in radians from
+    elliptic Cartesian states (..., 6); the inverse of elements_to_state.
+    Circular and equatorial orbits get a consistent, if arbitrary, node
+    and periapsis, so the states round-trip.
+    """
+    states = np.asarray(states, dtype=np.float64)
+    r_vec, v_vec = states[..., :3], states[..., 3:]
+    r = np.linalg.norm(r_vec, axis=-1)
+    h_vec = np.cross(r_vec, v_vec)
+    h = np.linalg.norm(h_vec, axis=-1)
+
+    a = 1.0 / (2.0 / r - np.einsum('...c,...c->...', v_vec, v_vec) / mu)
+    e_cos_E = 1 - r / a
+    e_sin_E = np.einsum('...c,...c->...', r_vec, v_vec) / np.sqrt(mu * a)
+    e = np.hypot(e_cos_E, e_sin_E)
+    E = np.arctan2(e_sin_E, e_cos_E)
+
+    i = np.arctan2(np.hypot(h_vec[..., 0], h_vec[..., 1]), h_vec[..., 2])
+    raan = np.arctan2(h_vec[..., 0], -h_vec[..., 1])
+    node = np.stack([np.cos(raan), np.sin(raan), np.zeros_like(raan)], axis=-1)
+    # Argument of latitude: angle from the node to r in the orbit plane
+    u = np.arctan2(np.einsum('...c,...c->...', r_vec, np.cross(h_vec, node)) / h,
+                   np.einsum('...c,...c->...', r_vec, node))
+    argp = np.remainder(u - true_anomaly(E, e), 2 * np.pi)
+    return np.stack([a, e, i, np.remainder(raan, 2 * np.pi), argp, E - e_sin_E], axis=-1)
+
+
+def propagate(a, e, i, raan, argp, M0, times, mu=MU_EARTH):
+    """
+    States (bodies, epochs, 6) for every body at every time (s after epoch).
+    Element arguments are length-``bodies`` arrays (angles in radians).
+    """
+    elements = [np.atleast_1d(np.asarray(x, dtype=np.float64))[:, None] for x in (a, e, i, raan, argp, M0)]
+    a, e, i, raan, argp, M0 = elements
+    M = M0 + mean_motion(a, mu) * np.asarray(times, dtype=np.float64)[None, :]
+    return elements_to_state(a, e, i, raan, argp, M, mu)
+
+
+class EphemerisTable:
+    """
+    Precomputed states over one orbital period, sampled uniformly in time.
+    States at arbitrary times are rebuilt by cubic Hermite interpolation:
+    position from position and velocity, velocity from velocity and the
+    two-body acceleration.
+    """
+
+    def __init__(self, a, e, i, raan, argp, M0=0.0, mu=MU_EARTH, samples=2048):
+        self.elements = {'a': a, 'e': e, 'i': i, 'raan': raan, 'argp': argp, 'M0': M0}
+        self.mu = mu
+        self.period = 2 * math.pi / float(mean_motion(a, mu))
+        self.step = self.period / samples
+        # One extra sample so interval k always has a right-hand node
+        times = np.arange(samples + 1) * self.step
+        M = M0 + float(mean_motion(a, mu)) * times
+        self.states = elements_to_state(a, e, i, raan, argp, M, mu)
+        self.accelerations = self._acceleration(self.states[:, :3])
+
+    def _acceleration(self, r):
+        norm = np.linalg.norm(r, axis=-1, keepdims=True)
+        return -self.mu * r / norm ** 3
+
+    def states_at(self, times):
+        """Interpolated (N, 6) states at times (s after epoch)"""
+        times = np.remainder(np.asarray(times, dtype=np.float64), self.period)
+        k = np.minimum((times / self.step).astype(np.int64), len(self.states) - 2)
+        s = ((times - k * self.step) / self.step)[:, None]
+        h = self.step
+
+        s2, s3 = s * s, s * s * s
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = s3 - 2 * s2 + s
+        h01 = -2 * s3 + 3 * s2
+        h11 = s3 - s2
+
+        r0, r1 = self.states[k, :3], self.states[k + 1, :3]
+        v0, v1 = self.states[k, 3:], self.states[k + 1, 3:]
+        a0, a1 = self.accelerations[k], self.accelerations[k + 1]
+
+        r = h00 * r0 + h10 * h * v0 + h01 * r1 + h11 * h * v1
+        v = h00 * v0 + h10 * h * a0 + h01 * v1 + h11 * h * a1
+        return np.concatenate([r, v], axis=1)
+
+    def window(self, t_start, t_end, step):
+        """Times and interpolated states from t_start to t_end (inclusive) every step seconds"""
+        times = np.arange(t_start, t_end + step / 2, step, dtype=np.float64)
+        return times, self.states_at(times)
+
+    def anomalies_at(self, t):
+        """Mean and true anomaly (radians) at time t"""
+        e = self.elements['e']
+        M = (self.elements['M0'] + float(mean_motion(self.elements['a'], self.mu)) * t) % (2 * math.pi)
+        E = solve_kepler(M, e)
+        return M, float(true_anomaly(E, e)) % (2 * math.pi)
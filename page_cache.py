@@ -0,0 +1,138 @@
+# page_cache.py
+"""
+Rendered pages and static files, compressed once and served many times.
+
+A Page holds a body with its gzip and (when the brotli package is
+installed) brotli variants, made when the page is rendered, plus a
+strong ETag per variant. Responses pick a variant from Accept-Encoding,
+always say ``Vary: Accept-Encoding`` and answer a matching If-None-Match
+with 304. PageCache memoizes pages by the inputs they were rendered from,
+in a bounded LRU.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always offered
+    brotli = None
+
+from metrics import PAGE_CACHE_LOOKUPS
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+MIN_COMPRESS_SIZE = 512  # bytes; smaller bodies are only sent as they are
+PREFERRED_ENCODINGS = ('br', 'gzip')  # server preference among those the client accepts
+
+
+def compress(body):
+    """{encoding: bytes} for body, keeping only variants that come out smaller"""
+    variants = {'identity': body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+    candidates = {'gzip': gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        candidates['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    variants.update((name, data) for name, data in candidates.items() if len(data) < len(body))
+    return variants
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows, by name ('*' included)"""
+    accepted, refused = set(), set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(name)
+    if '*' in accepted:
+        accepted.update(name for name in PREFERRED_ENCODINGS if name not in refused)
+    return accepted
+
+
+class Page:
+    """A body with its compressed variants and their strong ETags"""
+
+    def __init__(self, body, content_type):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.variants = compress(body)
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etags = {name: digest if name == 'identity' else f"{digest}-{name}" for name in self.variants}
+
+    def select(self, accept_encoding):
+        """(encoding, body, etag) of the variant to send for an Accept-Encoding header"""
+        accepted = accepted_encodings(accept_encoding)
+        for name in PREFERRED_ENCODINGS:
+            if name in accepted and name in self.variants:
+                return name, self.variants[name], self.etags[name]
+        return 'identity', self.variants['identity'], self.etags['identity']
+
+    def matches(self, if_none_match, etag):
+        """Whether an If-None-Match header already names ``etag``"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/').strip('"') == etag for tag in tags)
+
+
+class PageCache:
+    """
+    Pages by the inputs they were rendered from, least recently used
+    evicted first. Keys are tuples starting with the page's name.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render, content_type='text/html; charset=utf-8'):
+        """The page for ``key``, calling render() for its body on a miss"""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+        if page is not None:
+            PAGE_CACHE_LOOKUPS.labels(page=key[0], result='hit').inc()
+            return page
+        PAGE_CACHE_LOOKUPS.labels(page=key[0], result='miss').inc()
+        page = Page(render(), content_type)
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+def precompress_directory(folder):
+    """{relative path: Page} for every file under ``folder``, with '/' separators"""
+    pages = {}
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+                content_type += '; charset=utf-8'
+            with open(path, 'rb') as f:
+                pages[os.path.relpath(path, folder).replace(os.sep, '/')] = Page(f.read(), content_type)
+    return pages
@@ -0,0 +1,343 @@
+# sbdb_service.py
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import QUEUE_DEPTH, SBDB_CACHE_LOOKUPS, UPSTREAM_REQUEST_SECONDS
+from structured_logging import get_logger
+
+# NASA JPL Small Body Database API endpoint
+SBDB_URL = "https://ssd-api.jpl.nasa.gov/sbdb.api"
+
+# Asteroid SPK-ID mapping (NASA's internal IDs)
+PRESET_ASTEROIDS = {
+    "Bennu (101955)": "2101955",
+    "Apophis (99942)": "2099942",
+    "Ryugu (162173)": "2162173",
+    "Didymos (65803)": "2065803",
+    "Eros (433)": "2000433",
+    "Itokawa (25143)": "2025143",
+    "Vesta (4)": "2000004",
+    "Ceres (1)": "2000001"
+}
+
+GM_SUN = 1.32712440018e20  # m^3/s^2
+AU_M = 1.496e11  # meters per AU
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sbdb_cache")
+
+log = get_logger("sbdb")
+
+# Live services, for the revalidation queue gauge
+_services = weakref.WeakSet()
+QUEUE_DEPTH.labels(queue="sbdb_revalidation").set_function(
+    lambda: sum(len(service._refreshing) for service in list(_services)))
+
+
+def build_asteroid(name, spk_id, full_name, a, e, inc, diameter, mass, neo_flag, pha_flag,
+                   raan=None, argp=None, M0=None, epoch=None):
+    """Build the asteroid record rendered by preset.html"""
+    # Calculate approximate velocity (simplified)
+    orbital_velocity = (GM_SUN / (a * AU_M)) ** 0.5 / 1000 if a > 0 else 0  # km/s
+
+    # Determine hazard level
+    if pha_flag:
+        hazard = "high"
+    elif neo_flag:
+        hazard = "medium"
+    else:
+        hazard = "low"
+
+    asteroid = {
+        "nasa_id": spk_id,
+        "name": full_name,
+        "description": f"{'Potentially Hazardous ' if pha_flag else ''}{'Near-Earth ' if neo_flag else ''}Asteroid - Data from NASA JPL",
+        "a": round(a, 3),
+        "e": round(e, 3),
+        "inc": round(inc, 3),
+        "diameter": round(diameter, 2) if diameter else None,
+        "mass": mass,
+        "velocity": round(orbital_velocity, 1),
+        "hazard": hazard,
+        "image": f"{name.split(' ')[0].lower()}.jpg",
+        "mission": "Multiple observations"
+    }
+
+    # Full-precision osculating elements, when known, for propagation
+    if None not in (raan, argp, M0):
+        asteroid["orbit"] = {
+            "a": a, "e": e, "i": inc,                 # AU, -, degrees
+            "raan": raan, "argp": argp, "M0": M0,     # degrees
+            "epoch": epoch,                           # JD (TDB)
+        }
+    return asteroid
+
+
+def extract_sbdb_fields(data):
+    """Pull the raw orbital and physical fields out of an sbdb.api JSON payload"""
+    # Convert elements list to dictionary for easy access
+    elements = data.get('orbit', {}).get('elements', [])
+    elements_dict = {elem['name']: elem['value'] for elem in elements}
+
+    physical_data = data.get('physical_parameters', [])
+    physical_dict = {param['name']: param['value'] for param in physical_data}
+
+    # Get diameter (convert from meters to km)
+    diameter = None
+    if 'diameter' in physical_dict:
+        diameter = float(physical_dict['diameter']) / 1000
+    elif 'A' in physical_dict:  # Sometimes diameter is labeled as 'A'
+        diameter = float(physical_dict['A']) / 1000
+
+    def optional(key):
+        return float(elements_dict[key]) if elements_dict.get(key) is not None else None
+
+    obj = data.get('object', {})
+    epoch = data.get('orbit', {}).get('epoch')
+    return {
+        'spk_id': obj.get('spkid'),
+        'full_name': obj.get('fullname'),
+        'a': float(elements_dict.get('a', 0)),    # Semi-major axis (AU)
+        'e': float(elements_dict.get('e', 0)),    # Eccentricity
+        'inc': float(elements_dict.get('i', 0)),  # Inclination (degrees)
+        'raan': optional('om'),                   # Longitude of ascending node (degrees)
+        'argp': optional('w'),                    # Argument of perihelion (degrees)
+        'M0': optional('ma'),                     # Mean anomaly at epoch (degrees)
+        'epoch': float(epoch) if epoch is not None else None,  # JD (TDB)
+        'diameter': diameter,
+        'mass': float(physical_dict['mass']) if 'mass' in physical_dict else None,
+        'neo': obj.get('neo', False),
+        'pha': obj.get('pha', False),
+    }
+
+
+def parse_sbdb_record(name, spk_id, data):
+    """Turn an sbdb.api JSON payload into an asteroid record"""
+    fields = extract_sbdb_fields(data)
+    return build_asteroid(
+        name, spk_id, fields['full_name'] or name,
+        fields['a'], fields['e'], fields['inc'],
+        fields['diameter'], fields['mass'],
+        fields['neo'], fields['pha'],
+        fields['raan'], fields['argp'], fields['M0'], fields['epoch'],
+    )
+
+
+def placeholder_record(name):
+    """Fallback record shown when no data is available for an asteroid"""
+    return {
+        "name": name,
+        "description": "Data temporarily unavailable",
+        "a": 0, "e": 0, "inc": 0, "diameter": 0, "mass": 0, "velocity": 0,
+        "hazard": "unknown", "image": "default.jpg", "mission": "Unknown"
+    }
+
+
+class SBDBService:
+    """
+    Pooled, concurrent and cached access to the JPL SBDB API.
+
+    Parsed records are kept in memory and on disk keyed by SPK-ID. Entries
+    older than ``ttl`` seconds are still served, but trigger a background
+    refresh (stale-while-revalidate). When the API cannot be reached the
+    optional ``fallback`` store (e.g. an ``SBDBSnapshot``) is consulted.
+    """
+
+    def __init__(self, base_url=SBDB_URL, ttl=6 * 3600, cache_dir=DEFAULT_CACHE_DIR,
+                 max_workers=8, timeout=10.0, fallback=None):
+        self.base_url = base_url
+        self.fallback = fallback
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sbdb")
+
+        self._cache = {}          # spk_id -> (fetched_at, record)
+        self._refreshing = set()  # spk_ids with a revalidation in flight
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        _services.add(self)
+
+    def _cache_path(self, spk_id):
+        return os.path.join(self.cache_dir, f"{spk_id}.json")
+
+    def _load_from_disk(self, spk_id):
+        """Load a cached record from disk, or None"""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(spk_id), 'r') as f:
+                entry = json.load(f)
+            if 'orbit' not in entry['record']:
+                return None  # written before records carried full elements: refetch
+            return entry['fetched_at'], entry['record']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, spk_id, record):
+        fetched_at = time.time()
+        with self._lock:
+            self._cache[spk_id] = (fetched_at, record)
+        if not self.cache_dir:
+            return
+        # Write-then-rename so concurrent workers never read a partial file
+        path = self._cache_path(spk_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': fetched_at, 'record': record}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("cache_write_failed", spk_id=spk_id, error=str(e))
+
+    def fetch(self, name, spk_id):
+        """Fetch and parse one asteroid from the API, updating the cache"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.get(self.base_url, params={"sstr": spk_id}, timeout=self.timeout)
+            status = response.status_code
+        finally:
+            UPSTREAM_REQUEST_SECONDS.labels(service="jpl_sbdb", status=status).observe(time.perf_counter() - started)
+        response.raise_for_status()
+        record = parse_sbdb_record(name, spk_id, response.json())
+        self._store(spk_id, record)
+        return record
+
+    def _revalidate(self, name, spk_id):
+        try:
+            self.fetch(name, spk_id)
+        except Exception as e:
+            log.warning("revalidate_failed", name=name, error=str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(spk_id)
+
+    def _schedule_revalidate(self, name, spk_id):
+        with self._lock:
+            if spk_id in self._refreshing:
+                return
+            self._refreshing.add(spk_id)
+        self.executor.submit(self._revalidate, name, spk_id)
+
+    def cached(self, name, spk_id):
+        """
+        Return the cached record for an asteroid, or None on a miss.
+        Stale entries are returned as well and scheduled for revalidation.
+        """
+        with self._lock:
+            entry = self._cache.get(spk_id)
+        if entry is None:
+            entry = self._load_from_disk(spk_id)
+            if entry is None:
+                SBDB_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            with self._lock:
+                self._cache.setdefault(spk_id, entry)
+
+        fetched_at, record = entry
+        if time.time() - fetched_at > self.ttl:
+            SBDB_CACHE_LOOKUPS.labels(result="stale").inc()
+            self._schedule_revalidate(name, spk_id)
+        else:
+            SBDB_CACHE_LOOKUPS.labels(result="hit").inc()
+        return record
+
+    def get_many(self, asteroids):
+        """
+        Return records for a {name: spk_id} mapping, in the same order.
+        Cache misses are fetched concurrently; failures fall back to a
+        placeholder record.
+        """
+        results = {}
+        pending = {}
+        pending_ids = {}
+        for name, spk_id in asteroids.items():
+            record = self.cached(name, spk_id)
+            if record is not None:
+                results[name] = record
+            else:
+                pending[self.executor.submit(self.fetch, name, spk_id)] = name
+                pending_ids[name] = spk_id
+
+        if pending:
+            wait(pending, timeout=self.timeout * 2)
+            for future, name in pending.items():
+                try:
+                    results[name] = future.result(timeout=0)
+                except Exception as e:
+                    log.warning("fetch_failed", name=name, error=str(e))
+                    record = self.fallback.lookup(pending_ids[name], name) if self.fallback else None
+                    results[name] = record or placeholder_record(name)
+
+        return [results[name] for name in asteroids]
+
+    def get_with_orbit(self, name, spk_id):
+        """
+        The record of one asteroid including its "orbit" elements, fetched
+        from the API when the cached one has none. The offline snapshot has
+        no node, periapsis or anomaly, so it cannot stand in here; raises
+        ValueError when the API cannot supply them either.
+        """
+        record = self.cached(name, spk_id)
+        if record is None or 'orbit' not in record:
+            try:
+                record = self.fetch(name, spk_id)
+            except Exception as e:
+                raise ValueError(f"No orbital elements available for {name}: {e}")
+        if 'orbit' not in record:
+            raise ValueError(f"No orbital elements available for {name}")
+        return record
+
+    async def fetch_async(self, name, spk_id, client):
+        """fetch() over a pooled async HTTP client such as httpx.AsyncClient"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.get(self.base_url, params={"sstr": spk_id}, timeout=self.timeout)
+            status = response.status_code
+        finally:
+            UPSTREAM_REQUEST_SECONDS.labels(service="jpl_sbdb", status=status).observe(time.perf_counter() - started)
+        response.raise_for_status()
+        record = parse_sbdb_record(name, spk_id, response.json())
+        self._store(spk_id, record)
+        return record
+
+    async def get_many_async(self, asteroids, client):
+        """get_many() for event loops: cache misses are fetched concurrently on ``client``"""
+        results = {}
+        pending = {}
+        for name, spk_id in asteroids.items():
+            record = self.cached(name, spk_id)
+            if record is not None:
+                results[name] = record
+            else:
+                pending[name] = spk_id
+
+        if pending:
+            fetched = await asyncio.gather(
+                *(self.fetch_async(name, spk_id, client) for name, spk_id in pending.items()),
+                return_exceptions=True,
+            )
+            for (name, spk_id), record in zip(pending.items(), fetched):
+                if isinstance(record, Exception):
+                    log.warning("fetch_failed", name=name, error=str(record))
+                    record = self.fallback.lookup(spk_id, name) if self.fallback else None
+                    record = record or placeholder_record(name)
+                results[name] = record
+
+        return [results[name] for name in asteroids]
@@ -0,0 +1,402 @@
+# sbdb_snapshot.py
+"""
+Offline snapshot store for small-body orbital and physical parameters.
+
+A snapshot is a single little-endian columnar file:
+
+    header | spk_id | a | e | inc | diameter | mass | flags |
+    name_offsets | names | folded_names | id_table | name_table
+
+Every column starts on an 8-byte boundary so it can be viewed straight
+out of a read-only memory map. ``id_table`` and ``name_table`` are
+open-addressing hash tables (row number, -1 for empty) giving constant
+time lookup by SPK-ID or by name.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import re
+import struct
+
+import numpy as np
+
+from sbdb_service import build_asteroid, extract_sbdb_fields
+from structured_logging import get_logger
+
+log = get_logger("sbdb_snapshot")
+
+MAGIC = b"SBDBSNP1"
+HEADER = struct.Struct("<8sIIIQ")  # magic, rows, id slots, name slots, name bytes
+HEADER_SIZE = 64
+
+FLOAT_COLUMNS = ("a", "e", "inc", "diameter", "mass")
+NEO_FLAG = 1
+PHA_FLAG = 2
+
+G = 6.6743e-20  # km^3 / (kg s^2), converts SBDB GM values to mass
+
+_FULL_NAME_RE = re.compile(r"^(?:(\d+)\s+)?([^()]*?)\s*(?:\((.+)\))?$")
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _layout(rows, slots, name_slots, name_bytes):
+    """Byte offsets of every column for a snapshot of the given size"""
+    offsets = {}
+    pos = HEADER_SIZE
+    for column, size in (
+        ("spk_id", 8 * rows),
+        *((column, 8 * rows) for column in FLOAT_COLUMNS),
+        ("flags", rows),
+        ("name_offsets", 8 * (rows + 1)),
+        ("names", name_bytes),
+        ("folded_names", name_bytes),
+        ("id_table", 4 * slots),
+        ("name_table", 4 * name_slots),
+    ):
+        offsets[column] = pos
+        pos = _align(pos + size)
+    offsets["end"] = pos
+    return offsets
+
+
+def _hash_id(spk_id, bits):
+    """Fibonacci hash of an integer SPK-ID into ``bits`` bits"""
+    return ((spk_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+
+def _hash_name(key, bits):
+    """Stable 64-bit hash of a normalized name into ``bits`` bits"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") >> (64 - bits)
+
+
+def normalize_name(name):
+    return " ".join(name.split()).casefold()
+
+
+def name_keys(full_name):
+    """
+    Lookup keys for an SBDB full name such as "101955 Bennu (1999 RQ36)":
+    the full name, the number, the name and the provisional designation.
+    """
+    full_name = " ".join(full_name.split())
+    keys = [normalize_name(full_name)]
+    match = _FULL_NAME_RE.match(full_name)
+    if match:
+        keys.extend(normalize_name(part) for part in match.groups() if part)
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+def short_name(full_name):
+    """Name used for the preset image, e.g. "Bennu" for "101955 Bennu (1999 RQ36)" """
+    match = _FULL_NAME_RE.match(" ".join(full_name.split()))
+    if match and match.group(2):
+        return match.group(2)
+    return full_name.strip()
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().upper() in ("Y", "YES", "TRUE", "1")
+    return bool(value)
+
+
+def _float(value):
+    if value is None or value == "":
+        return float("nan")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _normalize_row(row):
+    """
+    Map one dump row (query API, CSV or sbdb.api payload) to snapshot
+    fields; None if it has no usable SPK-ID.
+    """
+    if "object" in row and "orbit" in row:
+        row = extract_sbdb_fields(row)
+
+    def pick(*names):
+        for name in names:
+            if name in row and row[name] not in (None, ""):
+                return row[name]
+        return None
+
+    mass = _float(pick("mass"))
+    gm = _float(pick("GM", "gm"))
+    if np.isnan(mass) and not np.isnan(gm):
+        mass = gm / G
+
+    try:
+        spk_id = int(pick("spk_id", "spkid", "spk-id"))
+    except (TypeError, ValueError):
+        return None
+
+    return {
+        "spk_id": spk_id,
+        "full_name": str(pick("full_name", "fullname", "name") or "").strip(),
+        "a": _float(pick("a")),
+        "e": _float(pick("e")),
+        "inc": _float(pick("inc", "i")),
+        "diameter": _float(pick("diameter")),
+        "mass": mass,
+        "neo": _flag(pick("neo")),
+        "pha": _flag(pick("pha")),
+    }
+
+
+def read_dump(path):
+    """
+    Yield rows from a saved SBDB dump. Supported inputs are the sbdb_query.api
+    JSON (``fields`` + ``data``), a JSON list of records or sbdb.api payloads,
+    and CSV exports with a header line. Rows without an SPK-ID are skipped.
+    """
+    skipped = 0
+    for row in _read_rows(path):
+        normalized = _normalize_row(row)
+        if normalized is None:
+            skipped += 1
+            continue
+        yield normalized
+    if skipped:
+        log.warning("dump_rows_skipped", file=path, rows=skipped, reason="no spk_id")
+
+
+def _read_rows(path):
+    """Raw rows of a dump, as dicts"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield {k.strip(): v for k, v in row.items() if k}
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        dump = json.load(f)
+    if isinstance(dump, dict) and "fields" in dump:
+        fields = dump["fields"]
+        for values in dump.get("data", []):
+            yield dict(zip(fields, values))
+    else:
+        yield from dump
+
+
+def build_snapshot(rows, out_path):
+    """Write an iterable of normalized rows to a snapshot file, return the row count"""
+    seen = {}
+    for row in rows:
+        seen[row["spk_id"]] = row  # later rows win on duplicate SPK-IDs
+    table = sorted(seen.values(), key=lambda r: r["spk_id"])
+    count = len(table)
+
+    row_keys = [name_keys(row["full_name"]) for row in table]
+
+    # Both tables are sized for a load factor of at most 0.5
+    bits = max(4, (2 * count - 1).bit_length())
+    slots = 1 << bits
+    mask = slots - 1
+    name_bits = max(4, (2 * sum(len(keys) for keys in row_keys) - 1).bit_length())
+    name_slots = 1 << name_bits
+    name_mask = name_slots - 1
+
+    names = [row["full_name"].encode("utf-8") for row in table]
+    name_offsets = np.zeros(count + 1, dtype="<u8")
+    np.cumsum([len(n) for n in names], out=name_offsets[1:])
+    name_bytes = int(name_offsets[-1])
+
+    id_table = np.full(slots, -1, dtype="<i4")
+    name_table = np.full(name_slots, -1, dtype="<i4")
+    for row_index, row in enumerate(table):
+        slot = _hash_id(row["spk_id"], bits)
+        while id_table[slot] != -1:
+            slot = (slot + 1) & mask
+        id_table[slot] = row_index
+
+    for row_index, keys in enumerate(row_keys):
+        for key in keys:
+            slot = _hash_name(key, name_bits)
+            while name_table[slot] != -1:
+                if key in row_keys[name_table[slot]]:
+                    break  # first row keeps a shared key
+                slot = (slot + 1) & name_mask
+            else:
+                name_table[slot] = row_index
+
+    layout = _layout(count, slots, name_slots, name_bytes)
+    with open(out_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, slots, name_slots, name_bytes).ljust(HEADER_SIZE, b"\0"))
+
+        def put(column, data):
+            f.seek(layout[column])
+            f.write(data)
+
+        put("spk_id", np.array([r["spk_id"] for r in table], dtype="<i8").tobytes())
+        for column in FLOAT_COLUMNS:
+            put(column, np.array([r[column] for r in table], dtype="<f8").tobytes())
+        flags = [(NEO_FLAG if r["neo"] else 0) | (PHA_FLAG if r["pha"] else 0) for r in table]
+        put("flags", np.array(flags, dtype="u1").tobytes())
+        put("name_offsets", name_offsets.tobytes())
+        put("names", b"".join(names))
+        # ASCII-only lowering keeps byte offsets identical to ``names``
+        put("folded_names", b"".join(names).lower())
+        put("id_table", id_table.tobytes())
+        put("name_table", name_table.tobytes())
+        f.truncate(layout["end"])
+    return count
+
+
+def import_dump(dump_path, out_path):
+    """Bulk import a saved SBDB JSON or CSV dump into a snapshot file"""
+    return build_snapshot(read_dump(dump_path), out_path)
+
+
+class SBDBSnapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError(f"{path} is not an SBDB snapshot")
+        magic, self.rows, self.slots, self.name_slots, name_bytes = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an SBDB snapshot")
+        self._bits = self.slots.bit_length() - 1
+        self._name_bits = self.name_slots.bit_length() - 1
+        layout = _layout(self.rows, self.slots, self.name_slots, name_bytes)
+
+        def view(column, dtype, count):
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=layout[column])
+
+        self.spk_id = view("spk_id", "<i8", self.rows)
+        for column in FLOAT_COLUMNS:
+            setattr(self, column, view(column, "<f8", self.rows))
+        self.flags = view("flags", "u1", self.rows)
+        self._name_offsets = view("name_offsets", "<u8", self.rows + 1)
+        self._names_start = layout["names"]
+        self._folded_start = layout["folded_names"]
+        self._id_table = view("id_table", "<i4", self.slots)
+        self._name_table = view("name_table", "<i4", self.name_slots)
+
+    def __len__(self):
+        return self.rows
+
+    def full_name(self, row):
+        start = self._names_start + int(self._name_offsets[row])
+        end = self._names_start + int(self._name_offsets[row + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def find_id(self, spk_id):
+        """Row number for an SPK-ID, or None"""
+        spk_id = int(spk_id)
+        mask = self.slots - 1
+        slot = _hash_id(spk_id, self._bits)
+        while True:
+            row = int(self._id_table[slot])
+            if row == -1:
+                return None
+            if int(self.spk_id[row]) == spk_id:
+                return row
+            slot = (slot + 1) & mask
+
+    def find_name(self, name):
+        """Row number for a full name, number, name or designation, or None"""
+        key = normalize_name(name)
+        mask = self.name_slots - 1
+        slot = _hash_name(key, self._name_bits)
+        while True:
+            row = int(self._name_table[slot])
+            if row == -1:
+                return None
+            if key in name_keys(self.full_name(row)):
+                return row
+            slot = (slot + 1) & mask
+
+    def record(self, row, name=None):
+        """Asteroid record for a row, in the same shape as the live SBDB records"""
+        full_name = self.full_name(row)
+
+        def value(column):
+            v = float(getattr(self, column)[row])
+            return None if np.isnan(v) else v
+
+        flags = int(self.flags[row])
+        return build_asteroid(
+            name or short_name(full_name), str(int(self.spk_id[row])), full_name,
+            value("a") or 0.0, value("e") or 0.0, value("inc") or 0.0,
+            value("diameter"), value("mass"),
+            bool(flags & NEO_FLAG), bool(flags & PHA_FLAG),
+        )
+
+    def lookup(self, key, name=None):
+        """Record for an SPK-ID or a name, or None"""
+        key = str(key).strip()
+        row = self.find_id(key) if key.isdigit() else None
+        if row is None:
+            row = self.find_name(key)
+        return None if row is None else self.record(row, name)
+
+    def _search_names(self, text):
+        """Boolean mask of rows whose full name contains ``text`` (case-insensitive)"""
+        mask = np.zeros(self.rows, dtype=bool)
+        needle = " ".join(text.split()).encode("utf-8").lower()
+        if not needle:
+            return mask
+        start = self._folded_start
+        end = start + int(self._name_offsets[-1])
+        pattern = re.compile(re.escape(needle))
+        positions = np.fromiter((m.start() - start for m in pattern.finditer(self._mmap, start, end)),
+                                dtype=np.int64)
+        # Matches spanning two names are dropped: they must end inside their own name
+        rows = np.searchsorted(self._name_offsets, positions, side="right") - 1
+        inside = positions + len(needle) <= self._name_offsets[rows + 1].astype(np.int64)
+        mask[rows[inside]] = True
+        return mask
+
+    def query(self, page=1, per_page=24, neo=None, pha=None, text=None,
+              a_min=None, a_max=None, e_max=None, diameter_min=None):
+        """
+        Filter and page the catalog. Returns ``(records, total_matches)``.
+        Filters are evaluated as vectorized masks over the mapped columns.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        if neo is not None:
+            mask &= ((self.flags & NEO_FLAG) != 0) == neo
+        if pha is not None:
+            mask &= ((self.flags & PHA_FLAG) != 0) == pha
+        if a_min is not None:
+            mask &= self.a >= a_min
+        if a_max is not None:
+            mask &= self.a <= a_max
+        if e_max is not None:
+            mask &= self.e <= e_max
+        if diameter_min is not None:
+            mask &= self.diameter >= diameter_min
+        if text:
+            mask &= self._search_names(text.strip())
+
+        matches = np.flatnonzero(mask)
+        start = (max(page, 1) - 1) * per_page
+        rows = matches[start:start + per_page]
+        return [self.record(int(row)) for row in rows], len(matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an SBDB dump into a snapshot file")
+    parser.add_argument("dump", help="sbdb_query.api JSON, JSON list or CSV export")
+    parser.add_argument("-o", "--output", default="sbdb_snapshot.bin", help="snapshot file to write")
+    args = parser.parse_args()
+
+    count = import_dump(args.dump, args.output)
+    print(f"Wrote {count} objects to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
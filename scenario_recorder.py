@@ -0,0 +1,375 @@
+# scenario_recorder.py
+"""
+Append-only scenario recordings: what the GMAT stream and the physics
+bridge sent, and the impact/deflection events clients reported, so a run
+can be replayed later instead of re-simulated.
+
+A recording is a 64-byte header followed by fixed-size little-endian
+records (RECORD):
+
+    time | index | total | kind | source | code | channel | values[14]
+
+``time`` is seconds since the recording was created, never decreasing.
+State records (KIND_STATE) hold point ``index`` of ``total`` with its
+FRAME_FIELDS (state, then elements) in ``values``; event records
+(KIND_EVENT) hold EVENT_TYPES[code] with its EVENT_FIELDS in ``values``.
+``source`` names the stream that produced the record (SOURCES) and
+``channel`` tells apart clients of the same source.
+
+Every INDEX_INTERVAL records the time of the record is appended to a
+``<file>.idx`` sidecar of float64s, so seeking to a time touches a few
+pages of the index and one interval of the log. The log is the source of
+truth: a torn trailing record is cut off when the file is reopened for
+appending, and a missing or short index is rebuilt from it.
+
+Writes go through a record buffer flushed when full, at exit and, by a
+background thread, every FLUSH_INTERVAL seconds even when no new records
+arrive. Reads memory-map the log; nothing on
+the read path parses text.
+"""
+import argparse
+import atexit
+import math
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from gmat_protocol import ELEMENT_FIELDS, FRAME_FIELDS
+from metrics import SCENARIO_RECORDS
+from structured_logging import get_logger
+
+log = get_logger('scenario')
+
+MAGIC = b'GMATREC1'
+VERSION = 1
+HEADER = struct.Struct('<8sHHHxxdQ')  # magic, version, record size, values per record, created, index interval
+HEADER_SIZE = 64
+
+RECORD = np.dtype([
+    ('time', '<f8'),
+    ('index', '<i8'),
+    ('total', '<i8'),
+    ('kind', 'u1'),
+    ('source', 'u1'),
+    ('code', '<u2'),
+    ('channel', '<u4'),
+    ('values', '<f8', (len(FRAME_FIELDS),)),
+])
+
+KIND_STATE = 1
+KIND_EVENT = 2
+
+SOURCES = ('stream', 'broadcast', 'follow', 'bridge', 'client')
+
+# Event types and the numbers each one carries, in record order
+EVENT_FIELDS = {
+    'impact': ('sim_time', 'x', 'y', 'z', 'mass', 'a', 'e'),
+    'deflection': ('sim_time', 'x', 'y', 'z', 'mass', 'a', 'e'),
+    'start': (),
+    'stop': (),
+    'reset': (),
+    'restart': (),
+}
+EVENT_TYPES = tuple(EVENT_FIELDS)
+
+EXTENSION = '.gmatrec'
+INDEX_INTERVAL = 4096   # records between seek index entries
+BUFFER_RECORDS = 8192   # records buffered before a write
+FLUSH_INTERVAL = 1.0    # seconds; the most a crash can lose
+
+
+class ScenarioRecorder:
+    """Buffered appender for one recording file; safe to share between threads"""
+
+    def __init__(self, filename, buffer_records=BUFFER_RECORDS, flush_interval=FLUSH_INTERVAL):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer = np.zeros(buffer_records, dtype=RECORD)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        if os.path.exists(filename) and os.path.getsize(filename) >= HEADER_SIZE:
+            self._file = open(filename, 'r+b')
+            self.created = read_header(self._file)
+            size = os.path.getsize(filename)
+            self.records = (size - HEADER_SIZE) // RECORD.itemsize
+            # Drop a record torn by a crash mid-write
+            self._file.truncate(HEADER_SIZE + self.records * RECORD.itemsize)
+            self._file.seek(0, os.SEEK_END)
+            self._last_time = self._read_last_time()
+        else:
+            self._file = open(filename, 'w+b')
+            self.created = time.time()
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, len(FRAME_FIELDS),
+                                         self.created, INDEX_INTERVAL).ljust(HEADER_SIZE, b'\0'))
+            self._file.flush()
+            self.records = 0
+            self._last_time = 0.0
+        self._index = open(index_path(filename), 'a+b')
+        if self._index.tell() != _index_entries(self.records) * 8:
+            self._rebuild_index()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='scenario-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+        log.info("recording_opened", file=filename, records=self.records)
+
+    def _read_last_time(self):
+        if not self.records:
+            return 0.0
+        self._file.seek(HEADER_SIZE + (self.records - 1) * RECORD.itemsize)
+        last = np.frombuffer(self._file.read(RECORD.itemsize), dtype=RECORD)[0]['time']
+        self._file.seek(0, os.SEEK_END)
+        return float(last)
+
+    def _rebuild_index(self):
+        self._file.flush()
+        times = np.memmap(self.filename, dtype=RECORD, mode='r', offset=HEADER_SIZE,
+                          shape=(self.records,))['time'][::INDEX_INTERVAL] if self.records else np.empty(0)
+        self._index.truncate(0)
+        self._index.write(np.ascontiguousarray(times, dtype='<f8').tobytes())
+        self._index.flush()
+
+    def _reserve(self, count):
+        """Buffer rows for ``count`` new records (caller holds the lock); returns (rows, time)"""
+        if self._pending + count > len(self._buffer):
+            self._flush()
+        now = max(time.time() - self.created, self._last_time)
+        self._last_time = now
+        rows = self._buffer[self._pending:self._pending + count]
+        self._pending += count
+        return rows, now
+
+    def record_states(self, source, start, states, elements, total, channel=0):
+        """Points start .. start + len(states) of a stream, ``elements`` aligned with ``states``"""
+        count = len(states)
+        step = len(self._buffer)
+        if count > step:
+            for b in range(0, count, step):
+                self.record_states(source, start + b, states[b:b + step],
+                                   {field: values[b:b + step] for field, values in elements.items()},
+                                   total, channel)
+            return
+        with self._lock:
+            if self._file is None:
+                return
+            rows, now = self._reserve(count)
+            rows['time'] = now
+            rows['index'] = np.arange(start, start + count)
+            rows['total'] = total
+            rows['kind'] = KIND_STATE
+            rows['source'] = SOURCES.index(source)
+            rows['code'] = 0
+            rows['channel'] = channel
+            values = rows['values']
+            values[:, :6] = states[:, :6]
+            for column, field in enumerate(ELEMENT_FIELDS, start=6):
+                values[:, column] = elements[field]
+            self._maybe_flush()
+        SCENARIO_RECORDS.labels(source=source).inc(count)
+
+    def record_event(self, event, fields=None, source='client', channel=0, index=-1):
+        """An EVENT_TYPES event with its EVENT_FIELDS numbers (missing ones are NaN)"""
+        names = EVENT_FIELDS[event]
+        fields = fields or {}
+        with self._lock:
+            if self._file is None:
+                return
+            rows, now = self._reserve(1)
+            row = rows[0]
+            row['time'] = now
+            row['index'] = index
+            row['total'] = 0
+            row['kind'] = KIND_EVENT
+            row['source'] = SOURCES.index(source)
+            row['code'] = EVENT_TYPES.index(event)
+            row['channel'] = channel
+            row['values'] = [float(fields.get(name, math.nan)) for name in names] + \
+                [math.nan] * (len(FRAME_FIELDS) - len(names))
+            self._maybe_flush()
+        SCENARIO_RECORDS.labels(source=source).inc()
+
+    def _flush_loop(self):
+        """Background thread: write records left buffered for flush_interval seconds"""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._file is None:
+                    return
+                self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def _flush(self):
+        """Write buffered records and their index entries (caller holds the lock)"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending = self._buffer[:self._pending]
+        self._file.write(pending.tobytes())
+        self._file.flush()
+        first = self.records
+        self.records += self._pending
+        # Index entries for every multiple of INDEX_INTERVAL among the new records
+        marks = np.arange(-(-first // INDEX_INTERVAL) * INDEX_INTERVAL, self.records, INDEX_INTERVAL)
+        if len(marks):
+            self._index.write(np.ascontiguousarray(pending['time'][marks - first], dtype='<f8').tobytes())
+            self._index.flush()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush()
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+        self._closed.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join()
+        atexit.unregister(self.close)
+
+
+def index_path(filename):
+    return f"{filename}.idx"
+
+
+def _index_entries(records):
+    return -(-records // INDEX_INTERVAL)
+
+
+def read_header(f):
+    """Creation time of the recording open as ``f``; raises ValueError for other files"""
+    f.seek(0)
+    magic, version, record_size, values, created, interval = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize \
+            or values != len(FRAME_FIELDS) or interval != INDEX_INTERVAL:
+        raise ValueError(f"{f.name} is not a version {VERSION} scenario recording")
+    return created
+
+
+class Scenario:
+    """A recording opened for reading through a memory map"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.created = read_header(f)
+        count = (os.path.getsize(filename) - HEADER_SIZE) // RECORD.itemsize
+        # Records still being appended are picked up by opening the file again
+        self.records = np.memmap(filename, dtype=RECORD, mode='r', offset=HEADER_SIZE,
+                                 shape=(count,)) if count else np.zeros(0, dtype=RECORD)
+        try:
+            index = np.fromfile(index_path(filename), dtype='<f8')
+        except OSError:
+            index = np.empty(0)
+        expected = _index_entries(count)
+        if len(index) < expected:
+            # Missing entries (unflushed or lost index) come straight from the log
+            index = np.concatenate([index, self.records['time'][len(index) * INDEX_INTERVAL::INDEX_INTERVAL]])
+        self.index = index[:expected]
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def duration(self):
+        return float(self.records[-1]['time']) if len(self.records) else 0.0
+
+    def seek(self, t):
+        """Number of the first record at or after ``t`` seconds into the recording"""
+        if t is None or not len(self.records):
+            return 0
+        j = int(np.searchsorted(self.index, t, side='left'))
+        lo = max(j - 1, 0) * INDEX_INTERVAL
+        hi = min(j * INDEX_INTERVAL + 1, len(self.records))
+        return lo + int(np.searchsorted(self.records['time'][lo:hi], t, side='left'))
+
+    def iter_frames(self, start=0, batch=1, source=None, chunk_records=BUFFER_RECORDS):
+        """
+        Yield (time, records) from record ``start`` on: runs of at most
+        ``batch`` consecutive points of one stream and channel, and every
+        event on its own. ``source`` limits the replay to one SOURCES entry.
+        """
+        if source is not None and source not in SOURCES:
+            raise ValueError(f"Unknown source {source!r}, expected one of {list(SOURCES)}")
+        wanted = None if source is None else SOURCES.index(source)
+        for offset in range(start, len(self.records), chunk_records):
+            chunk = np.asarray(self.records[offset:offset + chunk_records])
+            if wanted is not None:
+                chunk = chunk[chunk['source'] == wanted]
+            if not len(chunk):
+                continue
+            # A new frame starts at every event and wherever the stream, channel or index jumps
+            split = np.ones(len(chunk), dtype=bool)
+            split[1:] = (chunk['kind'][1:] == KIND_EVENT) | (chunk['kind'][:-1] == KIND_EVENT) | \
+                (chunk['source'][1:] != chunk['source'][:-1]) | \
+                (chunk['channel'][1:] != chunk['channel'][:-1]) | \
+                (chunk['index'][1:] != chunk['index'][:-1] + 1)
+            edges = np.append(np.flatnonzero(split), len(chunk))
+            for lo, hi in zip(edges[:-1], edges[1:]):
+                for b in range(lo, hi, batch):
+                    records = chunk[b:min(b + batch, hi)]
+                    yield float(records[0]['time']), records
+
+    def summary(self):
+        """Counts of records by source and kind, and the events in order"""
+        records = np.asarray(self.records)
+        sources = {}
+        for code, name in enumerate(SOURCES):
+            mine = records[records['source'] == code]
+            if len(mine):
+                sources[name] = {'states': int(np.count_nonzero(mine['kind'] == KIND_STATE)),
+                                 'events': int(np.count_nonzero(mine['kind'] == KIND_EVENT))}
+        events = [event_message(record) for record in records[records['kind'] == KIND_EVENT]]
+        return {'records': len(records), 'duration': self.duration, 'created': self.created,
+                'sources': sources, 'events': events}
+
+
+def event_message(record):
+    """The JSON-ready message a replay sends for an event record"""
+    event = EVENT_TYPES[record['code']]
+    message = {'type': 'scenario_event', 'event': event, 'time': float(record['time']),
+               'source': SOURCES[record['source']], 'index': int(record['index'])}
+    for name, value in zip(EVENT_FIELDS[event], record['values']):
+        if not math.isnan(value):
+            message[name] = float(value)
+    return message
+
+
+def state_columns(records):
+    """(states, elements) of state records, as encode_frame takes them"""
+    values = records['values']
+    return values[:, :6], {field: values[:, column] for column, field in enumerate(ELEMENT_FIELDS, start=6)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a scenario recording")
+    parser.add_argument("recording")
+    parser.add_argument("--events", action="store_true", help="list every event")
+    args = parser.parse_args()
+
+    summary = Scenario(args.recording).summary()
+    print(f"{summary['records']} records over {summary['duration']:.1f} s, recorded "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary['created']))}")
+    for source, counts in summary['sources'].items():
+        print(f"  {source:10s} {counts['states']:10d} states {counts['events']:6d} events")
+    if args.events:
+        for event in summary['events']:
+            fields = ' '.join(f"{k}={v:g}" for k, v in event.items() if k not in ('type', 'event', 'time', 'source'))
+            print(f"  {event['time']:10.3f} s  {event['source']:8s} {event['event']:10s} {fields}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# shared_jobs.py
+"""
+Process-pool jobs over rows held in shared memory.
+
+A job copies its (rows, k) float64 input once into a shared-memory
+segment, allocates a second segment for the (rows, m) results and queues
+one pool task per slice of rows, so each task only carries a row range.
+SharedMemoryJob owns the segments: they are unlinked once the job ends,
+whether it finished, failed or was cancelled. Workers attach through
+run_slice, which applies a vectorized kernel chunk by chunk.
+"""
+import asyncio
+import time
+from concurrent.futures import as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def run_slice(kernel, input_name, output_name, rows, input_columns, output_columns, start, stop, chunk):
+    """
+    Pool task body: outputs[lo:hi] = kernel(inputs[lo:hi]) over rows
+    start .. stop in chunks. The kernel gets a private copy of its chunk so
+    no view of the segment outlives the task. Returns the rows processed.
+    """
+    inputs = shared_memory.SharedMemory(name=input_name)
+    outputs = shared_memory.SharedMemory(name=output_name)
+    try:
+        source = np.ndarray((rows, input_columns), dtype=np.float64, buffer=inputs.buf)
+        target = np.ndarray((rows, output_columns), dtype=np.float64, buffer=outputs.buf)
+        try:
+            for lo in range(start, stop, chunk):
+                hi = min(lo + chunk, stop)
+                target[lo:hi] = kernel(source[lo:hi].copy())
+        finally:
+            del source, target  # segments cannot close while arrays view them
+        return stop - start
+    finally:
+        inputs.close()
+        outputs.close()
+
+
+class SharedMemoryJob:
+    """
+    Base for pool jobs. Subclasses provide prepare() -> (rows, k) inputs,
+    task(input_name, output_name, start, stop) -> (function, args) for
+    one slice, and collect(results) -> the result dict.
+    """
+
+    task_size = 20000
+    output_columns = 1
+
+    def _submit(self, executor):
+        """Prepare the inputs, copy them into shared memory and queue one pool task per slice"""
+        self._started = time.perf_counter()
+        inputs = np.ascontiguousarray(self.prepare(), dtype=np.float64)
+        self.rows = len(inputs)
+        self._blocks = []
+        futures = []
+        try:
+            for size in (inputs.nbytes, self.rows * self.output_columns * 8):
+                self._blocks.append(shared_memory.SharedMemory(create=True, size=max(size, 1)))
+            input_block, output_block = self._blocks
+            np.ndarray(inputs.shape, dtype=np.float64, buffer=input_block.buf)[:] = inputs
+            for start in range(0, self.rows, self.task_size):
+                function, args = self.task(input_block.name, output_block.name, start,
+                                           min(start + self.task_size, self.rows))
+                futures.append(executor.submit(function, *args))
+        except BaseException:
+            self._finish(futures, False)
+            raise
+        return futures
+
+    def _finish(self, futures, completed):
+        """
+        Collect the results (if every task finished) and release the shared
+        memory. Tasks still running keep their own mapping until they exit.
+        """
+        for future in futures:
+            future.cancel()
+        try:
+            if completed:
+                results = np.ndarray((self.rows, self.output_columns), dtype=np.float64,
+                                     buffer=self._blocks[1].buf).copy()
+                self.results = results
+                self.result = self.collect(results)
+                self.result['elapsed_s'] = time.perf_counter() - self._started
+        finally:
+            for block in self._blocks:
+                block.close()
+                block.unlink()
+            self._blocks = []
+
+    def run(self, executor, progress=None):
+        """Run on a ProcessPoolExecutor, calling progress(done, total) as tasks finish"""
+        futures = self._submit(executor)
+        completed = False
+        try:
+            done = 0
+            for future in as_completed(futures):
+                done += future.result()
+                if progress:
+                    progress(done, self.rows)
+            completed = True
+        finally:
+            self._finish(futures, completed)
+        return self.result
+
+    async def run_async(self, executor, progress=None):
+        """Asyncio variant of run(); ``progress`` may be a coroutine function"""
+        futures = self._submit(executor)
+        completed = False
+        try:
+            done = 0
+            for future in asyncio.as_completed([asyncio.wrap_future(f) for f in futures]):
+                done += await future
+                if progress:
+                    update = progress(done, self.rows)
+                    if asyncio.iscoroutine(update):
+                        await update
+            completed = True
+        finally:
+            self._finish(futures, completed)
+        return self.result
@@ -0,0 +1,110 @@
+# state_stream.py
+"""
+Streaming state-vector to orbital-element conversion.
+
+Input is read from a file-like byte stream, either as text rows
+(whitespace or comma separated, optional header line) or as raw
+little-endian float64 (N, 6). States are converted in fixed-size chunks
+and each chunk is encoded as soon as it is ready, so memory stays bounded
+whatever the input size.
+
+Output is NDJSON (one object per state, non-finite values as null) or
+raw little-endian float64 rows of ELEMENT_FIELDS.
+"""
+import numpy as np
+
+from gmat_protocol import ELEMENT_FIELDS
+from trajectory_tail import parse_state_lines
+
+CHUNK_ROWS = 65536        # states converted per vectorized call
+READ_SIZE = 4 * 1024 * 1024  # bytes read per text block
+STATE_BYTES = 6 * 8
+
+OUTPUT_FORMATS = ('ndjson', 'binary')
+
+_NDJSON_ROW = '{' + ','.join(f'"{field}":%r' for field in ELEMENT_FIELDS) + '}\n'
+
+
+def _is_header(line):
+    try:
+        float(line.replace(',', ' ').split()[0])
+        return False
+    except (ValueError, IndexError):
+        return True
+
+
+def iter_text_states(stream, chunk_rows=CHUNK_ROWS, read_size=READ_SIZE):
+    """Yield (k, 6) arrays of at most chunk_rows states from text rows"""
+    partial = b''
+    pending = []
+    first = True
+    while True:
+        block = stream.read(read_size)
+        data = partial + block
+        if block:
+            end = data.rfind(b'\n') + 1
+            partial = data[end:]
+            data = data[:end]
+        else:
+            partial = b''
+        lines = data.decode('utf-8', 'replace').replace(',', ' ').splitlines()
+        lines = [line for line in lines if line.strip()]
+        if first and lines:
+            first = False
+            if _is_header(lines[0]):
+                lines = lines[1:]
+        pending.extend(lines)
+        while len(pending) >= chunk_rows:
+            yield parse_state_lines(pending[:chunk_rows])
+            del pending[:chunk_rows]
+        if not block:
+            break
+    if pending:
+        yield parse_state_lines(pending)
+
+
+def iter_binary_states(stream, chunk_rows=CHUNK_ROWS):
+    """Yield (k, 6) arrays of at most chunk_rows states from packed float64"""
+    want = chunk_rows * STATE_BYTES
+    buffer = bytearray()
+    while True:
+        block = stream.read(want - len(buffer))
+        if block:
+            buffer += block
+            if len(buffer) < want:
+                continue
+        usable = len(buffer) - len(buffer) % STATE_BYTES
+        if usable:
+            yield np.frombuffer(bytes(buffer[:usable]), dtype='<f8').reshape(-1, 6)
+        if not block:
+            if len(buffer) != usable:
+                raise ValueError(f"Binary input is not a whole number of {STATE_BYTES}-byte states")
+            return
+        buffer = bytearray()
+
+
+def encode_ndjson(elements):
+    """One JSON object per state, fields in ELEMENT_FIELDS order"""
+    columns = np.stack([elements[field] for field in ELEMENT_FIELDS], axis=1)
+    text = ''.join(_NDJSON_ROW % tuple(row) for row in columns.tolist())
+    if not np.isfinite(columns).all():
+        # repr() gives nan/inf/-inf, which JSON does not have
+        text = text.replace(':nan', ':null').replace(':-inf', ':null').replace(':inf', ':null')
+    return text.encode()
+
+
+def encode_binary(elements):
+    """Packed little-endian float64 rows of ELEMENT_FIELDS"""
+    return np.stack([elements[field] for field in ELEMENT_FIELDS], axis=1).astype('<f8').tobytes()
+
+
+def convert_stream(stream, convert, binary_input=False, output='ndjson', chunk_rows=CHUNK_ROWS):
+    """
+    Yield encoded element chunks for every state in ``stream``.
+    ``convert`` maps an (k, 6) array to a dict of ELEMENT_FIELDS arrays.
+    """
+    chunks = iter_binary_states(stream, chunk_rows) if binary_input else iter_text_states(stream, chunk_rows)
+    encode = encode_binary if output == 'binary' else encode_ndjson
+    for states in chunks:
+        if len(states):
+            yield encode(convert(states))
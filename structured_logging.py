@@ -0,0 +1,145 @@
+# structured_logging.py
+"""
+Leveled, sampled, structured logging.
+
+Each record is one logfmt line:
+
+    ts=2025-10-04T12:00:00.123Z level=warning logger=sbdb event=fetch_failed name=Bennu error="..."
+
+Below ERROR, every (logger, event) pair may log SAMPLE_BURST records per
+SAMPLE_INTERVAL seconds; further records are dropped and counted, and the
+first record of the next window carries suppressed=N. A disabled level
+costs one isEnabledFor check, so debug calls can stay on hot paths.
+
+LOG_LEVEL (default INFO), LOG_SAMPLE_BURST (10), LOG_SAMPLE_INTERVAL (60 s)
+and LOG_FORMAT (logfmt or json) set the policy.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from metrics import LOG_RECORDS_SAMPLED_OUT
+
+ROOT_LOGGER = 'asteroid_sim'
+SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 10))
+SAMPLE_INTERVAL = float(os.environ.get('LOG_SAMPLE_INTERVAL', 60))
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    """Let ``burst`` records of each event through per ``interval``; always pass ERROR and above"""
+
+    def __init__(self, burst=SAMPLE_BURST, interval=SAMPLE_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # (logger, event) -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                LOG_RECORDS_SAMPLED_OUT.labels(logger=record.name).inc()
+                return False
+            window[1] += 1
+        return True
+
+
+def _short_name(name):
+    return name[len(ROOT_LOGGER) + 1:] if name.startswith(ROOT_LOGGER + '.') else name
+
+
+def _record_fields(record, formatter):
+    fields = {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+        'level': record.levelname.lower(),
+        'logger': _short_name(record.name),
+        'event': record.getMessage(),
+    }
+    fields.update(getattr(record, 'fields', None) or {})
+    if getattr(record, 'suppressed', None):
+        fields['suppressed'] = record.suppressed
+    if record.exc_info:
+        fields['exception'] = formatter.formatException(record.exc_info)
+    return fields
+
+
+class LogfmtFormatter(logging.Formatter):
+    def format(self, record):
+        parts = []
+        for key, value in _record_fields(record, self).items():
+            text = value if isinstance(value, str) else json.dumps(value, default=str)
+            if not text or any(c in text for c in ' ="\n'):
+                text = json.dumps(text)
+            parts.append(f'{key}={text}')
+        return ' '.join(parts)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(_record_fields(record, self), default=str)
+
+
+def configure(level=None, fmt=None, stream=None):
+    """Install the handler on the simulator's root logger (once per process)"""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        logger = logging.getLogger(ROOT_LOGGER)
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.addFilter(SamplingFilter())
+        fmt = fmt or os.environ.get('LOG_FORMAT', 'logfmt')
+        handler.setFormatter(JSONFormatter() if fmt == 'json' else LogfmtFormatter())
+        logger.addHandler(handler)
+        logger.setLevel((level or os.environ.get('LOG_LEVEL', 'INFO')).upper())
+        logger.propagate = False
+        _configured = True
+
+
+class StructuredLogger:
+    """A logging.Logger taking an event name plus keyword fields"""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name):
+    """Logger ``asteroid_sim.<name>``, configuring output on first use"""
+    configure()
+    return StructuredLogger(logging.getLogger(f'{ROOT_LOGGER}.{name}'))
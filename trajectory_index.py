@@ -0,0 +1,193 @@
+# trajectory_index.py
+"""
+Multi-resolution index over a trajectory for time-range queries that
+return at most a given number of points.
+
+Level 0 is every point. Each coarser level is a subset of the one below,
+simplified under a growing tolerance until it holds at most LEVEL_SHRINK
+of that level's points. A point is dropped when the polyline without it
+stays within the tolerance of every original point: each segment carries
+a bound on the distance of the original points it stands in for, so the
+error holds against the full trajectory, not just the level below.
+Dropping runs in vectorized passes over alternate points.
+
+Times are point indices, the ``timestamp``/``start`` stream frames carry.
+Each level has a bucketed offset table over time: finding the first row
+at or after t is one table lookup and a binary search inside one bucket,
+so a query costs O(log N) per level and picks the finest level whose
+point count in [t_start, t_end] fits ``max_points``.
+
+Built indexes are written next to the trajectory as ``<file>.lod.npy``
+(every level's row numbers, concatenated, memory-mapped on load) and
+``<file>.lod.json`` (level sizes and error bounds, plus the file's size
+and mtime).
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+BASE_TOLERANCE = 1e-6   # smallest tolerance tried, as a fraction of the bounding-box diagonal
+TOLERANCE_FACTOR = 2.0  # tolerance growth between simplification rounds
+LEVEL_SHRINK = 0.5      # a level is stored once it has at most this fraction of the level below
+MIN_LEVEL_POINTS = 256  # no levels are built below this size
+BUCKET_ROWS = 1024      # time span (points) of one offset-table bucket
+BUILD_CHUNK = 1 << 20   # rows copied at a time out of a memory-mapped trajectory
+
+
+def segment_distance(points, start, end):
+    """Distance of each point from the segment start -> end (all (n, 3))"""
+    direction = end - start
+    length2 = np.einsum('nc,nc->n', direction, direction)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.clip(np.einsum('nc,nc->n', points - start, direction) / length2, 0.0, 1.0)
+    s = np.where(length2 > 0, s, 0.0)
+    return np.linalg.norm(points - start - s[:, None] * direction, axis=1)
+
+
+def simplify(positions, rows, errors, tolerance):
+    """
+    Drop points of the polyline ``positions[rows]`` while every original
+    point stays within ``tolerance`` of it. ``errors[k]`` bounds the
+    distance from segment rows[k] -> rows[k + 1] of the original points
+    it replaces. Returns the new (rows, errors).
+    """
+    idle, offset = 0, 1
+    while len(rows) > 2 and idle < 2:
+        middle = np.arange(offset, len(rows) - 1, 2)
+        offset = 3 - offset  # alternate between odd and even positions
+        if not len(middle):
+            idle += 1
+            continue
+        points = positions[rows[middle]]
+        distance = segment_distance(points, positions[rows[middle - 1]], positions[rows[middle + 1]])
+        # The merged segment is within `distance` of the two it replaces
+        merged = np.maximum(errors[middle - 1], errors[middle]) + distance
+        drop = merged <= tolerance
+        if not drop.any():
+            idle += 1
+            continue
+        idle = 0
+        dropped = middle[drop]
+        errors = errors.copy()
+        errors[dropped - 1] = merged[drop]
+        keep = np.ones(len(rows), dtype=bool)
+        keep[dropped] = False
+        rows, errors = rows[keep], errors[keep[:-1]]
+    return rows, errors
+
+
+def build_levels(states):
+    """[(rows, error bound)] for every level coarser than the full trajectory"""
+    n = len(states)
+    if n <= MIN_LEVEL_POINTS:
+        return []
+    positions = np.empty((n, 3))
+    for start in range(0, n, BUILD_CHUNK):
+        positions[start:start + BUILD_CHUNK] = states[start:start + BUILD_CHUNK, :3]
+    diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+    rows = np.arange(n, dtype=np.int64)
+    errors = np.zeros(n - 1)
+    # Below the typical single-point deviation hardly anything can go
+    deviation = segment_distance(positions[1:-1], positions[:-2], positions[2:])
+    tolerance = max(diagonal * BASE_TOLERANCE, float(np.median(deviation)))
+    levels = []
+    below = n
+    while len(rows) > MIN_LEVEL_POINTS and tolerance <= 2 * diagonal:
+        rows, errors = simplify(positions, rows, errors, tolerance)
+        if len(rows) <= LEVEL_SHRINK * below:
+            levels.append((rows, float(errors.max()) if len(errors) else 0.0))
+            below = len(rows)
+        tolerance *= TOLERANCE_FACTOR
+    return levels
+
+
+class TrajectoryIndex:
+    """Level-of-detail row selections over an N-point trajectory"""
+
+    def __init__(self, n, levels):
+        self.n = n
+        self.levels = [(None, 0.0)] + list(levels)  # level 0: every row
+        self.bucket = BUCKET_ROWS
+        edges = np.arange(0, n + self.bucket, self.bucket)
+        self.offsets = [None] + [np.searchsorted(rows, edges) for rows, _ in levels]
+
+    @classmethod
+    def build(cls, states):
+        """Index of (N, 3+) positions or states, e.g. a memory-mapped trajectory"""
+        return cls(len(states), build_levels(states))
+
+    @staticmethod
+    def paths(filename):
+        return f"{filename}.lod.npy", f"{filename}.lod.json"
+
+    def save(self, filename, key):
+        """Write the sidecar files; ``key`` identifies the trajectory file's version"""
+        rows_path, meta_path = self.paths(filename)
+        tmp_path = f"{rows_path}.{os.getpid()}.tmp"
+        levels = self.levels[1:]
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.concatenate([rows for rows, _ in levels]) if levels else np.empty(0, np.int64))
+            os.replace(tmp_path, rows_path)
+            with open(meta_path, 'w') as f:
+                json.dump({'key': key, 'points': self.n,
+                           'levels': [[len(rows), error] for rows, error in levels]}, f)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, filename, key):
+        """The saved index if it matches ``key``, else None"""
+        rows_path, meta_path = cls.paths(filename)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['key'] != key:
+                return None
+            rows = np.load(rows_path, mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        levels, start = [], 0
+        for size, error in meta['levels']:
+            levels.append((rows[start:start + size], error))
+            start += size
+        return cls(meta['points'], levels)
+
+    def _locate(self, level, t):
+        """Position in the level of its first row at or after point index t"""
+        rows, _ = self.levels[level]
+        if rows is None:
+            return min(max(t, 0), self.n)
+        bucket = min(max(t // self.bucket, 0), len(self.offsets[level]) - 2)
+        lo, hi = self.offsets[level][bucket], self.offsets[level][bucket + 1]
+        return int(lo + np.searchsorted(rows[lo:hi], t))
+
+    def query(self, t_start=None, t_end=None, max_points=1000):
+        """
+        Rows covering point indices [t_start, t_end] (inclusive) with at
+        most ``max_points`` points, from the finest level that fits. The
+        first and last rows of the range are always included, so the
+        polyline spans the whole window. Returns (level, rows, error bound),
+        the bound None when even the coarsest level had to be thinned.
+        """
+        if self.n == 0:
+            return 0, np.empty(0, dtype=np.int64), 0.0
+        first = max(int(math.ceil(t_start)) if t_start is not None else 0, 0)
+        last = min(int(math.floor(t_end)) if t_end is not None else self.n - 1, self.n - 1)
+        if last < first:
+            return 0, np.empty(0, dtype=np.int64), 0.0
+        max_points = max(int(max_points), 2)
+        for level, (rows, error) in enumerate(self.levels):
+            lo, hi = self._locate(level, first), self._locate(level, last + 1)
+            if hi - lo <= max_points - 2 or level == len(self.levels) - 1:
+                break
+        selected = np.arange(lo, hi, dtype=np.int64) if rows is None else np.asarray(rows[lo:hi])
+        if len(selected) > max_points - 2:
+            # Even the coarsest level is too dense: thin it evenly, without an error bound
+            selected = selected[np.unique(np.linspace(0, len(selected) - 1, max_points - 2).astype(np.int64))]
+            error = None
+        selected = np.union1d(selected, [first, last])
+        return level, selected, error
@@ -0,0 +1,198 @@
+# trajectory_tail.py
+"""
+Follow a GMAT ReportFile while GMAT is still writing it.
+
+Only the bytes appended since the last read are parsed, at most
+READ_SIZE bytes at a time: the reader keeps a byte offset and holds back
+a trailing partial line until its newline arrives. Only the last
+HISTORY_ROWS states are kept for clients that join late. Appends are
+noticed through inotify on Linux (via ctypes) and by polling everywhere
+else.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+
+import numpy as np
+
+from structured_logging import get_logger
+
+log = get_logger("trajectory_tail")
+
+# inotify(7) constants
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+POLL_INTERVAL = 0.02  # s between size checks without inotify
+READ_SIZE = 4 * 1024 * 1024  # bytes parsed per read_new call
+HISTORY_ROWS = 1 << 20  # states kept for late joiners (48 MiB)
+
+
+def parse_state_lines(lines):
+    """Parse whitespace separated GMAT rows into an (N, 6) array, skipping short rows"""
+    if not lines:
+        return np.empty((0, 6))
+    try:
+        return np.loadtxt(lines, usecols=range(6), ndmin=2)
+    except ValueError:
+        # Ragged chunk: fall back to per-line parsing
+        rows = []
+        for line in lines:
+            values = line.split()
+            if len(values) >= 6:
+                # Convert to float and take first 6 values (X, Y, Z, VX, VY, VZ)
+                rows.append([float(x) for x in values[:6]])
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+
+class TrajectoryTail:
+    """
+    Incremental reader for a growing trajectory file. Keeps the last
+    ``history_rows`` states read; a truncated or replaced file (a new GMAT
+    run) starts over.
+    """
+
+    def __init__(self, filename, read_size=READ_SIZE, history_rows=HISTORY_ROWS):
+        self.filename = filename
+        self.read_size = read_size
+        self.history_rows = history_rows
+        self._reset()
+
+    def _reset(self, inode=None):
+        self.inode = inode
+        self.offset = 0
+        self.partial = b''
+        self.rows = 0
+        self._chunks = []
+        self._kept = 0
+
+    def read_new(self):
+        """
+        Parse what was appended since the last call, up to read_size bytes
+        of it; call again until it returns no states to catch up.
+        Returns (new states (k, 6), restarted) where ``restarted`` means the
+        file was truncated or replaced and everything read before is void.
+        """
+        try:
+            f = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return np.empty((0, 6)), False
+        with f:
+            stat = os.fstat(f.fileno())
+            restarted = False
+            if self.inode is None:
+                self.inode = stat.st_ino
+            elif stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset(stat.st_ino)
+                restarted = True
+            if stat.st_size == self.offset:
+                return np.empty((0, 6)), restarted
+            f.seek(self.offset)
+            data = f.read(min(stat.st_size - self.offset, self.read_size))
+
+        self.offset += len(data)
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+        lines = data[:end].decode('utf-8', 'replace').splitlines()
+        if self.rows == 0 and lines and 'X' in lines[0]:
+            lines = lines[1:]  # header line
+        states = parse_state_lines([line for line in lines if line.strip()])
+        if len(states):
+            self.rows += len(states)
+            self._chunks.append(states)
+            self._kept += len(states)
+            if self._kept > 2 * self.history_rows:
+                self._compact()
+        return states, restarted
+
+    def _compact(self):
+        """Join the kept chunks into one, dropping all but the last history_rows states"""
+        window = np.concatenate(self._chunks)[-self.history_rows:] if self._chunks else np.empty((0, 6))
+        self._chunks = [window]
+        self._kept = len(window)
+
+    def states(self):
+        """(row number of the first, up to history_rows latest states as a (k, 6) array)"""
+        self._compact()
+        return self.rows - self._kept, self._chunks[0]
+
+
+class PollingWatcher:
+    """Wakes the follower every POLL_INTERVAL seconds"""
+
+    def __init__(self, filename, interval=POLL_INTERVAL):
+        self.interval = interval
+
+    async def wait(self, timeout=None):
+        await asyncio.sleep(self.interval if timeout is None else min(self.interval, timeout))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Wakes the follower as soon as the kernel reports a write to the file.
+    Watches the directory so a file that is created or replaced later is
+    still seen. Raises OSError where inotify is unavailable.
+    """
+
+    def __init__(self, filename):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(filename))
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        self.name = os.fsencode(os.path.basename(filename))
+        self.changed = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.fd, self._drain)
+
+    def _drain(self):
+        """Consume pending events and flag the ones that concern our file"""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b'\0')
+            if name == self.name:
+                self.changed.set()
+            offset += INOTIFY_EVENT.size + length
+
+    async def wait(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.changed.clear()
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+
+
+def make_watcher(filename):
+    """inotify where the platform has it, polling otherwise (call inside the event loop)"""
+    try:
+        return InotifyWatcher(filename)
+    except (OSError, AttributeError) as e:
+        log.warning("inotify_unavailable", error=str(e), poll_interval_ms=POLL_INTERVAL * 1000)
+        return PollingWatcher(filename)